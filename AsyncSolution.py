@@ -0,0 +1,514 @@
+from typing import List, Optional, Tuple
+import Utility.AsyncDBConnector as AsyncConnector
+import Queries
+from Utility.ReturnValue import ReturnValue
+from Utility.Exceptions import DatabaseException
+from Business.Customer import Customer, BadCustomer
+from Business.Order import Order, BadOrder
+from Business.Dish import Dish, BadDish
+from Business.OrderDish import OrderDish
+
+# asyncio counterparts of the functions of Solution, with the same arguments, results and ReturnValue codes.
+# every call borrows a connection of the AsyncDBConnector pool only while its query runs, so many concurrent
+# tasks share a few connections without threads. the statements are those of Queries, shared with Solution,
+# and the schema is still created and dropped by Solution.
+# the row caches of Solution are not used here, rows written through this module reach them by the
+# invalidation NOTIFYs of the triggers
+
+
+# ---------------------------------- CRUD API: ----------------------------------
+
+async def add_customer(customer: Customer) -> ReturnValue:
+    conn = None
+    try:
+        conn = await AsyncConnector.AsyncDBConnector.connect()
+        await conn.execute_prepared(
+            Queries.ADD_CUSTOMER,
+            (customer.get_cust_id(), customer.get_full_name(), customer.get_age(), customer.get_phone()))
+    except DatabaseException.ConnectionInvalid:
+        return ReturnValue.ERROR
+    except DatabaseException.NOT_NULL_VIOLATION:
+        return ReturnValue.BAD_PARAMS
+    except DatabaseException.CHECK_VIOLATION:
+        return ReturnValue.BAD_PARAMS
+    except DatabaseException.UNIQUE_VIOLATION:
+        return ReturnValue.ALREADY_EXISTS
+    except Exception:
+        return ReturnValue.BAD_PARAMS
+    finally:
+        if conn is not None:
+            conn.close()
+    return ReturnValue.OK
+
+
+async def get_customer(customer_id: int) -> Customer:
+    conn = None
+    try:
+        conn = await AsyncConnector.AsyncDBConnector.connect()
+        rows_effected, result = await conn.execute_prepared(Queries.GET_CUSTOMER, (customer_id,))
+        if rows_effected == 1:
+            row = result.rows[0]
+            customer = Customer(row[0], row[1], row[2], row[3])
+        else:
+            customer = BadCustomer()
+    except Exception:
+        return BadCustomer()
+    finally:
+        if conn is not None:
+            conn.close()
+    return customer
+
+
+async def delete_customer(customer_id: int) -> ReturnValue:
+    conn = None
+    try:
+        conn = await AsyncConnector.AsyncDBConnector.connect()
+        rows_effected, _ = await conn.execute_prepared(Queries.DELETE_CUSTOMER, (customer_id,))
+        if rows_effected == 0:
+            return ReturnValue.NOT_EXISTS
+    except DatabaseException.ConnectionInvalid:
+        return ReturnValue.ERROR
+    except Exception:
+        return ReturnValue.NOT_EXISTS
+    finally:
+        if conn is not None:
+            conn.close()
+    return ReturnValue.OK
+
+
+async def add_order(order: Order) -> ReturnValue:
+    conn = None
+    try:
+        conn = await AsyncConnector.AsyncDBConnector.connect()
+        await conn.execute_prepared(
+            Queries.ADD_ORDER,
+            (order.get_order_id(), order.get_datetime(), order.get_delivery_fee(), order.get_delivery_address()))
+    except DatabaseException.ConnectionInvalid:
+        return ReturnValue.ERROR
+    except DatabaseException.NOT_NULL_VIOLATION:
+        return ReturnValue.BAD_PARAMS
+    except DatabaseException.CHECK_VIOLATION:
+        return ReturnValue.BAD_PARAMS
+    except DatabaseException.UNIQUE_VIOLATION:
+        return ReturnValue.ALREADY_EXISTS
+    except Exception:
+        return ReturnValue.BAD_PARAMS
+    finally:
+        if conn is not None:
+            conn.close()
+    return ReturnValue.OK
+
+
+async def get_order(order_id: int) -> Order:
+    conn = None
+    try:
+        conn = await AsyncConnector.AsyncDBConnector.connect()
+        rows_effected, result = await conn.execute_prepared(Queries.GET_ORDER, (order_id,))
+        if rows_effected == 1:
+            row = result.rows[0]
+            order = Order(row[0], row[1], row[2], row[3])
+        else:
+            order = BadOrder()
+    except Exception:
+        return BadOrder()
+    finally:
+        if conn is not None:
+            conn.close()
+    return order
+
+
+async def delete_order(order_id: int) -> ReturnValue:
+    conn = None
+    try:
+        conn = await AsyncConnector.AsyncDBConnector.connect()
+        rows_effected, _ = await conn.execute_prepared(Queries.DELETE_ORDER, (order_id,))
+        if rows_effected == 0:
+            return ReturnValue.NOT_EXISTS
+    except DatabaseException.ConnectionInvalid:
+        return ReturnValue.ERROR
+    except Exception:
+        return ReturnValue.NOT_EXISTS
+    finally:
+        if conn is not None:
+            conn.close()
+    return ReturnValue.OK
+
+
+async def add_dish(dish: Dish) -> ReturnValue:
+    conn = None
+    try:
+        conn = await AsyncConnector.AsyncDBConnector.connect()
+        await conn.execute_prepared(
+            Queries.ADD_DISH,
+            (dish.get_dish_id(), dish.get_name(), dish.get_price(), dish.get_is_active()))
+    except DatabaseException.ConnectionInvalid:
+        return ReturnValue.ERROR
+    except DatabaseException.NOT_NULL_VIOLATION:
+        return ReturnValue.BAD_PARAMS
+    except DatabaseException.CHECK_VIOLATION:
+        return ReturnValue.BAD_PARAMS
+    except DatabaseException.UNIQUE_VIOLATION:
+        return ReturnValue.ALREADY_EXISTS
+    except Exception:
+        return ReturnValue.BAD_PARAMS
+    finally:
+        if conn is not None:
+            conn.close()
+    return ReturnValue.OK
+
+
+async def get_dish(dish_id: int) -> Dish:
+    conn = None
+    try:
+        conn = await AsyncConnector.AsyncDBConnector.connect()
+        rows_effected, result = await conn.execute_prepared(Queries.GET_DISH, (dish_id,))
+        if rows_effected == 1:
+            row = result.rows[0]
+            dish = Dish(row[0], row[1], row[2], row[3])
+        else:
+            dish = BadDish()
+    except Exception:
+        return BadDish()
+    finally:
+        if conn is not None:
+            conn.close()
+    return dish
+
+
+async def update_dish_price(dish_id: int, price: float) -> ReturnValue:
+    conn = None
+    try:
+        conn = await AsyncConnector.AsyncDBConnector.connect()
+        rows_effected, _ = await conn.execute_prepared(Queries.UPDATE_DISH_PRICE, (price, dish_id))
+        if rows_effected == 0:
+            return ReturnValue.NOT_EXISTS
+    except DatabaseException.ConnectionInvalid:
+        return ReturnValue.ERROR
+    except DatabaseException.NOT_NULL_VIOLATION:
+        return ReturnValue.BAD_PARAMS
+    except DatabaseException.CHECK_VIOLATION:
+        return ReturnValue.BAD_PARAMS
+    except DatabaseException.UNIQUE_VIOLATION:
+        return ReturnValue.ALREADY_EXISTS
+    except DatabaseException.FOREIGN_KEY_VIOLATION:
+        return ReturnValue.NOT_EXISTS
+    except Exception:
+        return ReturnValue.BAD_PARAMS
+    finally:
+        if conn is not None:
+            conn.close()
+    return ReturnValue.OK
+
+
+async def update_dish_active_status(dish_id: int, is_active: bool) -> ReturnValue:
+    conn = None
+    try:
+        conn = await AsyncConnector.AsyncDBConnector.connect()
+        rows_effected, _ = await conn.execute_prepared(Queries.UPDATE_DISH_ACTIVE_STATUS, (is_active, dish_id))
+        if rows_effected == 0:
+            return ReturnValue.NOT_EXISTS
+    except DatabaseException.ConnectionInvalid:
+        return ReturnValue.ERROR
+    except DatabaseException.NOT_NULL_VIOLATION:
+        return ReturnValue.BAD_PARAMS
+    except DatabaseException.CHECK_VIOLATION:
+        return ReturnValue.BAD_PARAMS
+    except DatabaseException.UNIQUE_VIOLATION:
+        return ReturnValue.ALREADY_EXISTS
+    except DatabaseException.FOREIGN_KEY_VIOLATION:
+        return ReturnValue.NOT_EXISTS
+    except Exception:
+        return ReturnValue.BAD_PARAMS
+    finally:
+        if conn is not None:
+            conn.close()
+    return ReturnValue.OK
+
+
+async def customer_placed_order(customer_id: int, order_id: int) -> ReturnValue:
+    conn = None
+    try:
+        conn = await AsyncConnector.AsyncDBConnector.connect()
+        rows_effected, _ = await conn.execute_prepared(Queries.CUSTOMER_PLACED_ORDER, (customer_id, order_id))
+        if rows_effected == 0:
+            return ReturnValue.NOT_EXISTS
+    except DatabaseException.ConnectionInvalid:
+        return ReturnValue.ERROR
+    except DatabaseException.NOT_NULL_VIOLATION:
+        return ReturnValue.BAD_PARAMS
+    except DatabaseException.CHECK_VIOLATION:
+        return ReturnValue.BAD_PARAMS
+    except DatabaseException.UNIQUE_VIOLATION:
+        return ReturnValue.ALREADY_EXISTS
+    except DatabaseException.FOREIGN_KEY_VIOLATION:
+        return ReturnValue.NOT_EXISTS
+    except Exception:
+        return ReturnValue.ERROR
+    finally:
+        if conn is not None:
+            conn.close()
+    return ReturnValue.OK
+
+
+async def get_customer_that_placed_order(order_id: int) -> Customer:
+    conn = None
+    try:
+        conn = await AsyncConnector.AsyncDBConnector.connect()
+        rows_effected, result = await conn.execute_prepared(Queries.GET_CUSTOMER_THAT_PLACED_ORDER, (order_id,))
+        if rows_effected == 1:
+            row = result.rows[0]
+            customer = Customer(row[0], row[1], row[2], row[3])
+        else:
+            customer = BadCustomer()
+    except Exception:
+        return BadCustomer()
+    finally:
+        if conn is not None:
+            conn.close()
+    return customer
+
+
+async def order_contains_dish(order_id: int, dish_id: int, amount: int) -> ReturnValue:
+    conn = None
+    try:
+        conn = await AsyncConnector.AsyncDBConnector.connect()
+        rows_effected, _ = await conn.execute_prepared(Queries.ORDER_CONTAINS_DISH, (order_id, dish_id, amount))
+        if rows_effected == 0:
+            return ReturnValue.NOT_EXISTS
+    except DatabaseException.ConnectionInvalid:
+        return ReturnValue.ERROR
+    except DatabaseException.NOT_NULL_VIOLATION:
+        return ReturnValue.NOT_EXISTS
+    except DatabaseException.CHECK_VIOLATION:
+        return ReturnValue.BAD_PARAMS
+    except DatabaseException.UNIQUE_VIOLATION:
+        return ReturnValue.ALREADY_EXISTS
+    except DatabaseException.FOREIGN_KEY_VIOLATION:
+        return ReturnValue.NOT_EXISTS
+    except Exception:
+        return ReturnValue.NOT_EXISTS
+    finally:
+        if conn is not None:
+            conn.close()
+    return ReturnValue.OK
+
+
+async def order_does_not_contain_dish(order_id: int, dish_id: int) -> ReturnValue:
+    conn = None
+    try:
+        conn = await AsyncConnector.AsyncDBConnector.connect()
+        rows_effected, _ = await conn.execute_prepared(Queries.ORDER_DOES_NOT_CONTAIN_DISH, (order_id, dish_id))
+        if rows_effected == 0:
+            return ReturnValue.NOT_EXISTS
+    except DatabaseException.ConnectionInvalid:
+        return ReturnValue.ERROR
+    except DatabaseException.CHECK_VIOLATION:
+        return ReturnValue.BAD_PARAMS
+    except DatabaseException.UNIQUE_VIOLATION:
+        return ReturnValue.ALREADY_EXISTS
+    except Exception:
+        return ReturnValue.NOT_EXISTS
+    finally:
+        if conn is not None:
+            conn.close()
+    return ReturnValue.OK
+
+
+async def get_all_order_items(order_id: int) -> List[OrderDish]:
+    conn = None
+    try:
+        conn = await AsyncConnector.AsyncDBConnector.connect()
+        rows_effected, result = await conn.execute_prepared(Queries.GET_ALL_ORDER_ITEMS, (order_id,))
+        dishes = []
+        for row in result.rows:
+            dishes.append(OrderDish(row[0], row[1], row[2]))
+    finally:
+        if conn is not None:
+            conn.close()
+    return dishes
+
+
+async def customer_rated_dish(cust_id: int, dish_id: int, rating: int) -> ReturnValue:
+    conn = None
+    try:
+        conn = await AsyncConnector.AsyncDBConnector.connect()
+        rows_effected, _ = await conn.execute_prepared(Queries.CUSTOMER_RATED_DISH, (cust_id, dish_id, rating))
+        if rows_effected == 0:
+            return ReturnValue.NOT_EXISTS
+    except DatabaseException.ConnectionInvalid:
+        return ReturnValue.ERROR
+    except DatabaseException.NOT_NULL_VIOLATION:
+        return ReturnValue.NOT_EXISTS
+    except DatabaseException.CHECK_VIOLATION:
+        return ReturnValue.BAD_PARAMS
+    except DatabaseException.UNIQUE_VIOLATION:
+        return ReturnValue.ALREADY_EXISTS
+    except DatabaseException.FOREIGN_KEY_VIOLATION:
+        return ReturnValue.NOT_EXISTS
+    except Exception:
+        return ReturnValue.NOT_EXISTS
+    finally:
+        if conn is not None:
+            conn.close()
+    return ReturnValue.OK
+
+
+async def customer_deleted_rating_on_dish(cust_id: int, dish_id: int) -> ReturnValue:
+    conn = None
+    try:
+        conn = await AsyncConnector.AsyncDBConnector.connect()
+        rows_effected, _ = await conn.execute_prepared(Queries.CUSTOMER_DELETED_RATING_ON_DISH, (cust_id, dish_id))
+        if rows_effected == 0:
+            return ReturnValue.NOT_EXISTS
+    except DatabaseException.ConnectionInvalid:
+        return ReturnValue.ERROR
+    except Exception:
+        return ReturnValue.NOT_EXISTS
+    finally:
+        if conn is not None:
+            conn.close()
+    return ReturnValue.OK
+
+
+async def get_all_customer_ratings(cust_id: int) -> List[Tuple[int, int]]:
+    conn = None
+    try:
+        conn = await AsyncConnector.AsyncDBConnector.connect()
+        rows_effected, result = await conn.execute_prepared(Queries.GET_ALL_CUSTOMER_RATINGS, (cust_id,))
+        ratings = []
+        for row in result.rows:
+            ratings.append((row[0], row[1]))
+    finally:
+        if conn is not None:
+            conn.close()
+    return ratings
+
+
+# see Solution.place_full_order
+async def place_full_order(order: Order, customer_id: Optional[int], items: List[Tuple[int, int]]) -> ReturnValue:
+    if None in (order.get_order_id(), order.get_datetime(), order.get_delivery_fee(), order.get_delivery_address()):
+        return ReturnValue.BAD_PARAMS
+    if any(amount is None for _, amount in items):
+        return ReturnValue.BAD_PARAMS
+    conn = None
+    try:
+        conn = await AsyncConnector.AsyncDBConnector.connect()
+        await conn.execute_prepared(
+            Queries.PLACE_FULL_ORDER,
+            (order.get_order_id(), order.get_datetime(), order.get_delivery_fee(), order.get_delivery_address(),
+             customer_id, [dish_id for dish_id, _ in items], [amount for _, amount in items]))
+    except DatabaseException.ConnectionInvalid:
+        return ReturnValue.ERROR
+    except DatabaseException.NOT_NULL_VIOLATION:
+        return ReturnValue.NOT_EXISTS
+    except DatabaseException.CHECK_VIOLATION:
+        return ReturnValue.BAD_PARAMS
+    except DatabaseException.UNIQUE_VIOLATION:
+        return ReturnValue.ALREADY_EXISTS
+    except DatabaseException.FOREIGN_KEY_VIOLATION:
+        return ReturnValue.NOT_EXISTS
+    except Exception:
+        return ReturnValue.BAD_PARAMS
+    finally:
+        if conn is not None:
+            conn.close()
+    return ReturnValue.OK
+
+
+# ---------------------------------- BASIC API: ----------------------------------
+
+async def get_order_total_price(order_id: int) -> float:
+    conn = None
+    try:
+        conn = await AsyncConnector.AsyncDBConnector.connect()
+        rows_effected, result = await conn.execute_prepared(Queries.GET_ORDER_TOTAL_PRICE, (order_id,))
+    finally:
+        if conn is not None:
+            conn.close()
+    return float(result.rows[0][0])
+
+
+async def get_customers_spent_max_avg_amount_money() -> List[int]:
+    conn = None
+    try:
+        conn = await AsyncConnector.AsyncDBConnector.connect()
+        rows_effected, result = await conn.execute_prepared(Queries.GET_CUSTOMERS_SPENT_MAX_AVG_AMOUNT_MONEY)
+        customers_best = [int(row[0]) for row in result.rows]
+    finally:
+        if conn is not None:
+            conn.close()
+    return customers_best
+
+
+async def get_most_purchased_dish_among_anonymous_order() -> Dish:
+    conn = None
+    try:
+        conn = await AsyncConnector.AsyncDBConnector.connect()
+        rows_effected, result = await conn.execute_prepared(Queries.GET_MOST_PURCHASED_DISH_AMONG_ANONYMOUS_ORDER)
+        row = result.rows[0]
+        dish = Dish(row[0], row[1], row[2], row[3])
+    finally:
+        if conn is not None:
+            conn.close()
+    return dish
+
+
+async def did_customer_order_top_rated_dishes(cust_id: int) -> bool:
+    conn = None
+    try:
+        conn = await AsyncConnector.AsyncDBConnector.connect()
+        rows_effected, result = await conn.execute_prepared(Queries.DID_CUSTOMER_ORDER_TOP_RATED_DISHES, (cust_id,))
+    finally:
+        if conn is not None:
+            conn.close()
+    return rows_effected != 0
+
+
+# ---------------------------------- ADVANCED API: ----------------------------------
+
+async def get_customers_rated_but_not_ordered() -> List[int]:
+    conn = None
+    try:
+        conn = await AsyncConnector.AsyncDBConnector.connect()
+        rows_effected, result = await conn.execute_prepared(Queries.GET_CUSTOMERS_RATED_BUT_NOT_ORDERED)
+        customers_bad = [int(row[0]) for row in result.rows]
+    finally:
+        if conn is not None:
+            conn.close()
+    return customers_bad
+
+
+async def get_non_worth_price_increase() -> List[int]:
+    conn = None
+    try:
+        conn = await AsyncConnector.AsyncDBConnector.connect()
+        rows_effected, result = await conn.execute_prepared(Queries.GET_NON_WORTH_PRICE_INCREASE)
+        price_bad = [int(row[0]) for row in result.rows]
+    finally:
+        if conn is not None:
+            conn.close()
+    return price_bad
+
+
+async def get_cumulative_profit_per_month(year: int) -> List[Tuple[int, float]]:
+    conn = None
+    try:
+        conn = await AsyncConnector.AsyncDBConnector.connect()
+        rows_effected, result = await conn.execute_prepared(Queries.GET_CUMULATIVE_PROFIT_PER_MONTH, (year,))
+        revenues = [(int(row[0]), float(row[1])) for row in result.rows]
+    finally:
+        if conn is not None:
+            conn.close()
+    return revenues
+
+
+async def get_potential_dish_recommendations(cust_id: int) -> List[int]:
+    conn = None
+    try:
+        conn = await AsyncConnector.AsyncDBConnector.connect()
+        rows_effected, result = await conn.execute_prepared(Queries.GET_POTENTIAL_DISH_RECOMMENDATIONS, (cust_id,))
+        dishes = [int(row[0]) for row in result.rows]
+    finally:
+        if conn is not None:
+            conn.close()
+    return dishes
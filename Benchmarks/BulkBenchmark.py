@@ -0,0 +1,62 @@
+import sys
+import time
+from datetime import datetime, timedelta
+
+import Solution as Solution
+from Business.Customer import Customer
+from Business.Dish import Dish
+from Business.Order import Order
+from Utility.ReturnValue import ReturnValue
+
+'''
+    Rows per second of the bulk API (add_customers, add_orders, add_dishes) and of the one row at a time API it
+    replaces. Every order falls in the same month, the worst case for the MonthlyRevenue rollup. Run it from the
+    repository root against a scratch database, it drops and recreates the tables:
+        python -m Benchmarks.BulkBenchmark [rows] [single rows]
+'''
+
+
+def customers(first: int, count: int) -> list:
+    return [Customer(i, 'customer ' + str(i), 30, "0123456789") for i in range(first, first + count)]
+
+
+def orders(first: int, count: int) -> list:
+    start = datetime(2024, 5, 1)
+    return [Order(i, start + timedelta(seconds=i), 5.5, "address " + str(i)) for i in range(first, first + count)]
+
+
+def dishes(first: int, count: int) -> list:
+    return [Dish(i, 'dish ' + str(i), 10.5, True) for i in range(first, first + count)]
+
+
+# rows per second of adding the rows with the bulk function, then of adding as many more one by one
+def measure(make, bulk, single, rows: int, single_rows: int) -> tuple:
+    batch = make(1, rows)
+    start = time.perf_counter()
+    if set(bulk(batch)) != {ReturnValue.OK}:
+        raise AssertionError("a row of the bulk load failed")
+    bulk_rate = rows / (time.perf_counter() - start)
+    batch = make(rows + 1, single_rows)
+    start = time.perf_counter()
+    for row in batch:
+        if single(row) != ReturnValue.OK:
+            raise AssertionError("a row failed")
+    return bulk_rate, single_rows / (time.perf_counter() - start)
+
+
+def main(rows: int = 100000, single_rows: int = 1000) -> None:
+    Solution.drop_tables()
+    Solution.create_tables()
+    try:
+        print("%-14s %14s %14s" % ("table", "bulk rows/s", "single rows/s"))
+        for name, make, bulk, single in (("Customers", customers, Solution.add_customers, Solution.add_customer),
+                                         ("Orders", orders, Solution.add_orders, Solution.add_order),
+                                         ("Dishes", dishes, Solution.add_dishes, Solution.add_dish)):
+            bulk_rate, single_rate = measure(make, bulk, single, rows, single_rows)
+            print("%-14s %14.0f %14.0f" % (name, bulk_rate, single_rate))
+    finally:
+        Solution.drop_tables()
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:3]])
@@ -0,0 +1,152 @@
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+import psycopg2
+
+import Solution as Solution
+import Utility.DBConnector as Connector
+from Business.Customer import Customer
+from Business.Dish import Dish
+from Business.Order import Order
+
+'''
+    Times the APIs served by the secondary indexes of create_tables, with the indexes and after dropping them.
+    Run it from the repository root against a scratch database, it drops and recreates the tables:
+        python -m Benchmarks.IndexBenchmark [customers] [repetitions]
+'''
+
+INDEXES = ["CustomerPlacesOrder_cust_id_idx", "OrderContainsDish_dish_id_idx",
+           "CustomerRatedDish_dish_id_rating_idx", "Orders_date_idx"]
+
+# dishes added after the ordered ones that no order or rating refers to, only they can be deleted
+UNORDERED_DISHES = 100
+
+
+def dish_count(customers: int) -> int:
+    return max(customers // 10, 10)
+
+
+def populate(customers: int, seed: int = 236363) -> None:
+    rng = random.Random(seed)
+    orders = customers * 5
+    dishes = dish_count(customers)
+    Solution.add_customers(Customer(i, 'customer ' + str(i), rng.randint(18, 120), "0123456789")
+                           for i in range(1, customers + 1))
+    start = datetime(2015, 1, 1)
+    Solution.add_orders(Order(i, start + timedelta(minutes=rng.randint(0, 10 * 365 * 24 * 60)),
+                              rng.randint(0, 30), "address " + str(i)) for i in range(1, orders + 1))
+    prices = {i: rng.randint(5, 100) for i in range(1, dishes + 1)}
+    Solution.add_dishes(Dish(i, 'dish ' + str(i), price, True) for i, price in prices.items())
+    Solution.add_dishes(Dish(i, 'dish ' + str(i), 10, True)
+                        for i in range(dishes + 1, dishes + UNORDERED_DISHES + 1))
+    conn = None
+    try:
+        conn = Connector.DBConnector()
+        conn.copy_rows("CustomerPlacesOrder", ("cust_id", "order_id"),
+                       ((rng.randint(1, customers), i) for i in range(1, orders + 1) if rng.random() < 0.8))
+        items = set()
+        for order_id in range(1, orders + 1):
+            for dish_id in rng.sample(range(1, dishes + 1), rng.randint(1, 4)):
+                items.add((order_id, dish_id))
+        conn.copy_rows("OrderContainsDish", ("order_id", "dish_id", "amount", "price"),
+                       ((order_id, dish_id, rng.randint(1, 5), prices[dish_id]) for order_id, dish_id in items))
+        ratings = set()
+        for cust_id in range(1, customers + 1):
+            for dish_id in rng.sample(range(1, dishes + 1), rng.randint(0, 5)):
+                ratings.add((cust_id, dish_id))
+        conn.copy_rows("CustomerRatedDish", ("cust_id", "dish_id", "rating"),
+                       ((cust_id, dish_id, rng.randint(1, 5)) for cust_id, dish_id in ratings))
+        conn.commit()
+    finally:
+        if conn is not None:
+            conn.close()
+    vacuum()
+
+
+# the load leaves dead versions of the rolled up rows (MonthlyRevenue, CustomerSpend, ...) and hint bits to set
+# on the first reads, both would be charged to whichever run comes first. VACUUM cannot run in the transaction
+# of a pooled connection, so it gets a connection of its own
+def vacuum() -> None:
+    connection = psycopg2.connect(**Connector.load_config())
+    try:
+        connection.autocommit = True
+        with connection.cursor() as cursor:
+            cursor.execute("VACUUM ANALYZE")
+    finally:
+        connection.close()
+
+
+def drop_indexes() -> None:
+    conn = None
+    try:
+        conn = Connector.DBConnector()
+        for index in INDEXES:
+            conn.execute("DROP INDEX IF EXISTS " + index)
+        conn.execute("ANALYZE")
+    finally:
+        if conn is not None:
+            conn.close()
+
+
+# deletes a dish nothing refers to and rolls the deletion back. the foreign keys of OrderContainsDish and
+# CustomerRatedDish look the dish up by dish_id, without their dish side indexes each check scans the whole table
+def delete_unordered_dish(dish_id: int) -> None:
+    with Solution.transaction() as transaction:
+        transaction.rollback()
+        conn = None
+        try:
+            conn = Connector.DBConnector()
+            conn.execute("DELETE FROM Dishes WHERE dish_id = " + str(dish_id))
+        finally:
+            if conn is not None:
+                conn.close()
+
+
+# mean milliseconds per call of every affected API
+def measure(customers: int, repetitions: int, seed: int = 1) -> dict:
+    rng = random.Random(seed)
+    dishes = dish_count(customers)
+    calls = {
+        "get_customer_that_placed_order": lambda: Solution.get_customer_that_placed_order(
+            rng.randint(1, customers * 5)),
+        "get_all_customer_ratings": lambda: Solution.get_all_customer_ratings(rng.randint(1, customers)),
+        "did_customer_order_top_rated_dishes": lambda: Solution.did_customer_order_top_rated_dishes(
+            rng.randint(1, customers)),
+        "get_customers_rated_but_not_ordered": Solution.get_customers_rated_but_not_ordered,
+        "get_customers_spent_max_avg_amount_money": Solution.get_customers_spent_max_avg_amount_money,
+        "get_cumulative_profit_per_month": lambda: Solution.get_cumulative_profit_per_month(
+            rng.randint(2015, 2024)),
+        "get_potential_dish_recommendations": lambda: Solution.get_potential_dish_recommendations(
+            rng.randint(1, customers)),
+        "delete a dish (dish_id foreign key checks)": lambda: delete_unordered_dish(
+            rng.randint(dishes + 1, dishes + UNORDERED_DISHES)),
+    }
+    timings = {}
+    for name, call in calls.items():
+        call()  # warm up the pool and the prepared statement
+        start = time.perf_counter()
+        for _ in range(repetitions):
+            call()
+        timings[name] = (time.perf_counter() - start) * 1000 / repetitions
+    return timings
+
+
+def main(customers: int = 10000, repetitions: int = 20) -> None:
+    Solution.drop_tables()
+    Solution.create_tables()
+    try:
+        populate(customers)
+        indexed = measure(customers, repetitions)
+        drop_indexes()
+        scanned = measure(customers, repetitions)
+    finally:
+        Solution.drop_tables()
+    print("%-42s %12s %12s %8s" % ("API (%d customers)" % customers, "no index ms", "indexed ms", "speedup"))
+    for name in indexed:
+        print("%-42s %12.3f %12.3f %7.1fx" % (name, scanned[name], indexed[name], scanned[name] / indexed[name]))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:3]])
@@ -0,0 +1,100 @@
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+import Solution as Solution
+import Utility.DBConnector as Connector
+from Business.Customer import Customer
+from Business.Dish import Dish
+from Business.Order import Order
+from RecommendationEngine import RecommendationEngine
+
+'''
+    Compares get_potential_dish_recommendations with RecommendationEngine at growing rating counts, and checks
+    that both give the same answers. Run it from the repository root against a scratch database, it drops and
+    recreates the tables:
+        python -m Benchmarks.RecommendationBenchmark [sample] [ratings ...]
+'''
+
+SIZES = [10000, 100000, 1000000]
+
+
+# about five ratings per customer, a hundred per dish, and one order with two items per two customers
+def populate(ratings: int, seed: int = 236363) -> int:
+    rng = random.Random(seed)
+    customers = max(ratings // 5, 10)
+    dishes = max(ratings // 100, 10)
+    orders = customers // 2
+    Solution.add_customers(Customer(i, 'customer ' + str(i), rng.randint(18, 120), "0123456789")
+                           for i in range(1, customers + 1))
+    start = datetime(2015, 1, 1)
+    Solution.add_orders(Order(i, start + timedelta(minutes=rng.randint(0, 10 * 365 * 24 * 60)),
+                              rng.randint(0, 30), "address " + str(i)) for i in range(1, orders + 1))
+    Solution.add_dishes(Dish(i, 'dish ' + str(i), rng.randint(5, 100), True) for i in range(1, dishes + 1))
+    conn = None
+    try:
+        conn = Connector.DBConnector()
+        conn.copy_rows("CustomerPlacesOrder", ("cust_id", "order_id"),
+                       ((rng.randint(1, customers), i) for i in range(1, orders + 1)))
+        conn.copy_rows("OrderContainsDish", ("order_id", "dish_id", "amount", "price"),
+                       ((order_id, dish_id, rng.randint(1, 5), 10) for order_id in range(1, orders + 1)
+                        for dish_id in rng.sample(range(1, dishes + 1), 2)))
+        conn.commit()
+    finally:
+        if conn is not None:
+            conn.close()
+    rated = set()
+    while len(rated) < ratings:
+        rated.add((rng.randint(1, customers), rng.randint(1, dishes)))
+    # add_ratings rebuilds DishRatings and the similarity components once at the end, not chunk by chunk
+    Solution.add_ratings((cust_id, dish_id, rng.randint(1, 5)) for cust_id, dish_id in rated)
+    conn = None
+    try:
+        conn = Connector.DBConnector()
+        conn.execute("ANALYZE")
+    finally:
+        if conn is not None:
+            conn.close()
+    return customers
+
+
+# milliseconds spent by each backend to answer the sample of customers
+def measure(customers: int, sample: int, seed: int = 1) -> dict:
+    rng = random.Random(seed)
+    cust_ids = [rng.randint(1, customers) for _ in range(sample)]
+    Solution.get_potential_dish_recommendations(cust_ids[0])  # warm up the pool and the prepared statement
+    start = time.perf_counter()
+    expected = [Solution.get_potential_dish_recommendations(cust_id) for cust_id in cust_ids]
+    sql_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    engine = RecommendationEngine.from_database()
+    load_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    answers = engine.recommend_batch(cust_ids)
+    batch_ms = (time.perf_counter() - start) * 1000
+    if answers != expected:
+        raise AssertionError("RecommendationEngine disagrees with get_potential_dish_recommendations")
+    return {"sql": sql_ms, "load": load_ms, "batch": batch_ms}
+
+
+def main(sample: int = 1000, sizes: list = None) -> None:
+    print("%10s %10s %12s %14s %14s %14s" % ("ratings", "customers", "populate s", "sql ms", "load ms",
+                                                "batch ms"))
+    for ratings in sizes or SIZES:
+        Solution.drop_tables()
+        Solution.create_tables()
+        try:
+            start = time.perf_counter()
+            customers = populate(ratings)
+            populate_s = time.perf_counter() - start
+            timings = measure(customers, sample)
+        finally:
+            Solution.drop_tables()
+        print("%10d %10d %12.1f %14.1f %14.1f %14.1f" % (ratings, customers, populate_s, timings["sql"],
+                                                         timings["load"], timings["batch"]))
+
+
+if __name__ == '__main__':
+    args = [int(arg) for arg in sys.argv[1:]]
+    main(*args[:1], sizes=args[1:] or None)
@@ -0,0 +1,148 @@
+# the statements Solution and AsyncSolution run, one template per function of the same name, for
+# execute_prepared of either connector. a query changed here changes in both modules. the batch, paging and
+# range functions only exist in Solution, their templates live here all the same
+
+# ---------------------------------- CRUD API: ----------------------------------
+
+ADD_CUSTOMER = "INSERT INTO Customers(cust_id, full_name, age, phone) VALUES ($1, $2, $3, $4)"
+
+GET_CUSTOMER = "SELECT * FROM Customers WHERE cust_id = $1"
+
+DELETE_CUSTOMER = "DELETE FROM Customers WHERE cust_id = $1"
+
+ADD_ORDER = "INSERT INTO Orders(order_id, date, delivery_fee, delivery_adress) VALUES ($1, $2, $3, $4)"
+
+GET_ORDER = "SELECT * FROM Orders WHERE order_id = $1"
+
+DELETE_ORDER = "DELETE FROM Orders WHERE order_id = $1"
+
+ADD_DISH = "INSERT INTO Dishes(dish_id, name, price, is_active) VALUES ($1, $2, $3, $4)"
+
+GET_DISH = "SELECT * FROM Dishes WHERE dish_id = $1"
+
+UPDATE_DISH_PRICE = "UPDATE Dishes SET price = $1 WHERE dish_id = $2 AND is_active = true"
+
+UPDATE_DISH_ACTIVE_STATUS = "UPDATE Dishes SET is_active = $1 WHERE dish_id = $2"
+
+CUSTOMER_PLACED_ORDER = "INSERT INTO CustomerPlacesOrder(cust_id, order_id) VALUES ($1, $2)"
+
+GET_CUSTOMER_THAT_PLACED_ORDER = ("SELECT C.cust_id, C.full_name, C.age, C.phone"
+                                  " FROM Customers C, CustomerPlacesOrder O"
+                                  " WHERE C.cust_id = O.cust_id AND O.order_id = $1")
+
+ORDER_CONTAINS_DISH = ("INSERT INTO OrderContainsDish(order_id, dish_id, amount, price) "
+                       "VALUES ($1, $2, $3, (SELECT price FROM Dishes WHERE dish_id = $2 AND is_active = true))")
+
+ORDER_DOES_NOT_CONTAIN_DISH = "DELETE FROM OrderContainsDish WHERE order_id = $1 AND dish_id = $2"
+
+GET_ALL_ORDER_ITEMS = ("SELECT D.dish_id, O.amount, O.price "
+                       "FROM Dishes D, OrderContainsDish O "
+                       "WHERE D.dish_id = O.dish_id AND O.order_id = $1 "
+                       "ORDER BY dish_id ASC")
+
+# one keyset page: the items after after_dish_id ($2), at most $3 of them
+GET_ORDER_ITEMS_PAGE = ("SELECT dish_id, amount, price FROM OrderContainsDish "
+                        "WHERE order_id = $1 AND dish_id > $2 "
+                        "ORDER BY dish_id ASC LIMIT $3")
+
+CUSTOMER_RATED_DISH = "INSERT INTO CustomerRatedDish(cust_id, dish_id, rating) VALUES ($1, $2, $3)"
+
+CUSTOMER_DELETED_RATING_ON_DISH = "DELETE FROM CustomerRatedDish WHERE cust_id = $1 AND dish_id = $2"
+
+GET_ALL_CUSTOMER_RATINGS = ("SELECT D.dish_id, D.rating "
+                            "FROM CustomerRatedDish D "
+                            "WHERE D.cust_id = $1 "
+                            "ORDER BY dish_id ASC")
+
+GET_CUSTOMER_RATINGS_PAGE = ("SELECT dish_id, rating FROM CustomerRatedDish "
+                             "WHERE cust_id = $1 AND dish_id > $2 "
+                             "ORDER BY dish_id ASC LIMIT $3")
+
+# Composite API
+
+# the foreign keys of the later inserts are checked at the end of the statement, after the order exists.
+# a missing or inactive dish leaves the price NULL
+PLACE_FULL_ORDER = ("WITH NewOrder AS (INSERT INTO Orders(order_id, date, delivery_fee, delivery_adress) "
+                    "VALUES ($1, $2, $3, $4) RETURNING order_id), "
+                    "Placed AS (INSERT INTO CustomerPlacesOrder(cust_id, order_id) "
+                    "SELECT $5::integer, order_id FROM NewOrder WHERE $5::integer IS NOT NULL) "
+                    "INSERT INTO OrderContainsDish(order_id, dish_id, amount, price) "
+                    "SELECT N.order_id, I.dish_id, I.amount, D.price "
+                    "FROM NewOrder N CROSS JOIN unnest($6::integer[], $7::integer[]) AS I(dish_id, amount) "
+                    "LEFT JOIN Dishes D ON D.dish_id = I.dish_id AND D.is_active = true")
+
+# Batch API
+
+# the rows whose key is in the array $1, in no particular order
+GET_CUSTOMERS = "SELECT * FROM Customers WHERE cust_id = ANY($1)"
+
+GET_ORDERS = "SELECT * FROM Orders WHERE order_id = ANY($1)"
+
+GET_DISHES = "SELECT * FROM Dishes WHERE dish_id = ANY($1)"
+
+# ---------------------------------- BASIC API: ----------------------------------
+
+GET_ORDER_TOTAL_PRICE = "SELECT total_price FROM OrderTotalPrice WHERE order_id = $1"
+
+GET_ORDER_TOTAL_PRICES = "SELECT order_id, total_price FROM OrderTotalPrice WHERE order_id = ANY($1)"
+
+# ---------------------------------- ADVANCED API: ----------------------------------
+
+# the maximum is the first entry of CustomerSpend_avg_spend_idx and its ties follow it in cust_id order
+GET_CUSTOMERS_SPENT_MAX_AVG_AMOUNT_MONEY = ("SELECT cust_id FROM CustomerSpend "
+                                            "WHERE avg_spend = (SELECT MAX(avg_spend) FROM CustomerSpend) "
+                                            "ORDER BY avg_spend DESC, cust_id")
+
+GET_MOST_PURCHASED_DISH_AMONG_ANONYMOUS_ORDER = ("SELECT D.dish_id, D.name, D.price, D.is_active "
+                                                 "FROM AnonymousDishAmounts A JOIN Dishes D ON D.dish_id = A.dish_id "
+                                                 "ORDER BY A.anonymous_amount DESC, A.dish_id "
+                                                 "LIMIT 1")
+
+DID_CUSTOMER_ORDER_TOP_RATED_DISHES = ("SELECT C.dish_id "
+                                       "FROM CustomerOrderedDish C, "
+                                       "(SELECT * FROM RatingDish ORDER BY avg_rating DESC, dish_id LIMIT 5) AS TOP "
+                                       "WHERE C.cust_id = $1 AND C.dish_id = TOP.dish_id ")
+
+GET_CUSTOMERS_RATED_BUT_NOT_ORDERED = ("SELECT DISTINCT cust_id FROM CustomerRatedDish AS c WHERE rating < 3 AND "
+                                       "c.cust_id NOT IN(SELECT cust_id FROM CustomerOrderedDish AS d "
+                                       "WHERE c.dish_id  = d.dish_id) AND "
+                                       "c.dish_id IN (SELECT dish_id FROM RatingDish "
+                                       "ORDER BY avg_rating ASC , dish_id ASC LIMIT 5) "
+                                       "ORDER BY cust_id ASC")
+
+# every price point of an active dish next to the best average of the cheaper ones, read in primary
+# key order so the window needs no sort
+GET_NON_WORTH_PRICE_INCREASE = ("SELECT P.dish_id FROM "
+                                "(SELECT dish_id, price, average_price, "
+                                "MAX(average_price) OVER (PARTITION BY dish_id ORDER BY price "
+                                "ROWS BETWEEN UNBOUNDED PRECEDING AND 1 PRECEDING) AS cheaper_average_price "
+                                "FROM AverageProfitPerOrderPerPrice "
+                                "WHERE dish_id IN (SELECT dish_id FROM Dishes WHERE is_active = true)) AS P "
+                                "JOIN Dishes D ON D.dish_id = P.dish_id AND D.price = P.price "
+                                "WHERE P.average_price < P.cheaper_average_price "
+                                "ORDER BY P.dish_id ASC")
+
+# months without orders are missing from MonthlyRevenue, the series fills them in before the running sum
+GET_CUMULATIVE_PROFIT_PER_MONTH = ("SELECT M.month, "
+                                   "SUM(COALESCE(R.revenue, 0)) OVER (ORDER BY M.month) "
+                                   "FROM generate_series(1, 12) AS M(month) "
+                                   "LEFT JOIN MonthlyRevenue R ON R.year = $1 AND R.month = M.month "
+                                   "ORDER BY M.month DESC")
+
+# GET_CUMULATIVE_PROFIT_PER_MONTH for every year from $1 to $2, the running sum restarts with each year
+GET_CUMULATIVE_PROFIT_RANGE = ("SELECT Y.year, M.month, "
+                               "SUM(COALESCE(R.revenue, 0)) OVER (PARTITION BY Y.year ORDER BY M.month) "
+                               "FROM generate_series($1::integer, $2::integer) AS Y(year) "
+                               "CROSS JOIN generate_series(1, 12) AS M(month) "
+                               "LEFT JOIN MonthlyRevenue R ON R.year = Y.year AND R.month = M.month "
+                               "ORDER BY Y.year, M.month DESC")
+
+# the similar customers are the customer and the rest of their component in CustomerSimilarity
+GET_POTENTIAL_DISH_RECOMMENDATIONS = ("SELECT DISTINCT C.dish_id FROM CustomerRatedDish C "
+                                      "WHERE C.cust_id IN (SELECT $1::integer UNION "
+                                      "SELECT M.cust_id FROM CustomerSimilarity S "
+                                      "JOIN CustomerSimilarity M ON M.component_id = S.component_id "
+                                      "WHERE S.cust_id = $1) "
+                                      "AND NOT EXISTS (SELECT 1 FROM CustomerOrderedDish D "
+                                      "WHERE D.cust_id = $1 AND D.dish_id = C.dish_id) "
+                                      "ORDER BY C.dish_id")
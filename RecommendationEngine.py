@@ -0,0 +1,107 @@
+from typing import Iterable, List, Tuple
+import Utility.DBConnector as Connector
+
+# an in memory alternative to Solution.get_potential_dish_recommendations for answering many customers at once.
+# it works on a snapshot of CustomerRatedDish and CustomerOrderedDish: customers and dishes become the rows and
+# columns of sparse matrices, the groups of similar customers are the connected components of the bipartite
+# customer - dish graph of the ratings >= 4, and a recommendation is a row of (component x dish) minus a row of
+# (customer x ordered dish). the answers are exactly those of the SQL version for the data that was loaded
+
+
+def _modules():
+    try:
+        import numpy
+        from scipy import sparse
+        from scipy.sparse import csgraph
+    except ImportError:
+        raise ImportError("RecommendationEngine requires numpy and scipy, install them with pip install numpy scipy")
+    return numpy, sparse, csgraph
+
+
+class RecommendationEngine:
+    # ratings are (cust_id, dish_id, rating) and ordered are (cust_id, dish_id), each given as three / two
+    # equally long sequences (or numpy arrays) of the column values
+    def __init__(self, ratings: Tuple[Iterable[int], Iterable[int], Iterable[int]],
+                 ordered: Tuple[Iterable[int], Iterable[int]]):
+        numpy, sparse, csgraph = _modules()
+        self.__numpy = numpy
+        rating_customers, rating_dishes, rating_values = (numpy.asarray(column, dtype=numpy.int64)
+                                                          for column in ratings)
+        # a customer or dish nobody rated can only ever get an empty recommendation, so only the rated ones count
+        self.customers = numpy.unique(rating_customers)
+        self.dishes = numpy.unique(rating_dishes)
+        customer_count, dish_count = len(self.customers), len(self.dishes)
+        rows = numpy.searchsorted(self.customers, rating_customers)
+        cols = numpy.searchsorted(self.dishes, rating_dishes)
+        rated = sparse.csr_matrix((numpy.ones(len(rows), dtype=numpy.int8), (rows, cols)),
+                                  shape=(customer_count, dish_count))
+
+        # union-find over the customers: the customers are nodes 0..n-1, the dishes nodes n..n+m-1 and every
+        # rating >= 4 is an edge, so two customers share a component exactly when the recursive SimilarCustomers
+        # of the SQL version reaches one from the other
+        high = rating_values >= 4
+        size = customer_count + dish_count
+        graph = sparse.coo_matrix((numpy.ones(int(high.sum()), dtype=numpy.int8),
+                                   (rows[high], customer_count + cols[high])), shape=(size, size))
+        _, labels = csgraph.connected_components(graph, directed=False)
+        _, self.__component = numpy.unique(labels[:customer_count], return_inverse=True)
+        component_count = int(self.__component.max()) + 1 if customer_count > 0 else 0
+        members = sparse.csr_matrix((numpy.ones(customer_count, dtype=numpy.int8),
+                                     (self.__component, numpy.arange(customer_count))),
+                                    shape=(component_count, customer_count))
+        # the dishes rated by anybody of the component, whatever the rating
+        self.__component_dishes = (members @ rated).astype(bool).tocsr()
+
+        ordered_customers, ordered_dishes = (numpy.asarray(column, dtype=numpy.int64) for column in ordered)
+        rows, known_rows = self.__positions(self.customers, ordered_customers)
+        cols, known_cols = self.__positions(self.dishes, ordered_dishes)
+        known = known_rows & known_cols
+        self.__ordered = sparse.csr_matrix((numpy.ones(int(known.sum()), dtype=bool),
+                                            (rows[known], cols[known])), shape=(customer_count, dish_count))
+
+    # the engine over the current content of the database, both tables are read in one transaction
+    @classmethod
+    def from_database(cls) -> "RecommendationEngine":
+        conn = None
+        try:
+            conn = Connector.DBConnector()
+            ratings = conn.execute_stream("SELECT cust_id, dish_id, rating FROM CustomerRatedDish").to_numpy()
+            ordered = conn.execute_stream("SELECT DISTINCT cust_id, dish_id FROM CustomerOrderedDish").to_numpy()
+        finally:
+            if conn is not None:
+                conn.close()
+        return cls(tuple(ratings.get(name, ()) for name in ("cust_id", "dish_id", "rating")),
+                   tuple(ordered.get(name, ()) for name in ("cust_id", "dish_id")))
+
+    # the position of every value in the sorted unique keys, and whether it is there at all
+    def __positions(self, keys, values):
+        numpy = self.__numpy
+        positions = numpy.searchsorted(keys, values)
+        if len(keys) == 0:
+            return positions, numpy.zeros(len(values), dtype=bool)
+        clipped = numpy.minimum(positions, len(keys) - 1)
+        return clipped, keys[clipped] == values
+
+    # what Solution.get_potential_dish_recommendations(cust_id) returns, for every customer of cust_ids in order
+    def recommend_batch(self, cust_ids: Iterable[int]) -> List[List[int]]:
+        numpy = self.__numpy
+        cust_ids = numpy.fromiter(cust_ids, dtype=numpy.int64)
+        rows, known = self.__positions(self.customers, cust_ids)
+        rows = rows[known]
+        candidates = self.__component_dishes[self.__component[rows]]
+        # drop what the customer already ordered, both matrices are boolean so this is a set difference
+        recommended = (candidates > self.__ordered[rows]).tocsr()
+        recommended.sort_indices()
+        answers = []
+        position = 0
+        for is_known in known:
+            if not is_known:
+                answers.append([])
+                continue
+            start, end = recommended.indptr[position], recommended.indptr[position + 1]
+            answers.append(self.dishes[recommended.indices[start:end]].tolist())
+            position += 1
+        return answers
+
+    def recommend(self, cust_id: int) -> List[int]:
+        return self.recommend_batch([cust_id])[0]
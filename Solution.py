@@ -1,8 +1,12 @@
-from typing import List, Tuple
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+import psycopg2
 from psycopg2 import sql
 from datetime import date, datetime
 import Utility.DBConnector as Connector
+import Queries
 from Utility.ReturnValue import ReturnValue
+from Utility.Cache import LRUCache
+import Utility.CacheInvalidation as CacheInvalidation
 from Utility.Exceptions import DatabaseException
 from Business.Customer import Customer, BadCustomer
 from Business.Order import Order, BadOrder
@@ -10,9 +14,66 @@ from Business.Dish import Dish, BadDish
 from Business.OrderDish import OrderDish
 
 
+# read-through caches of Dishes, Customers and Orders rows keyed by id. every function that writes a row
+# invalidates it locally, and triggers NOTIFY the other processes, whose listener thread evicts it as well
+dish_cache = LRUCache(max_entries=4096, ttl=60.0)
+customer_cache = LRUCache(max_entries=4096, ttl=60.0)
+order_cache = LRUCache(max_entries=4096, ttl=60.0)
+_caches = {"dish": dish_cache, "customer": customer_cache, "order": order_cache}
+
+
+# the cached row, or None when there is none or when invalidations from other processes could be missed.
+# inside a transaction the cache is bypassed, it cannot see the transaction's own uncommitted writes
+def _cached(cache: LRUCache, key):
+    if Connector.in_transaction() or not CacheInvalidation.ensure_listener(_caches):
+        return None
+    return cache.get(key)
+
+
+# the generation to put fetched rows with, rows read inside a transaction may never commit so they are not cached
+def _cache_generation(cache: LRUCache) -> int:
+    if Connector.in_transaction():
+        return -1
+    return cache.generation()
+
+
+def _clear_caches() -> None:
+    for cache in _caches.values():
+        cache.clear()
+
+
+# ---------------------------------- Transactions: ----------------------------------
+
+
+# groups calls into one unit of work, committed once when the block ends:
+#     with transaction():
+#         add_order(order)
+#         customer_placed_order(customer_id, order.get_order_id())
+# every call still returns its own ReturnValue, a call that fails undoes only itself. to undo everything call
+# rollback() on the transaction or raise out of the block
+def transaction() -> Connector.Transaction:
+    return Connector.Transaction()
+
+
 # ---------------------------------- CRUD API: ----------------------------------
 # Basic database functions
 
+# the transition tables each event of a statement-level trigger can see, as named in the trigger functions
+_TRANSITION_TABLES = {"INSERT": "NEW TABLE AS new_rows",
+                      "UPDATE": "OLD TABLE AS old_rows NEW TABLE AS new_rows",
+                      "DELETE": "OLD TABLE AS old_rows"}
+
+
+# a trigger with transition tables handles a single event, so every event gets its own trigger, <name>_<event>,
+# running the function <name>() once per statement
+def _create_statement_triggers(conn: Connector.DBConnector, name: str, table: str,
+                               events: Tuple[str, ...] = ("INSERT", "UPDATE", "DELETE")) -> None:
+    for event in events:
+        conn.execute("CREATE TRIGGER " + name + "_" + event.lower() + " AFTER " + event + " ON " + table + " "
+                     "REFERENCING " + _TRANSITION_TABLES[event] + " "
+                     "FOR EACH STATEMENT EXECUTE PROCEDURE " + name + "()")
+
+
 def create_tables() -> None:
     conn = None
     try:
@@ -42,26 +103,584 @@ def create_tables() -> None:
                      "FOREIGN KEY (cust_id) REFERENCES Customers(cust_id) ON DELETE CASCADE, "
                      "FOREIGN KEY (dish_id) REFERENCES Dishes(dish_id), "
                      "PRIMARY KEY(cust_id, dish_id))")
+        # secondary indexes for the foreign keys and the analytics access paths, the primary keys only cover
+        # lookups by order_id and by (cust_id, ...)
+        conn.execute("CREATE INDEX CustomerPlacesOrder_cust_id_idx ON CustomerPlacesOrder(cust_id)")
+        conn.execute("CREATE INDEX OrderContainsDish_dish_id_idx ON OrderContainsDish(dish_id)")
+        conn.execute("CREATE INDEX CustomerRatedDish_dish_id_rating_idx ON CustomerRatedDish(dish_id, rating)")
+        conn.execute("CREATE INDEX Orders_date_idx ON Orders(date)")
+        # the total price of every order, kept current by triggers on Orders, OrderContainsDish and
+        # CustomerPlacesOrder so reading a total is a primary key lookup instead of an aggregation.
+        # the triggers run once per statement, so a COPY of many rows updates every order once, and each
+        # recomputes the orders it touched from the tables: a statement writing an order, its customer and its
+        # items at once (place_full_order) fires them in no useful order, and the last one sees the final state.
+        # the rows are locked before recomputing, so concurrent writers of an order take turns and see each other
+        conn.execute("CREATE TABLE OrderTotals(order_id INTEGER NOT NULL, items_total DECIMAL NOT NULL, "
+                     "delivery_fee DECIMAL NOT NULL, cust_id INTEGER, order_date TIMESTAMP(0) NOT NULL, "
+                     "PRIMARY KEY(order_id), "
+                     "FOREIGN KEY (order_id) REFERENCES Orders(order_id) ON DELETE CASCADE)")
+        conn.execute("CREATE OR REPLACE FUNCTION order_totals_on_order() RETURNS TRIGGER AS $$ "
+                     "BEGIN "
+                     "IF TG_OP = 'INSERT' THEN "
+                     "INSERT INTO OrderTotals(order_id, items_total, delivery_fee, cust_id, order_date) "
+                     "SELECT N.order_id, COALESCE((SELECT SUM(I.amount * I.price) FROM OrderContainsDish I "
+                     "WHERE I.order_id = N.order_id), 0), N.delivery_fee, "
+                     "(SELECT P.cust_id FROM CustomerPlacesOrder P WHERE P.order_id = N.order_id), N.date "
+                     "FROM new_rows N; "
+                     "ELSE "
+                     "UPDATE OrderTotals T SET delivery_fee = N.delivery_fee, order_date = N.date "
+                     "FROM new_rows N WHERE T.order_id = N.order_id "
+                     "AND (T.delivery_fee, T.order_date) IS DISTINCT FROM (N.delivery_fee, N.date); "
+                     "END IF; "
+                     "RETURN NULL; "
+                     "END $$ LANGUAGE plpgsql")
+        _create_statement_triggers(conn, "order_totals_on_order", "Orders", ("INSERT", "UPDATE"))
+        conn.execute("CREATE OR REPLACE FUNCTION order_totals_on_item() RETURNS TRIGGER AS $$ "
+                     "DECLARE "
+                     "orders INTEGER[]; "
+                     "BEGIN "
+                     "IF TG_OP <> 'DELETE' THEN "
+                     "SELECT array_agg(order_id) INTO orders FROM new_rows; "
+                     "END IF; "
+                     "IF TG_OP <> 'INSERT' THEN "
+                     "SELECT orders || array_agg(order_id) INTO orders FROM old_rows; "
+                     "END IF; "
+                     "PERFORM 1 FROM OrderTotals WHERE order_id = ANY(orders) ORDER BY order_id FOR UPDATE; "
+                     "UPDATE OrderTotals T SET items_total = S.items_total "
+                     "FROM (SELECT O.order_id, COALESCE(SUM(I.amount * I.price), 0) AS items_total "
+                     "FROM (SELECT DISTINCT unnest(orders) AS order_id) AS O "
+                     "LEFT JOIN OrderContainsDish I ON I.order_id = O.order_id GROUP BY O.order_id) AS S "
+                     "WHERE T.order_id = S.order_id AND T.items_total <> S.items_total; "
+                     "RETURN NULL; "
+                     "END $$ LANGUAGE plpgsql")
+        _create_statement_triggers(conn, "order_totals_on_item", "OrderContainsDish")
+        conn.execute("CREATE OR REPLACE FUNCTION order_totals_on_customer() RETURNS TRIGGER AS $$ "
+                     "DECLARE "
+                     "orders INTEGER[]; "
+                     "BEGIN "
+                     "IF TG_OP <> 'DELETE' THEN "
+                     "SELECT array_agg(order_id) INTO orders FROM new_rows; "
+                     "END IF; "
+                     "IF TG_OP <> 'INSERT' THEN "
+                     "SELECT orders || array_agg(order_id) INTO orders FROM old_rows; "
+                     "END IF; "
+                     "PERFORM 1 FROM OrderTotals WHERE order_id = ANY(orders) ORDER BY order_id FOR UPDATE; "
+                     "UPDATE OrderTotals T SET cust_id = P.cust_id "
+                     "FROM (SELECT DISTINCT unnest(orders) AS order_id) AS O "
+                     "LEFT JOIN CustomerPlacesOrder P ON P.order_id = O.order_id "
+                     "WHERE T.order_id = O.order_id AND T.cust_id IS DISTINCT FROM P.cust_id; "
+                     "RETURN NULL; "
+                     "END $$ LANGUAGE plpgsql")
+        _create_statement_triggers(conn, "order_totals_on_customer", "CustomerPlacesOrder")
+        # the revenue of every month that had an order, rolled up from OrderTotals as the totals change, so a
+        # yearly report reads at most 12 rows whatever the number of orders. the changes of a statement are
+        # summed per month first, a month is written once however many of its orders changed
+        conn.execute("CREATE TABLE MonthlyRevenue(year INTEGER NOT NULL, month INTEGER NOT NULL, "
+                     "revenue DECIMAL NOT NULL, "
+                     "PRIMARY KEY(year, month))")
+        conn.execute("CREATE OR REPLACE FUNCTION monthly_revenue_on_total() RETURNS TRIGGER AS $$ "
+                     "DECLARE "
+                     "dates TIMESTAMP[]; "
+                     "amounts DECIMAL[]; "
+                     "BEGIN "
+                     "IF TG_OP <> 'DELETE' THEN "
+                     "SELECT array_agg(order_date), array_agg(items_total + delivery_fee) INTO dates, amounts "
+                     "FROM new_rows; "
+                     "END IF; "
+                     "IF TG_OP <> 'INSERT' THEN "
+                     "SELECT dates || array_agg(order_date), amounts || array_agg(-(items_total + delivery_fee)) "
+                     "INTO dates, amounts FROM old_rows; "
+                     "END IF; "
+                     "INSERT INTO MonthlyRevenue(year, month, revenue) "
+                     "SELECT EXTRACT(YEAR FROM C.order_date)::integer, EXTRACT(MONTH FROM C.order_date)::integer, "
+                     "SUM(C.revenue) "
+                     "FROM unnest(dates, amounts) AS C(order_date, revenue) GROUP BY 1, 2 "
+                     "HAVING SUM(C.revenue) <> 0 "
+                     "ON CONFLICT (year, month) DO UPDATE SET revenue = MonthlyRevenue.revenue + EXCLUDED.revenue; "
+                     "RETURN NULL; "
+                     "END $$ LANGUAGE plpgsql")
+        _create_statement_triggers(conn, "monthly_revenue_on_total", "OrderTotals")
+        # the number of orders and the money spent by every customer that placed an order, rolled up from
+        # OrderTotals. avg_spend is kept next to them so the biggest spenders are the head of an index.
+        # the average is total_spend / order_count, as AVG(total_price) computes it, and a customer leaves the
+        # table with its last order
+        conn.execute("CREATE TABLE CustomerSpend(cust_id INTEGER NOT NULL, order_count INTEGER NOT NULL, "
+                     "total_spend DECIMAL NOT NULL, avg_spend DECIMAL, "
+                     "PRIMARY KEY(cust_id))")
+        conn.execute("CREATE INDEX CustomerSpend_avg_spend_idx ON CustomerSpend(avg_spend DESC, cust_id)")
+        conn.execute("CREATE OR REPLACE FUNCTION customer_spend_on_total() RETURNS TRIGGER AS $$ "
+                     "DECLARE "
+                     "customers INTEGER[]; "
+                     "amounts DECIMAL[]; "
+                     "counts INTEGER[]; "
+                     "BEGIN "
+                     "IF TG_OP <> 'DELETE' THEN "
+                     "SELECT array_agg(cust_id), array_agg(items_total + delivery_fee), array_agg(1) "
+                     "INTO customers, amounts, counts FROM new_rows WHERE cust_id IS NOT NULL; "
+                     "END IF; "
+                     "IF TG_OP <> 'INSERT' THEN "
+                     "SELECT customers || array_agg(cust_id), amounts || array_agg(-(items_total + delivery_fee)), "
+                     "counts || array_agg(-1) "
+                     "INTO customers, amounts, counts FROM old_rows WHERE cust_id IS NOT NULL; "
+                     "END IF; "
+                     "INSERT INTO CustomerSpend(cust_id, order_count, total_spend, avg_spend) "
+                     "SELECT C.cust_id, SUM(C.orders), SUM(C.spend), SUM(C.spend) / NULLIF(SUM(C.orders), 0) "
+                     "FROM unnest(customers, amounts, counts) AS C(cust_id, spend, orders) GROUP BY C.cust_id "
+                     "HAVING SUM(C.spend) <> 0 OR SUM(C.orders) <> 0 "
+                     "ON CONFLICT (cust_id) DO UPDATE SET "
+                     "order_count = CustomerSpend.order_count + EXCLUDED.order_count, "
+                     "total_spend = CustomerSpend.total_spend + EXCLUDED.total_spend, "
+                     "avg_spend = (CustomerSpend.total_spend + EXCLUDED.total_spend) "
+                     "/ NULLIF(CustomerSpend.order_count + EXCLUDED.order_count, 0); "
+                     "DELETE FROM CustomerSpend WHERE cust_id = ANY(customers) AND order_count = 0; "
+                     "RETURN NULL; "
+                     "END $$ LANGUAGE plpgsql")
+        _create_statement_triggers(conn, "customer_spend_on_total", "OrderTotals")
+        # the amounts of every dish over the anonymous orders, those no customer placed (or whose customer was
+        # deleted). AnonymousOrderItems is the set of items counted in AnonymousDishAmounts, a dish leaves the
+        # table when its last counted item is gone
+        conn.execute("CREATE TABLE AnonymousDishAmounts(dish_id INTEGER NOT NULL, anonymous_amount BIGINT NOT NULL, "
+                     "anonymous_rows INTEGER NOT NULL, "
+                     "PRIMARY KEY(dish_id), "
+                     "FOREIGN KEY (dish_id) REFERENCES Dishes(dish_id) ON DELETE CASCADE)")
+        conn.execute("CREATE INDEX AnonymousDishAmounts_top_idx ON AnonymousDishAmounts(anonymous_amount DESC, dish_id)")
+        conn.execute("CREATE TABLE AnonymousOrderItems(order_id INTEGER NOT NULL, dish_id INTEGER NOT NULL, "
+                     "amount INTEGER NOT NULL, "
+                     "PRIMARY KEY(order_id, dish_id))")
+        # brings the given items of AnonymousOrderItems in line with what is visible now, whatever changed
+        # before, like OrderTotals: the counted items that changed or are gone are taken out, then the visible
+        # ones not counted are added, each dish's amount moving once per statement. the rows of the orders in
+        # OrderTotals are locked first so two transactions changing the same order take turns
+        conn.execute("CREATE OR REPLACE FUNCTION anonymous_dish_amounts_sync(orders INTEGER[], dishes INTEGER[]) "
+                     "RETURNS VOID AS $$ "
+                     "BEGIN "
+                     "PERFORM 1 FROM OrderTotals WHERE order_id = ANY(orders) ORDER BY order_id FOR UPDATE; "
+                     "WITH Items AS (SELECT DISTINCT order_id, dish_id FROM unnest(orders, dishes) AS I(order_id, dish_id)), "
+                     "Gone AS (DELETE FROM AnonymousOrderItems C USING Items I "
+                     "WHERE C.order_id = I.order_id AND C.dish_id = I.dish_id AND NOT EXISTS ("
+                     "SELECT 1 FROM OrderContainsDish V WHERE V.order_id = C.order_id AND V.dish_id = C.dish_id "
+                     "AND V.amount = C.amount AND NOT EXISTS (SELECT 1 FROM CustomerPlacesOrder P "
+                     "WHERE P.order_id = V.order_id AND P.cust_id IS NOT NULL)) "
+                     "RETURNING C.dish_id, C.amount) "
+                     "INSERT INTO AnonymousDishAmounts(dish_id, anonymous_amount, anonymous_rows) "
+                     "SELECT dish_id, -SUM(amount), -COUNT(*) FROM Gone GROUP BY dish_id "
+                     "ON CONFLICT (dish_id) DO UPDATE SET "
+                     "anonymous_amount = AnonymousDishAmounts.anonymous_amount + EXCLUDED.anonymous_amount, "
+                     "anonymous_rows = AnonymousDishAmounts.anonymous_rows + EXCLUDED.anonymous_rows; "
+                     "WITH Items AS (SELECT DISTINCT order_id, dish_id FROM unnest(orders, dishes) AS I(order_id, dish_id)), "
+                     "Counted AS (INSERT INTO AnonymousOrderItems(order_id, dish_id, amount) "
+                     "SELECT V.order_id, V.dish_id, V.amount FROM OrderContainsDish V "
+                     "JOIN Items I ON I.order_id = V.order_id AND I.dish_id = V.dish_id "
+                     "WHERE NOT EXISTS (SELECT 1 FROM CustomerPlacesOrder P "
+                     "WHERE P.order_id = V.order_id AND P.cust_id IS NOT NULL) "
+                     "AND NOT EXISTS (SELECT 1 FROM AnonymousOrderItems C "
+                     "WHERE C.order_id = V.order_id AND C.dish_id = V.dish_id) "
+                     "RETURNING dish_id, amount) "
+                     "INSERT INTO AnonymousDishAmounts(dish_id, anonymous_amount, anonymous_rows) "
+                     "SELECT dish_id, SUM(amount), COUNT(*) FROM Counted GROUP BY dish_id "
+                     "ON CONFLICT (dish_id) DO UPDATE SET "
+                     "anonymous_amount = AnonymousDishAmounts.anonymous_amount + EXCLUDED.anonymous_amount, "
+                     "anonymous_rows = AnonymousDishAmounts.anonymous_rows + EXCLUDED.anonymous_rows; "
+                     "DELETE FROM AnonymousDishAmounts WHERE dish_id = ANY(dishes) AND anonymous_rows = 0; "
+                     "END $$ LANGUAGE plpgsql")
+        conn.execute("CREATE OR REPLACE FUNCTION anonymous_dish_amounts_on_item() RETURNS TRIGGER AS $$ "
+                     "DECLARE "
+                     "orders INTEGER[]; "
+                     "dishes INTEGER[]; "
+                     "BEGIN "
+                     "IF TG_OP <> 'DELETE' THEN "
+                     "SELECT array_agg(order_id), array_agg(dish_id) INTO orders, dishes FROM new_rows; "
+                     "END IF; "
+                     "IF TG_OP <> 'INSERT' THEN "
+                     "SELECT orders || array_agg(order_id), dishes || array_agg(dish_id) INTO orders, dishes "
+                     "FROM old_rows; "
+                     "END IF; "
+                     "PERFORM anonymous_dish_amounts_sync(orders, dishes); "
+                     "RETURN NULL; "
+                     "END $$ LANGUAGE plpgsql")
+        _create_statement_triggers(conn, "anonymous_dish_amounts_on_item", "OrderContainsDish")
+        # every item of the orders, the counted ones and the visible ones. the lock is taken before looking for
+        # them, so items written by a concurrent transaction are seen once it is done
+        conn.execute("CREATE OR REPLACE FUNCTION anonymous_dish_amounts_sync_orders(orders INTEGER[]) "
+                     "RETURNS VOID AS $$ "
+                     "DECLARE "
+                     "item_orders INTEGER[]; "
+                     "item_dishes INTEGER[]; "
+                     "BEGIN "
+                     "PERFORM 1 FROM OrderTotals WHERE order_id = ANY(orders) ORDER BY order_id FOR UPDATE; "
+                     "SELECT array_agg(order_id), array_agg(dish_id) INTO item_orders, item_dishes "
+                     "FROM (SELECT order_id, dish_id FROM OrderContainsDish WHERE order_id = ANY(orders) "
+                     "UNION SELECT order_id, dish_id FROM AnonymousOrderItems WHERE order_id = ANY(orders)) AS I; "
+                     "PERFORM anonymous_dish_amounts_sync(item_orders, item_dishes); "
+                     "END $$ LANGUAGE plpgsql")
+        # a deleted customer turns into cust_id = NULL (ON DELETE SET NULL), which makes the order anonymous again
+        conn.execute("CREATE OR REPLACE FUNCTION anonymous_dish_amounts_on_customer() RETURNS TRIGGER AS $$ "
+                     "DECLARE "
+                     "orders INTEGER[]; "
+                     "BEGIN "
+                     "IF TG_OP <> 'DELETE' THEN "
+                     "SELECT array_agg(order_id) INTO orders FROM new_rows; "
+                     "END IF; "
+                     "IF TG_OP <> 'INSERT' THEN "
+                     "SELECT orders || array_agg(order_id) INTO orders FROM old_rows; "
+                     "END IF; "
+                     "PERFORM anonymous_dish_amounts_sync_orders(orders); "
+                     "RETURN NULL; "
+                     "END $$ LANGUAGE plpgsql")
+        _create_statement_triggers(conn, "anonymous_dish_amounts_on_customer", "CustomerPlacesOrder")
+        # tell the other processes which cached rows changed, see CacheInvalidation
+        conn.execute("CREATE OR REPLACE FUNCTION notify_cache_invalidation() RETURNS TRIGGER AS $$ "
+                     "BEGIN "
+                     "PERFORM pg_notify('" + CacheInvalidation.CHANNEL + "', "
+                     "TG_ARGV[0] || ':' || (row_to_json(OLD) ->> TG_ARGV[1])); "
+                     "RETURN NULL; "
+                     "END $$ LANGUAGE plpgsql")
+        conn.execute("CREATE TRIGGER notify_cache_invalidation AFTER UPDATE OR DELETE ON Dishes "
+                     "FOR EACH ROW EXECUTE PROCEDURE notify_cache_invalidation('dish', 'dish_id')")
+        conn.execute("CREATE TRIGGER notify_cache_invalidation AFTER UPDATE OR DELETE ON Customers "
+                     "FOR EACH ROW EXECUTE PROCEDURE notify_cache_invalidation('customer', 'cust_id')")
+        conn.execute("CREATE TRIGGER notify_cache_invalidation AFTER UPDATE OR DELETE ON Orders "
+                     "FOR EACH ROW EXECUTE PROCEDURE notify_cache_invalidation('order', 'order_id')")
+        conn.execute("NOTIFY " + CacheInvalidation.CHANNEL + ", '*'")
         conn.execute("CREATE VIEW OrderTotalPrice AS "
-                     "SELECT o.order_id, "
-                     "SUM(coalesce((od.amount * od.price), 0)) + o.delivery_fee AS total_price, "
-                     "(SELECT co.cust_id FROM CustomerPlacesOrder co WHERE co.order_id = o.order_id) AS cust_id "
-                     "FROM Orders o LEFT OUTER JOIN OrderContainsDish od ON o.order_id = od.order_id "
-                     "GROUP BY o.order_id")
+                     "SELECT order_id, items_total + delivery_fee AS total_price, cust_id "
+                     "FROM OrderTotals")
+        # running (sum, count) of the ratings of every dish, kept by triggers on Dishes and CustomerRatedDish.
+        # avg_rating is stored with the counters and indexed both ways, so the top and bottom rated dishes are
+        # index range scans. the ratings of a statement are summed per dish, a dish is written once
+        conn.execute("CREATE TABLE DishRatings(dish_id INTEGER NOT NULL, rating_sum INTEGER NOT NULL, "
+                     "rating_count INTEGER NOT NULL, avg_rating DECIMAL NOT NULL, "
+                     "PRIMARY KEY(dish_id), "
+                     "FOREIGN KEY (dish_id) REFERENCES Dishes(dish_id) ON DELETE CASCADE)")
+        conn.execute("CREATE INDEX DishRatings_top_idx ON DishRatings(avg_rating DESC, dish_id)")
+        conn.execute("CREATE INDEX DishRatings_bottom_idx ON DishRatings(avg_rating, dish_id)")
+        conn.execute("CREATE OR REPLACE FUNCTION dish_ratings_on_dish() RETURNS TRIGGER AS $$ "
+                     "BEGIN "
+                     "INSERT INTO DishRatings(dish_id, rating_sum, rating_count, avg_rating) "
+                     "SELECT dish_id, 0, 0, 3 FROM new_rows "
+                     "ON CONFLICT (dish_id) DO NOTHING; "
+                     "RETURN NULL; "
+                     "END $$ LANGUAGE plpgsql")
+        _create_statement_triggers(conn, "dish_ratings_on_dish", "Dishes", ("INSERT",))
+        # a dish nobody rated averages 3, the same default RatingDish always had. with dish_ratings.deferred set
+        # the counters are left alone, for dish_ratings_rebuild to recompute once the statements are done
+        conn.execute("CREATE OR REPLACE FUNCTION dish_ratings_on_rating() RETURNS TRIGGER AS $$ "
+                     "DECLARE "
+                     "dishes INTEGER[]; "
+                     "ratings INTEGER[]; "
+                     "counts INTEGER[]; "
+                     "BEGIN "
+                     "IF current_setting('dish_ratings.deferred', true) = 'on' THEN "
+                     "RETURN NULL; "
+                     "END IF; "
+                     "IF TG_OP <> 'DELETE' THEN "
+                     "SELECT array_agg(dish_id), array_agg(rating), array_agg(1) INTO dishes, ratings, counts "
+                     "FROM new_rows; "
+                     "END IF; "
+                     "IF TG_OP <> 'INSERT' THEN "
+                     "SELECT dishes || array_agg(dish_id), ratings || array_agg(-rating), counts || array_agg(-1) "
+                     "INTO dishes, ratings, counts FROM old_rows; "
+                     "END IF; "
+                     "INSERT INTO DishRatings(dish_id, rating_sum, rating_count, avg_rating) "
+                     "SELECT C.dish_id, SUM(C.rating), SUM(C.ratings), "
+                     "COALESCE(SUM(C.rating)::numeric / NULLIF(SUM(C.ratings), 0), 3) "
+                     "FROM unnest(dishes, ratings, counts) AS C(dish_id, rating, ratings) GROUP BY C.dish_id "
+                     "HAVING SUM(C.rating) <> 0 OR SUM(C.ratings) <> 0 "
+                     "ON CONFLICT (dish_id) DO UPDATE SET "
+                     "rating_sum = DishRatings.rating_sum + EXCLUDED.rating_sum, "
+                     "rating_count = DishRatings.rating_count + EXCLUDED.rating_count, "
+                     "avg_rating = COALESCE((DishRatings.rating_sum + EXCLUDED.rating_sum)::numeric "
+                     "/ NULLIF(DishRatings.rating_count + EXCLUDED.rating_count, 0), 3); "
+                     "RETURN NULL; "
+                     "END $$ LANGUAGE plpgsql")
+        _create_statement_triggers(conn, "dish_ratings_on_rating", "CustomerRatedDish")
+        # recomputes the counters of every dish from CustomerRatedDish. the rows are locked before they are summed,
+        # so a rating committed meanwhile is either in the sums or adds itself after the rebuild, never lost
+        conn.execute("CREATE OR REPLACE FUNCTION dish_ratings_rebuild() RETURNS VOID AS $$ "
+                     "BEGIN "
+                     "PERFORM 1 FROM DishRatings ORDER BY dish_id FOR UPDATE; "
+                     "UPDATE DishRatings D SET rating_sum = S.rating_sum, rating_count = S.rating_count, "
+                     "avg_rating = COALESCE(S.rating_sum::numeric / NULLIF(S.rating_count, 0), 3) "
+                     "FROM (SELECT C.dish_id, COALESCE(SUM(R.rating), 0) AS rating_sum, "
+                     "COUNT(R.rating) AS rating_count "
+                     "FROM DishRatings C LEFT JOIN CustomerRatedDish R ON R.dish_id = C.dish_id "
+                     "GROUP BY C.dish_id) AS S "
+                     "WHERE D.dish_id = S.dish_id "
+                     "AND (D.rating_sum, D.rating_count) IS DISTINCT FROM (S.rating_sum, S.rating_count); "
+                     "END $$ LANGUAGE plpgsql")
+        # connected components of the customers, two customers being linked when both rated the same dish 4 or
+        # more. only customers and dishes with such a rating have a row, everybody else is alone in their
+        # component. the ratings >= 4 added by a statement merge the components they touch into the largest of
+        # them, relabeling the others, and the ones removed regroup a component only when it may have been cut.
+        # SimilarityComponents counts the customers and dishes of every component
+        conn.execute("CREATE SEQUENCE CustomerSimilarity_component_seq")
+        conn.execute("CREATE TABLE SimilarityComponents(component_id INTEGER NOT NULL, size INTEGER NOT NULL, "
+                     "PRIMARY KEY(component_id))")
+        conn.execute("CREATE TABLE CustomerSimilarity(cust_id INTEGER NOT NULL, component_id INTEGER NOT NULL, "
+                     "PRIMARY KEY(cust_id))")
+        conn.execute("CREATE INDEX CustomerSimilarity_component_id_idx ON CustomerSimilarity(component_id)")
+        conn.execute("CREATE TABLE DishSimilarity(dish_id INTEGER NOT NULL, component_id INTEGER NOT NULL, "
+                     "PRIMARY KEY(dish_id))")
+        conn.execute("CREATE INDEX DishSimilarity_component_id_idx ON DishSimilarity(component_id)")
+        # the components are computed over a graph in temporary tables, whose nodes are the customers (3 * cust_id),
+        # the dishes (3 * dish_id + 1) and the existing components (3 * component_id + 2)
+        conn.execute("CREATE OR REPLACE FUNCTION customer_similarity_scratch() RETURNS VOID AS $$ "
+                     "BEGIN "
+                     "IF to_regclass('pg_temp.similarity_edges') IS NULL THEN "
+                     "CREATE TEMP TABLE similarity_edges(a BIGINT NOT NULL, b BIGINT NOT NULL) ON COMMIT DELETE ROWS; "
+                     "CREATE TEMP TABLE similarity_labels(node BIGINT NOT NULL, label BIGINT NOT NULL, "
+                     "PRIMARY KEY(node)) ON COMMIT DELETE ROWS; "
+                     "CREATE TEMP TABLE similarity_groups(label BIGINT NOT NULL, component_id INTEGER NOT NULL, "
+                     "size INTEGER, PRIMARY KEY(label)) ON COMMIT DELETE ROWS; "
+                     "ELSE "
+                     "TRUNCATE similarity_edges, similarity_labels, similarity_groups; "
+                     "END IF; "
+                     "END $$ LANGUAGE plpgsql")
+        # labels every node of similarity_edges with the smallest node of its connected component: each round a
+        # node takes the smallest label of its neighbours, then the label of its label
+        conn.execute("CREATE OR REPLACE FUNCTION customer_similarity_connect() RETURNS VOID AS $$ "
+                     "DECLARE "
+                     "changed BIGINT; "
+                     "BEGIN "
+                     "INSERT INTO similarity_labels(node, label) "
+                     "SELECT node, node FROM (SELECT a FROM similarity_edges UNION SELECT b FROM similarity_edges) "
+                     "AS N(node); "
+                     "ANALYZE similarity_edges; "
+                     "ANALYZE similarity_labels; "
+                     "LOOP "
+                     "UPDATE similarity_labels L SET label = M.label "
+                     "FROM (SELECT node, MIN(label) AS label FROM ("
+                     "SELECT E.a AS node, N.label FROM similarity_edges E JOIN similarity_labels N ON N.node = E.b "
+                     "UNION ALL "
+                     "SELECT E.b, N.label FROM similarity_edges E JOIN similarity_labels N ON N.node = E.a) AS P "
+                     "GROUP BY node) AS M "
+                     "WHERE L.node = M.node AND M.label < L.label; "
+                     "GET DIAGNOSTICS changed = ROW_COUNT; "
+                     "EXIT WHEN changed = 0; "
+                     "UPDATE similarity_labels L SET label = P.label FROM similarity_labels P "
+                     "WHERE P.node = L.label AND P.label < L.label; "
+                     "END LOOP; "
+                     "END $$ LANGUAGE plpgsql")
+        # adds the given links, which are already in CustomerRatedDish. the links and the components of their
+        # customers and dishes are grouped, and every group goes into its largest component, or a new one, so
+        # a customer or a dish is relabeled only when its component is merged into a larger one
+        conn.execute("CREATE OR REPLACE FUNCTION customer_similarity_merge(customers INTEGER[], dishes INTEGER[]) "
+                     "RETURNS VOID AS $$ "
+                     "BEGIN "
+                     "PERFORM customer_similarity_scratch(); "
+                     "INSERT INTO similarity_edges(a, b) "
+                     "SELECT 3 * E.cust_id::bigint, 3 * E.dish_id::bigint + 1 "
+                     "FROM unnest(customers, dishes) AS E(cust_id, dish_id) "
+                     "UNION SELECT 3 * C.cust_id::bigint, 3 * C.component_id::bigint + 2 "
+                     "FROM CustomerSimilarity C WHERE C.cust_id = ANY(customers) "
+                     "UNION SELECT 3 * D.dish_id::bigint + 1, 3 * D.component_id::bigint + 2 "
+                     "FROM DishSimilarity D WHERE D.dish_id = ANY(dishes); "
+                     "PERFORM customer_similarity_connect(); "
+                     "INSERT INTO similarity_groups(label, component_id) "
+                     "SELECT DISTINCT ON (L.label) L.label, S.component_id FROM similarity_labels L "
+                     "JOIN SimilarityComponents S ON S.component_id = L.node / 3 WHERE L.node % 3 = 2 "
+                     "ORDER BY L.label, S.size DESC, S.component_id; "
+                     "INSERT INTO similarity_groups(label, component_id) "
+                     "SELECT G.label, nextval('CustomerSimilarity_component_seq') "
+                     "FROM (SELECT DISTINCT label FROM similarity_labels) AS G "
+                     "WHERE NOT EXISTS (SELECT 1 FROM similarity_groups W WHERE W.label = G.label); "
+                     "UPDATE CustomerSimilarity C SET component_id = G.component_id "
+                     "FROM similarity_labels L JOIN similarity_groups G ON G.label = L.label "
+                     "WHERE L.node % 3 = 2 AND C.component_id = L.node / 3 AND C.component_id <> G.component_id; "
+                     "UPDATE DishSimilarity D SET component_id = G.component_id "
+                     "FROM similarity_labels L JOIN similarity_groups G ON G.label = L.label "
+                     "WHERE L.node % 3 = 2 AND D.component_id = L.node / 3 AND D.component_id <> G.component_id; "
+                     "WITH Customers AS (INSERT INTO CustomerSimilarity(cust_id, component_id) "
+                     "SELECT L.node / 3, G.component_id FROM similarity_labels L "
+                     "JOIN similarity_groups G ON G.label = L.label WHERE L.node % 3 = 0 "
+                     "ON CONFLICT (cust_id) DO NOTHING RETURNING component_id), "
+                     "Dishes AS (INSERT INTO DishSimilarity(dish_id, component_id) "
+                     "SELECT L.node / 3, G.component_id FROM similarity_labels L "
+                     "JOIN similarity_groups G ON G.label = L.label WHERE L.node % 3 = 1 "
+                     "ON CONFLICT (dish_id) DO NOTHING RETURNING component_id), "
+                     "Merged AS (SELECT G.component_id, S.size FROM similarity_labels L "
+                     "JOIN similarity_groups G ON G.label = L.label "
+                     "JOIN SimilarityComponents S ON S.component_id = L.node / 3 WHERE L.node % 3 = 2) "
+                     "INSERT INTO SimilarityComponents(component_id, size) "
+                     "SELECT component_id, SUM(size) FROM (SELECT component_id, 1 AS size FROM Customers "
+                     "UNION ALL SELECT component_id, 1 FROM Dishes "
+                     "UNION ALL SELECT component_id, size FROM Merged) AS M GROUP BY component_id "
+                     "ON CONFLICT (component_id) DO UPDATE SET size = EXCLUDED.size; "
+                     "DELETE FROM SimilarityComponents S "
+                     "USING similarity_labels L JOIN similarity_groups G ON G.label = L.label "
+                     "WHERE L.node % 3 = 2 AND S.component_id = L.node / 3 AND S.component_id <> G.component_id; "
+                     "END $$ LANGUAGE plpgsql")
+        # splits the given components into their connected pieces, the largest piece keeps the id
+        conn.execute("CREATE OR REPLACE FUNCTION customer_similarity_regroup(components INTEGER[]) "
+                     "RETURNS VOID AS $$ "
+                     "BEGIN "
+                     "PERFORM customer_similarity_scratch(); "
+                     "INSERT INTO similarity_edges(a, b) "
+                     "SELECT 3 * R.cust_id::bigint, 3 * R.dish_id::bigint + 1 FROM CustomerSimilarity C "
+                     "JOIN CustomerRatedDish R ON R.cust_id = C.cust_id AND R.rating >= 4 "
+                     "WHERE C.component_id = ANY(components); "
+                     "PERFORM customer_similarity_connect(); "
+                     "INSERT INTO similarity_groups(label, component_id, size) "
+                     "SELECT label, CASE WHEN rank = 1 THEN component_id "
+                     "ELSE nextval('CustomerSimilarity_component_seq') END, size "
+                     "FROM (SELECT P.*, row_number() OVER (PARTITION BY P.component_id "
+                     "ORDER BY P.size DESC, P.label) AS rank "
+                     "FROM (SELECT L.label, MIN(C.component_id) AS component_id, COUNT(*) AS size "
+                     "FROM similarity_labels L "
+                     "LEFT JOIN CustomerSimilarity C ON L.node % 3 = 0 AND C.cust_id = L.node / 3 "
+                     "GROUP BY L.label) AS P) AS R; "
+                     "UPDATE CustomerSimilarity C SET component_id = G.component_id "
+                     "FROM similarity_labels L JOIN similarity_groups G ON G.label = L.label "
+                     "WHERE L.node % 3 = 0 AND C.cust_id = L.node / 3 AND C.component_id <> G.component_id; "
+                     "UPDATE DishSimilarity D SET component_id = G.component_id "
+                     "FROM similarity_labels L JOIN similarity_groups G ON G.label = L.label "
+                     "WHERE L.node % 3 = 1 AND D.dish_id = L.node / 3 AND D.component_id <> G.component_id; "
+                     "INSERT INTO SimilarityComponents(component_id, size) "
+                     "SELECT component_id, size FROM similarity_groups "
+                     "ON CONFLICT (component_id) DO UPDATE SET size = EXCLUDED.size; "
+                     "END $$ LANGUAGE plpgsql")
+        # removes the given links, which are already gone from CustomerRatedDish
+        conn.execute("CREATE OR REPLACE FUNCTION customer_similarity_split(customers INTEGER[], dishes INTEGER[]) "
+                     "RETURNS VOID AS $$ "
+                     "DECLARE "
+                     "emptied INTEGER[]; "
+                     "cut INTEGER[]; "
+                     "BEGIN "
+                     # a customer or a dish left without a link leaves its component
+                     "WITH Customers AS (DELETE FROM CustomerSimilarity C WHERE C.cust_id = ANY(customers) "
+                     "AND NOT EXISTS (SELECT 1 FROM CustomerRatedDish R WHERE R.cust_id = C.cust_id AND R.rating >= 4) "
+                     "RETURNING component_id), "
+                     "Dishes AS (DELETE FROM DishSimilarity D WHERE D.dish_id = ANY(dishes) "
+                     "AND NOT EXISTS (SELECT 1 FROM CustomerRatedDish R WHERE R.dish_id = D.dish_id AND R.rating >= 4) "
+                     "RETURNING component_id), "
+                     "Shrunk AS (UPDATE SimilarityComponents S SET size = S.size - G.size "
+                     "FROM (SELECT component_id, COUNT(*) AS size FROM (SELECT component_id FROM Customers "
+                     "UNION ALL SELECT component_id FROM Dishes) AS M GROUP BY component_id) AS G "
+                     "WHERE S.component_id = G.component_id RETURNING S.component_id, S.size) "
+                     "SELECT array_agg(component_id) INTO emptied FROM Shrunk WHERE size = 0; "
+                     "DELETE FROM SimilarityComponents WHERE component_id = ANY(emptied); "
+                     # a link may have cut its component when a customer or a dish lost several links and is gone,
+                     # or when both ends stay and no other dish of the customer, rated that high by somebody who
+                     # rated this one that high, still links them
+                     "SELECT array_agg(DISTINCT COALESCE(C.component_id, D.component_id)) INTO cut "
+                     "FROM (SELECT cust_id, dish_id, COUNT(*) OVER (PARTITION BY cust_id) AS customer_links, "
+                     "COUNT(*) OVER (PARTITION BY dish_id) AS dish_links "
+                     "FROM unnest(customers, dishes) AS L(cust_id, dish_id)) AS E "
+                     "LEFT JOIN CustomerSimilarity C ON C.cust_id = E.cust_id "
+                     "LEFT JOIN DishSimilarity D ON D.dish_id = E.dish_id "
+                     "WHERE CASE WHEN C.cust_id IS NULL AND D.dish_id IS NULL THEN false "
+                     "WHEN C.cust_id IS NULL THEN E.customer_links > 1 "
+                     "WHEN D.dish_id IS NULL THEN E.dish_links > 1 "
+                     "ELSE NOT EXISTS (SELECT 1 FROM CustomerRatedDish Mine "
+                     "JOIN CustomerRatedDish Shared ON Shared.dish_id = Mine.dish_id AND Shared.rating >= 4 "
+                     "AND Shared.cust_id <> E.cust_id "
+                     "JOIN CustomerRatedDish Theirs ON Theirs.cust_id = Shared.cust_id AND Theirs.dish_id = E.dish_id "
+                     "AND Theirs.rating >= 4 "
+                     "WHERE Mine.cust_id = E.cust_id AND Mine.rating >= 4) END; "
+                     "IF cut IS NOT NULL THEN "
+                     "PERFORM customer_similarity_regroup(cut); "
+                     "END IF; "
+                     "END $$ LANGUAGE plpgsql")
+        # computes every component again, for bulk loads that skipped the trigger (see add_ratings)
+        conn.execute("CREATE OR REPLACE FUNCTION customer_similarity_rebuild() RETURNS VOID AS $$ "
+                     "BEGIN "
+                     "LOCK TABLE SimilarityComponents IN SHARE ROW EXCLUSIVE MODE; "
+                     "DELETE FROM CustomerSimilarity; "
+                     "DELETE FROM DishSimilarity; "
+                     "DELETE FROM SimilarityComponents; "
+                     "PERFORM customer_similarity_merge(L.customers, L.dishes) "
+                     "FROM (SELECT array_agg(cust_id) AS customers, array_agg(dish_id) AS dishes "
+                     "FROM CustomerRatedDish WHERE rating >= 4) AS L; "
+                     "END $$ LANGUAGE plpgsql")
+        conn.execute("CREATE OR REPLACE FUNCTION customer_similarity_on_rating() RETURNS TRIGGER AS $$ "
+                     "DECLARE "
+                     "added_customers INTEGER[]; "
+                     "added_dishes INTEGER[]; "
+                     "removed_customers INTEGER[]; "
+                     "removed_dishes INTEGER[]; "
+                     "BEGIN "
+                     "IF current_setting('customer_similarity.deferred', true) = 'on' THEN "
+                     "RETURN NULL; "
+                     "END IF; "
+                     "IF TG_OP = 'INSERT' THEN "
+                     "SELECT array_agg(cust_id), array_agg(dish_id) INTO added_customers, added_dishes "
+                     "FROM new_rows WHERE rating >= 4; "
+                     "ELSIF TG_OP = 'DELETE' THEN "
+                     "SELECT array_agg(cust_id), array_agg(dish_id) INTO removed_customers, removed_dishes "
+                     "FROM old_rows WHERE rating >= 4; "
+                     "ELSE "
+                     "SELECT array_agg(cust_id), array_agg(dish_id) INTO added_customers, added_dishes "
+                     "FROM (SELECT cust_id, dish_id FROM new_rows WHERE rating >= 4 "
+                     "EXCEPT SELECT cust_id, dish_id FROM old_rows WHERE rating >= 4) AS A; "
+                     "SELECT array_agg(cust_id), array_agg(dish_id) INTO removed_customers, removed_dishes "
+                     "FROM (SELECT cust_id, dish_id FROM old_rows WHERE rating >= 4 "
+                     "EXCEPT SELECT cust_id, dish_id FROM new_rows WHERE rating >= 4) AS R; "
+                     "END IF; "
+                     "IF added_customers IS NULL AND removed_customers IS NULL THEN "
+                     "RETURN NULL; "
+                     "END IF; "
+                     # merging and splitting relabel whole components, which a concurrent statement could be merging
+                     # or splitting too, so the statements changing ratings >= 4 take turns, and a waiting one sees
+                     # what the previous one committed. the lock is taken once per statement, conflicts with
+                     # nothing but itself (readers of the components never wait) and bulk loads rebuild instead
+                     "LOCK TABLE SimilarityComponents IN SHARE ROW EXCLUSIVE MODE; "
+                     # merging first leaves every link of CustomerRatedDish inside one component, so a regroup
+                     # only reads the links of the components it splits
+                     "IF added_customers IS NOT NULL THEN "
+                     "PERFORM customer_similarity_merge(added_customers, added_dishes); "
+                     "END IF; "
+                     "IF removed_customers IS NOT NULL THEN "
+                     "PERFORM customer_similarity_split(removed_customers, removed_dishes); "
+                     "END IF; "
+                     "RETURN NULL; "
+                     "END $$ LANGUAGE plpgsql")
+        _create_statement_triggers(conn, "customer_similarity_on_rating", "CustomerRatedDish")
         conn.execute("CREATE VIEW RatingDish AS "
-                     "SELECT D.dish_id, "
-                     "coalesce(AVG(C.rating), 3) AS avg_rating "
-                     "FROM Dishes D "
-                     "LEFT JOIN CustomerRatedDish C ON D.dish_id = C.dish_id "
-                     "GROUP BY D.dish_id ")
+                     "SELECT dish_id, avg_rating "
+                     "FROM DishRatings")
         conn.execute("CREATE VIEW CustomerOrderedDish AS "
                      "SELECT  C.cust_id, O.dish_id "
                      "FROM CustomerPlacesOrder C, OrderContainsDish O "
                      "WHERE C.order_id = O.order_id AND C.cust_id IS NOT NULL ")
+        # running (sum of amounts, number of orders) of every price a dish was ordered at, kept by a trigger on
+        # OrderContainsDish, so a dish's price history is a few rows of the primary key
+        conn.execute("CREATE TABLE DishPriceStats(dish_id INTEGER NOT NULL, price DECIMAL NOT NULL, "
+                     "amount_sum BIGINT NOT NULL, order_count INTEGER NOT NULL, "
+                     "PRIMARY KEY(dish_id, price), "
+                     "FOREIGN KEY (dish_id) REFERENCES Dishes(dish_id) ON DELETE CASCADE)")
+        conn.execute("CREATE OR REPLACE FUNCTION dish_price_stats_on_item() RETURNS TRIGGER AS $$ "
+                     "DECLARE "
+                     "dishes INTEGER[]; "
+                     "prices DECIMAL[]; "
+                     "amounts INTEGER[]; "
+                     "counts INTEGER[]; "
+                     "BEGIN "
+                     "IF TG_OP <> 'DELETE' THEN "
+                     "SELECT array_agg(dish_id), array_agg(price), array_agg(amount), array_agg(1) "
+                     "INTO dishes, prices, amounts, counts FROM new_rows; "
+                     "END IF; "
+                     "IF TG_OP <> 'INSERT' THEN "
+                     "SELECT dishes || array_agg(dish_id), prices || array_agg(price), amounts || array_agg(-amount), "
+                     "counts || array_agg(-1) "
+                     "INTO dishes, prices, amounts, counts FROM old_rows; "
+                     "END IF; "
+                     "INSERT INTO DishPriceStats(dish_id, price, amount_sum, order_count) "
+                     "SELECT C.dish_id, C.price, SUM(C.amount), SUM(C.orders) "
+                     "FROM unnest(dishes, prices, amounts, counts) AS C(dish_id, price, amount, orders) "
+                     "GROUP BY C.dish_id, C.price "
+                     "HAVING SUM(C.amount) <> 0 OR SUM(C.orders) <> 0 "
+                     "ON CONFLICT (dish_id, price) DO UPDATE SET "
+                     "amount_sum = DishPriceStats.amount_sum + EXCLUDED.amount_sum, "
+                     "order_count = DishPriceStats.order_count + EXCLUDED.order_count; "
+                     "DELETE FROM DishPriceStats S USING unnest(dishes, prices) AS C(dish_id, price) "
+                     "WHERE S.dish_id = C.dish_id AND S.price = C.price AND S.order_count = 0; "
+                     "RETURN NULL; "
+                     "END $$ LANGUAGE plpgsql")
+        _create_statement_triggers(conn, "dish_price_stats_on_item", "OrderContainsDish")
+        # the numeric division is the one AVG(amount) makes, so the averages compare exactly as before
         conn.execute("CREATE VIEW AverageProfitPerOrderPerPrice AS "
-                     "SELECT O.dish_id, O.price, (AVG(O.amount) * O.price) AS average_price "
-                     "FROM OrderContainsDish O "
-                     "GROUP BY O.price, O.dish_id")
+                     "SELECT dish_id, price, (amount_sum::numeric / order_count * price) AS average_price "
+                     "FROM DishPriceStats")
     except DatabaseException.ConnectionInvalid as e:
         print(e)
     except DatabaseException.NOT_NULL_VIOLATION as e:
@@ -77,18 +696,25 @@ def create_tables() -> None:
     finally:
         # will happen any way after try termination or exception handling
         conn.close()
+        _clear_caches()
 
 
 def clear_tables() -> None:
     conn = None
     try:
         conn = Connector.DBConnector()
+        # emptied first, so deleting the ratings finds no component left to regroup
+        conn.execute("DELETE FROM CustomerSimilarity")
+        conn.execute("DELETE FROM DishSimilarity")
+        conn.execute("DELETE FROM SimilarityComponents")
         conn.execute("DELETE FROM CustomerRatedDish")
         conn.execute("DELETE FROM OrderContainsDish")
         conn.execute("DELETE FROM CustomerPlacesOrder")
         conn.execute("DELETE FROM Dishes")
         conn.execute("DELETE FROM Orders")
         conn.execute("DELETE FROM Customers")
+        conn.execute("DELETE FROM MonthlyRevenue")
+        conn.execute("DELETE FROM CustomerSpend")
     except DatabaseException.ConnectionInvalid as e:
         print(e)
     except DatabaseException.NOT_NULL_VIOLATION as e:
@@ -104,6 +730,7 @@ def clear_tables() -> None:
     finally:
         # will happen any way after try termination or exception handling
         conn.close()
+        _clear_caches()
 
 
 def drop_tables() -> None:
@@ -114,12 +741,45 @@ def drop_tables() -> None:
         conn.execute("DROP VIEW IF EXISTS RatingDish")
         conn.execute("DROP VIEW IF EXISTS CustomerOrderedDish")
         conn.execute("DROP VIEW IF EXISTS AverageProfitPerOrderPerPrice")
+        conn.execute("DROP TABLE IF EXISTS OrderTotals CASCADE")
+        conn.execute("DROP TABLE IF EXISTS MonthlyRevenue CASCADE")
+        conn.execute("DROP TABLE IF EXISTS CustomerSpend CASCADE")
+        conn.execute("DROP TABLE IF EXISTS AnonymousDishAmounts CASCADE")
+        conn.execute("DROP TABLE IF EXISTS AnonymousOrderItems CASCADE")
+        conn.execute("DROP TABLE IF EXISTS DishRatings CASCADE")
+        conn.execute("DROP TABLE IF EXISTS DishPriceStats CASCADE")
+        conn.execute("DROP TABLE IF EXISTS CustomerSimilarity CASCADE")
+        conn.execute("DROP TABLE IF EXISTS DishSimilarity CASCADE")
+        conn.execute("DROP TABLE IF EXISTS SimilarityComponents CASCADE")
+        conn.execute("DROP SEQUENCE IF EXISTS CustomerSimilarity_component_seq")
         conn.execute("DROP TABLE IF EXISTS CustomerRatedDish CASCADE")
         conn.execute("DROP TABLE IF EXISTS OrderContainsDish CASCADE")
         conn.execute("DROP TABLE IF EXISTS CustomerPlacesOrder CASCADE")
         conn.execute("DROP TABLE IF EXISTS Dishes CASCADE")
         conn.execute("DROP TABLE IF EXISTS Orders CASCADE")
         conn.execute("DROP TABLE IF EXISTS Customers CASCADE")
+        conn.execute("DROP FUNCTION IF EXISTS notify_cache_invalidation() CASCADE")
+        conn.execute("NOTIFY " + CacheInvalidation.CHANNEL + ", '*'")
+        conn.execute("DROP FUNCTION IF EXISTS order_totals_on_order() CASCADE")
+        conn.execute("DROP FUNCTION IF EXISTS order_totals_on_item() CASCADE")
+        conn.execute("DROP FUNCTION IF EXISTS order_totals_on_customer() CASCADE")
+        conn.execute("DROP FUNCTION IF EXISTS monthly_revenue_on_total() CASCADE")
+        conn.execute("DROP FUNCTION IF EXISTS customer_spend_on_total() CASCADE")
+        conn.execute("DROP FUNCTION IF EXISTS anonymous_dish_amounts_on_item() CASCADE")
+        conn.execute("DROP FUNCTION IF EXISTS anonymous_dish_amounts_on_customer() CASCADE")
+        conn.execute("DROP FUNCTION IF EXISTS anonymous_dish_amounts_sync_orders(INTEGER[]) CASCADE")
+        conn.execute("DROP FUNCTION IF EXISTS anonymous_dish_amounts_sync(INTEGER[], INTEGER[]) CASCADE")
+        conn.execute("DROP FUNCTION IF EXISTS dish_ratings_on_dish() CASCADE")
+        conn.execute("DROP FUNCTION IF EXISTS dish_ratings_on_rating() CASCADE")
+        conn.execute("DROP FUNCTION IF EXISTS dish_ratings_rebuild() CASCADE")
+        conn.execute("DROP FUNCTION IF EXISTS dish_price_stats_on_item() CASCADE")
+        conn.execute("DROP FUNCTION IF EXISTS customer_similarity_on_rating() CASCADE")
+        conn.execute("DROP FUNCTION IF EXISTS customer_similarity_rebuild() CASCADE")
+        conn.execute("DROP FUNCTION IF EXISTS customer_similarity_split(INTEGER[], INTEGER[]) CASCADE")
+        conn.execute("DROP FUNCTION IF EXISTS customer_similarity_regroup(INTEGER[]) CASCADE")
+        conn.execute("DROP FUNCTION IF EXISTS customer_similarity_merge(INTEGER[], INTEGER[]) CASCADE")
+        conn.execute("DROP FUNCTION IF EXISTS customer_similarity_connect() CASCADE")
+        conn.execute("DROP FUNCTION IF EXISTS customer_similarity_scratch() CASCADE")
     except DatabaseException.ConnectionInvalid as e:
         print(e)
     except DatabaseException.NOT_NULL_VIOLATION as e:
@@ -135,6 +795,7 @@ def drop_tables() -> None:
     finally:
         # will happen any way after try termination or exception handling
         conn.close()
+        _clear_caches()
 
 
 # CRUD API
@@ -143,13 +804,9 @@ def add_customer(customer: Customer) -> ReturnValue:
     conn = None
     try:
         conn = Connector.DBConnector()
-        query= sql.SQL("INSERT INTO Customers(cust_id, full_name, age, phone) "
-                       "VALUES ({cust_id}, {full_name}, {age}, {phone})").format(
-            cust_id=sql.Literal(customer.get_cust_id()),
-            full_name=sql.Literal(customer.get_full_name()),
-            age=sql.Literal(customer.get_age()),
-            phone=sql.Literal(customer.get_phone()))
-        rows_effected, _ = conn.execute(query)
+        rows_effected, _ = conn.execute_prepared(
+            Queries.ADD_CUSTOMER,
+            (customer.get_cust_id(), customer.get_full_name(), customer.get_age(), customer.get_phone()))
     except DatabaseException.ConnectionInvalid as e:
         print(e)
         return ReturnValue.ERROR
@@ -171,15 +828,18 @@ def add_customer(customer: Customer) -> ReturnValue:
 
 
 def get_customer(customer_id: int) -> Customer:
+    row = _cached(customer_cache, customer_id)
+    if row is not None:
+        return Customer(row[0], row[1], row[2], row[3])
+    generation = _cache_generation(customer_cache)
     conn = None
     try:
         conn = Connector.DBConnector()
-        query= sql.SQL("SELECT * FROM Customers WHERE cust_id = {customer_id}").format(
-            customer_id=sql.Literal(customer_id))
-        rows_effected, result = conn.execute(query)
+        rows_effected, result = conn.execute_prepared(Queries.GET_CUSTOMER, (customer_id,))
         if rows_effected == 1:
             row = result.rows[0]
             customer = Customer(row[0], row[1], row[2], row[3])
+            customer_cache.put(customer_id, row, generation)
         else :
             customer = BadCustomer()
     except DatabaseException.ConnectionInvalid as e:
@@ -205,9 +865,7 @@ def delete_customer(customer_id: int) -> ReturnValue:
    conn = None
    try:
        conn = Connector.DBConnector()
-       query = sql.SQL("DELETE FROM Customers WHERE cust_id = {customer_id}").format(
-           customer_id=sql.Literal(customer_id))
-       rows_effected, _ = conn.execute(query)
+       rows_effected, _ = conn.execute_prepared(Queries.DELETE_CUSTOMER, (customer_id,))
        if rows_effected == 0:
             return ReturnValue.NOT_EXISTS
    except DatabaseException.ConnectionInvalid:
@@ -222,20 +880,16 @@ def delete_customer(customer_id: int) -> ReturnValue:
        return ReturnValue.NOT_EXISTS
    finally:
        conn.close()
+       customer_cache.invalidate(customer_id)
    return ReturnValue.OK
 
 def add_order(order: Order) -> ReturnValue:
     conn = None
     try:
        conn = Connector.DBConnector()
-       query =sql.SQL(
-            "INSERT INTO Orders(order_id, date, delivery_fee, delivery_adress) "
-            "VALUES({order_id}, {date}, {delivery_fee}, {delivery_adress})").format(
-            order_id=sql.Literal(order.get_order_id()),
-            date=sql.Literal(order.get_datetime()),
-            delivery_fee=sql.Literal(order.get_delivery_fee()),
-            delivery_adress=sql.Literal(order.get_delivery_address()))
-       rows_effected, _ = conn.execute(query)
+       rows_effected, _ = conn.execute_prepared(
+           Queries.ADD_ORDER,
+           (order.get_order_id(), order.get_datetime(), order.get_delivery_fee(), order.get_delivery_address()))
     except DatabaseException.ConnectionInvalid:
         return ReturnValue.ERROR
     except DatabaseException.NOT_NULL_VIOLATION:
@@ -252,15 +906,18 @@ def add_order(order: Order) -> ReturnValue:
 
 
 def get_order(order_id: int) -> Order:
+    row = _cached(order_cache, order_id)
+    if row is not None:
+        return Order(row[0], row[1], row[2], row[3])
+    generation = _cache_generation(order_cache)
     conn = None
     try:
         conn = Connector.DBConnector()
-        query = sql.SQL("SELECT * FROM Orders WHERE order_id = {order_id}").format(
-            order_id=sql.Literal(order_id))
-        rows_effected, result = conn.execute(query)
+        rows_effected, result = conn.execute_prepared(Queries.GET_ORDER, (order_id,))
         if rows_effected == 1:
             row = result.rows[0]
             order = Order(row[0], row[1], row[2], row[3])
+            order_cache.put(order_id, row, generation)
         else:
             order = BadOrder()
     except Exception:
@@ -274,9 +931,7 @@ def delete_order(order_id: int) -> ReturnValue:
     conn = None
     try:
         conn = Connector.DBConnector()
-        query = sql.SQL("DELETE FROM Orders WHERE order_id = {order_id}").format(
-            order_id=sql.Literal(order_id))
-        rows_effected, _ = conn.execute(query)
+        rows_effected, _ = conn.execute_prepared(Queries.DELETE_ORDER, (order_id,))
         if rows_effected == 0:
             return ReturnValue.NOT_EXISTS
     except DatabaseException.ConnectionInvalid:
@@ -291,6 +946,7 @@ def delete_order(order_id: int) -> ReturnValue:
         return ReturnValue.NOT_EXISTS
     finally:
         conn.close()
+        order_cache.invalidate(order_id)
     return ReturnValue.OK
 
 
@@ -298,13 +954,9 @@ def add_dish(dish: Dish) -> ReturnValue:
     conn = None
     try:
         conn = Connector.DBConnector()
-        query = sql.SQL("INSERT INTO Dishes(dish_id, name, price, is_active) "
-                        "VALUES({dish_id}, {name}, {price}, {is_active})").format(
-            dish_id=sql.Literal(dish.get_dish_id()),
-            name=sql.Literal(dish.get_name()),
-            price=sql.Literal(dish.get_price()),
-            is_active=sql.Literal(dish.get_is_active()))
-        rows_effected, _ = conn.execute(query)
+        rows_effected, _ = conn.execute_prepared(
+            Queries.ADD_DISH,
+            (dish.get_dish_id(), dish.get_name(), dish.get_price(), dish.get_is_active()))
     except DatabaseException.ConnectionInvalid:
         return ReturnValue.ERROR
     except DatabaseException.NOT_NULL_VIOLATION:
@@ -317,19 +969,23 @@ def add_dish(dish: Dish) -> ReturnValue:
         return ReturnValue.BAD_PARAMS
     finally:
         conn.close()
+        dish_cache.invalidate(dish.get_dish_id())
     return ReturnValue.OK
 
 
 def get_dish(dish_id: int) -> Dish:
+    row = _cached(dish_cache, dish_id)
+    if row is not None:
+        return Dish(row[0], row[1], row[2], row[3])
+    generation = _cache_generation(dish_cache)
     conn = None
     try:
         conn = Connector.DBConnector()
-        query = sql.SQL("SELECT * FROM Dishes WHERE dish_id = {dish_id}").format(
-            dish_id =sql.Literal(dish_id))
-        rows_effected, result = conn.execute(query)
+        rows_effected, result = conn.execute_prepared(Queries.GET_DISH, (dish_id,))
         if rows_effected == 1:
             row = result.rows[0]
             dish = Dish(row[0], row[1], row[2], row[3])
+            dish_cache.put(dish_id, row, generation)
         else :
             dish = BadDish()
     except Exception:
@@ -343,11 +999,7 @@ def update_dish_price(dish_id: int, price: float) -> ReturnValue:
     conn = None
     try:
         conn = Connector.DBConnector()
-        query = sql.SQL("UPDATE Dishes SET price = {price} "
-                        "WHERE dish_id = {dish_id} AND is_active = true").format(
-            dish_id = sql.Literal(dish_id),
-            price = sql.Literal(price))
-        rows_effected, result = conn.execute(query)
+        rows_effected, result = conn.execute_prepared(Queries.UPDATE_DISH_PRICE, (price, dish_id))
         if rows_effected == 0:
             return ReturnValue.NOT_EXISTS
     except DatabaseException.ConnectionInvalid:
@@ -364,6 +1016,7 @@ def update_dish_price(dish_id: int, price: float) -> ReturnValue:
         return ReturnValue.BAD_PARAMS
     finally:
         conn.close()
+        dish_cache.invalidate(dish_id)
     return ReturnValue.OK
 
 
@@ -371,11 +1024,7 @@ def update_dish_active_status(dish_id: int, is_active: bool) -> ReturnValue:
     conn = None
     try:
         conn = Connector.DBConnector()
-        query = sql.SQL("UPDATE Dishes SET is_active = {is_active} "
-                        "WHERE dish_id = {dish_id}").format(
-            is_active=sql.Literal(is_active),
-            dish_id=sql.Literal(dish_id))
-        rows_effected, _ = conn.execute(query)
+        rows_effected, _ = conn.execute_prepared(Queries.UPDATE_DISH_ACTIVE_STATUS, (is_active, dish_id))
         if rows_effected == 0:
             return ReturnValue.NOT_EXISTS
     except DatabaseException.ConnectionInvalid:
@@ -392,6 +1041,7 @@ def update_dish_active_status(dish_id: int, is_active: bool) -> ReturnValue:
         return ReturnValue.BAD_PARAMS
     finally:
         conn.close()
+        dish_cache.invalidate(dish_id)
     return ReturnValue.OK
 
 
@@ -399,11 +1049,7 @@ def customer_placed_order(customer_id: int, order_id: int) -> ReturnValue:
     conn = None
     try:
         conn = Connector.DBConnector()
-        query = sql.SQL("INSERT INTO CustomerPlacesOrder(cust_id, order_id)"
-                        " VALUES({cust_id}, {order_id})").format(
-            cust_id=sql.Literal(customer_id),
-            order_id=sql.Literal(order_id))
-        rows_effected, _ = conn.execute(query)
+        rows_effected, _ = conn.execute_prepared(Queries.CUSTOMER_PLACED_ORDER, (customer_id, order_id))
         if rows_effected == 0:
             return ReturnValue.NOT_EXISTS
     except DatabaseException.ConnectionInvalid:
@@ -427,11 +1073,7 @@ def get_customer_that_placed_order(order_id: int) -> Customer:
     conn = None
     try:
         conn = Connector.DBConnector()
-        query = sql.SQL("SELECT C.cust_id, C.full_name, C.age, C.phone"
-                        " FROM Customers C, CustomerPlacesOrder O"
-                        " WHERE C.cust_id = O.cust_id AND O.order_id = {order_id}").format(
-            order_id=sql.Literal(order_id))
-        rows_effected, result = conn.execute(query)
+        rows_effected, result = conn.execute_prepared(Queries.GET_CUSTOMER_THAT_PLACED_ORDER, (order_id,))
         if rows_effected == 1:
             row = result.rows[0]
             customer = Customer(row[0], row[1], row[2], row[3])
@@ -447,14 +1089,9 @@ def get_customer_that_placed_order(order_id: int) -> Customer:
 def order_contains_dish(order_id: int, dish_id: int, amount: int) -> ReturnValue:
     conn = None
     try:
+        # the price is read in the same statement, a cached dish may be older than the committed one
         conn = Connector.DBConnector()
-        query = sql.SQL("INSERT INTO OrderContainsDish(order_id, dish_id, amount, price) "
-                        "VALUES ({order_id},{dish_id},{amount}, "
-                        "(SELECT price FROM Dishes WHERE dish_id = {dish_id} AND is_active = true))").format(
-            order_id=sql.Literal(order_id),
-            dish_id=sql.Literal(dish_id),
-            amount=sql.Literal(amount))
-        rows_effected, result = conn.execute(query)
+        rows_effected, result = conn.execute_prepared(Queries.ORDER_CONTAINS_DISH, (order_id, dish_id, amount))
         if rows_effected == 0:
             return ReturnValue.NOT_EXISTS
     except DatabaseException.ConnectionInvalid:
@@ -470,18 +1107,15 @@ def order_contains_dish(order_id: int, dish_id: int, amount: int) -> ReturnValue
     except Exception:
         return ReturnValue.NOT_EXISTS
     finally:
-        conn.close()
+        if conn is not None:
+            conn.close()
     return ReturnValue.OK
 
 def order_does_not_contain_dish(order_id: int, dish_id: int) -> ReturnValue:
     conn = None
     try:
         conn = Connector.DBConnector()
-        query = sql.SQL("DELETE FROM OrderContainsDish "
-                        "WHERE order_id = {order_id} AND dish_id = {dish_id}").format(
-            order_id = sql.Literal(order_id),
-            dish_id = sql.Literal(dish_id))
-        rows_effected, result = conn.execute(query)
+        rows_effected, result = conn.execute_prepared(Queries.ORDER_DOES_NOT_CONTAIN_DISH, (order_id, dish_id))
         if rows_effected == 0:
             return ReturnValue.NOT_EXISTS
     except DatabaseException.ConnectionInvalid:
@@ -505,12 +1139,7 @@ def get_all_order_items(order_id: int) -> List[OrderDish]:
     conn = None
     try:
         conn = Connector.DBConnector()
-        query = sql.SQL("SELECT D.dish_id, O.amount, O.price "
-                        "FROM Dishes D, OrderContainsDish O "
-                        "WHERE D.dish_id = O.dish_id AND O.order_id = {order_id} "
-                        "ORDER BY dish_id ASC").format(
-            order_id=sql.Literal(order_id))
-        rows_effected, result = conn.execute(query)
+        rows_effected, result = conn.execute_prepared(Queries.GET_ALL_ORDER_ITEMS, (order_id,))
         dishes = []
         for i in range(rows_effected):
             row = result.rows[i]
@@ -521,16 +1150,56 @@ def get_all_order_items(order_id: int) -> List[OrderDish]:
     return dishes
 
 
+# Paginated and streamed variants, pages are read with keyset pagination on the primary key: a page holds
+# the first limit rows whose dish_id is greater than after_dish_id (the last dish_id of the previous page),
+# so every page is an index range scan however deep into the rows it starts. dish ids are positive, so the
+# default after_dish_id starts at the first row
+
+_PAGE_SIZE = 1000
+
+
+def _check_page_size(limit: int) -> None:
+    if limit < 1:
+        raise ValueError("a page holds at least one row")
+
+
+# the rows of every page of fetch_page in turn, key gives the dish_id of a row to start the next page after
+def _keyset_pages(fetch_page, key, page_size: int) -> Iterator:
+    after_dish_id = 0
+    while True:
+        page = fetch_page(after_dish_id, page_size)
+        yield from page
+        if len(page) < page_size:
+            return
+        after_dish_id = key(page[-1])
+
+
+def get_order_items_page(order_id: int, after_dish_id: int = 0, limit: int = _PAGE_SIZE) -> List[OrderDish]:
+    _check_page_size(limit)
+    conn = None
+    try:
+        conn = Connector.DBConnector()
+        rows_effected, result = conn.execute_prepared(Queries.GET_ORDER_ITEMS_PAGE, (order_id, after_dish_id, limit))
+        dishes = [OrderDish(row[0], row[1], row[2]) for row in result.rows]
+    finally:
+        if conn is not None:
+            conn.close()
+    return dishes
+
+
+# yields the items of the order like get_all_order_items returns them, fetched page_size at a time. no connection
+# is held between pages, so a slow consumer does not keep one checked out
+def iter_order_items(order_id: int, page_size: int = _PAGE_SIZE) -> Iterator[OrderDish]:
+    _check_page_size(page_size)
+    return _keyset_pages(lambda after_dish_id, limit: get_order_items_page(order_id, after_dish_id, limit),
+                         OrderDish.get_dish_id, page_size)
+
+
 def customer_rated_dish(cust_id: int, dish_id: int, rating: int) -> ReturnValue:
     conn = None
     try:
         conn = Connector.DBConnector()
-        query = sql.SQL("INSERT INTO CustomerRatedDish(cust_id, dish_id, rating) "
-                        "VALUES ({cust_id},{dish_id},{rating})").format(
-            cust_id = sql.Literal(cust_id),
-            dish_id = sql.Literal(dish_id),
-            rating = sql.Literal(rating))
-        rows_effected, result = conn.execute(query)
+        rows_effected, result = conn.execute_prepared(Queries.CUSTOMER_RATED_DISH, (cust_id, dish_id, rating))
         if rows_effected == 0:
             return ReturnValue.NOT_EXISTS
     except DatabaseException.ConnectionInvalid:
@@ -554,11 +1223,7 @@ def customer_deleted_rating_on_dish(cust_id: int, dish_id: int) -> ReturnValue:
     conn = None
     try:
         conn = Connector.DBConnector()
-        query = sql.SQL("DELETE FROM CustomerRatedDish "
-                        "WHERE cust_id = {cust_id} AND dish_id = {dish_id}").format(
-            cust_id = sql.Literal(cust_id),
-            dish_id = sql.Literal(dish_id))
-        rows_effected, result = conn.execute(query)
+        rows_effected, result = conn.execute_prepared(Queries.CUSTOMER_DELETED_RATING_ON_DISH, (cust_id, dish_id))
         if rows_effected == 0:
             return ReturnValue.NOT_EXISTS
     except DatabaseException.ConnectionInvalid:
@@ -581,12 +1246,7 @@ def get_all_customer_ratings(cust_id: int) -> List[Tuple[int, int]]:
     conn = None
     try:
         conn = Connector.DBConnector()
-        query = sql.SQL("SELECT D.dish_id, D.rating "
-                        "FROM CustomerRatedDish D "
-                        "WHERE D.cust_id = {cust_id} "
-                        "ORDER BY dish_id ASC").format(
-            cust_id=sql.Literal(cust_id))
-        rows_effected, result = conn.execute(query)
+        rows_effected, result = conn.execute_prepared(Queries.GET_ALL_CUSTOMER_RATINGS, (cust_id,))
         ratings = []
         for i in range(rows_effected):
             row = result.rows[i]
@@ -595,6 +1255,229 @@ def get_all_customer_ratings(cust_id: int) -> List[Tuple[int, int]]:
     finally:
         conn.close()
     return ratings
+
+
+def get_customer_ratings_page(cust_id: int, after_dish_id: int = 0, limit: int = _PAGE_SIZE) \
+        -> List[Tuple[int, int]]:
+    _check_page_size(limit)
+    conn = None
+    try:
+        conn = Connector.DBConnector()
+        rows_effected, result = conn.execute_prepared(Queries.GET_CUSTOMER_RATINGS_PAGE, (cust_id, after_dish_id, limit))
+        ratings = [(row[0], row[1]) for row in result.rows]
+    finally:
+        if conn is not None:
+            conn.close()
+    return ratings
+
+
+# yields (dish_id, rating) like get_all_customer_ratings returns them, fetched page_size at a time
+def iter_customer_ratings(cust_id: int, page_size: int = _PAGE_SIZE) -> Iterator[Tuple[int, int]]:
+    _check_page_size(page_size)
+    return _keyset_pages(lambda after_dish_id, limit: get_customer_ratings_page(cust_id, after_dish_id, limit),
+                         lambda rating: rating[0], page_size)
+
+
+# Composite API
+
+# inserts the order, the customer that placed it (when customer_id is not None) and all its items in a single
+# statement, so either all of it is added or none of it. items are (dish_id, amount) and every item is priced at
+# the current price of its dish, which must be active. returns what the first failing call of add_order,
+# customer_placed_order and order_contains_dish would have returned
+def place_full_order(order: Order, customer_id: Optional[int], items: List[Tuple[int, int]]) -> ReturnValue:
+    if None in (order.get_order_id(), order.get_datetime(), order.get_delivery_fee(), order.get_delivery_address()):
+        return ReturnValue.BAD_PARAMS
+    if any(amount is None for _, amount in items):
+        return ReturnValue.BAD_PARAMS
+    conn = None
+    try:
+        conn = Connector.DBConnector()
+        rows_effected, _ = conn.execute_prepared(
+            Queries.PLACE_FULL_ORDER,
+            (order.get_order_id(), order.get_datetime(), order.get_delivery_fee(), order.get_delivery_address(),
+             customer_id, [dish_id for dish_id, _ in items], [amount for _, amount in items]))
+    except DatabaseException.ConnectionInvalid:
+        return ReturnValue.ERROR
+    except DatabaseException.NOT_NULL_VIOLATION:
+        return ReturnValue.NOT_EXISTS
+    except DatabaseException.CHECK_VIOLATION:
+        return ReturnValue.BAD_PARAMS
+    except DatabaseException.UNIQUE_VIOLATION:
+        return ReturnValue.ALREADY_EXISTS
+    except DatabaseException.FOREIGN_KEY_VIOLATION:
+        return ReturnValue.NOT_EXISTS
+    except Exception:
+        return ReturnValue.BAD_PARAMS
+    finally:
+        if conn is not None:
+            conn.close()
+    return ReturnValue.OK
+
+
+# Bulk API
+
+# COPY fires the statement-level triggers once per chunk, so the derived tables are maintained in one pass per
+# chunk instead of one per row. customers copy at about 100k rows/s, orders and dishes at 40-55k rows/s since each
+# one also writes its OrderTotals or DishRatings row, with a foreign key and indexes (see Benchmarks.BulkBenchmark)
+
+# rows copied per COPY statement, bounds the client side buffer for very large loads
+_BULK_CHUNK_SIZE = 10000
+
+
+def add_customers(customers: Iterable[Customer]) -> List[ReturnValue]:
+    return _bulk_insert("Customers", ("cust_id", "full_name", "age", "phone"),
+                        ((c.get_cust_id(), c.get_full_name(), c.get_age(), c.get_phone()) for c in customers))
+
+
+def add_orders(orders: Iterable[Order]) -> List[ReturnValue]:
+    return _bulk_insert("Orders", ("order_id", "date", "delivery_fee", "delivery_adress"),
+                        ((o.get_order_id(), o.get_datetime(), o.get_delivery_fee(), o.get_delivery_address())
+                         for o in orders))
+
+
+def add_dishes(dishes: Iterable[Dish]) -> List[ReturnValue]:
+    return _bulk_insert("Dishes", ("dish_id", "name", "price", "is_active"),
+                        ((d.get_dish_id(), d.get_name(), d.get_price(), d.get_is_active()) for d in dishes))
+
+
+# (cust_id, dish_id, rating) triples. neither DishRatings nor the similarity components are maintained while the
+# ratings are copied, both are rebuilt once before the ratings commit. merging the components COPY by COPY costs
+# more than one rebuild, and updating the DishRatings rows once per COPY leaves every row with a version per COPY
+# in the same transaction, which the later COPYs have to step over, so the load slowed down as it went
+def add_ratings(ratings: Iterable[Tuple[int, int, int]]) -> List[ReturnValue]:
+    ratings = iter(ratings)
+    results = []
+    conn = None
+    try:
+        with transaction():
+            conn = Connector.DBConnector()
+            conn.execute("SET LOCAL customer_similarity.deferred = on; SET LOCAL dish_ratings.deferred = on")
+            results = _bulk_insert("CustomerRatedDish", ("cust_id", "dish_id", "rating"), ratings,
+                                   not_null=ReturnValue.NOT_EXISTS)
+            conn.execute("SELECT dish_ratings_rebuild(), customer_similarity_rebuild()")
+    except Exception as e:
+        print(e)
+        # the transaction was rolled back, so every row failed
+        return [ReturnValue.ERROR] * (len(results) + sum(1 for _ in ratings))
+    finally:
+        if conn is not None:
+            conn.close()
+    return results
+
+
+# inserts all rows in one transaction, the i-th ReturnValue is what add_customer/add_order/add_dish/
+# customer_rated_dish would have returned for the i-th row had the rows been added one by one
+def _bulk_insert(table: str, columns: Tuple[str, ...], rows: Iterable[tuple],
+                 not_null: ReturnValue = ReturnValue.BAD_PARAMS) -> List[ReturnValue]:
+    conn = None
+    rows = iter(rows)
+    results = []
+    consumed = 0
+    try:
+        conn = Connector.DBConnector()
+        chunk = []
+        for row in rows:
+            consumed += 1
+            chunk.append(row)
+            if len(chunk) == _BULK_CHUNK_SIZE:
+                results.extend(_copy_chunk(conn, table, columns, chunk, not_null))
+                chunk = []
+        results.extend(_copy_chunk(conn, table, columns, chunk, not_null))
+        conn.commit()
+    except (DatabaseException.ConnectionInvalid, psycopg2.OperationalError, psycopg2.InterfaceError) as e:
+        print(e)
+        # nothing was committed, so every row failed
+        return [ReturnValue.ERROR] * (consumed + sum(1 for _ in rows))
+    finally:
+        if conn is not None:
+            conn.close()
+    return results
+
+
+# copies the whole chunk at once, when that fails the chunk is split in halves until the failing rows are isolated,
+# so k bad rows cost O(k log n) COPY statements instead of one statement per row
+def _copy_chunk(conn: Connector.DBConnector, table: str, columns: Tuple[str, ...], chunk: List[tuple],
+                not_null: ReturnValue) -> List[ReturnValue]:
+    results = [ReturnValue.OK] * len(chunk)
+    pending = [(0, len(chunk))]
+    while len(pending) > 0:
+        low, high = pending.pop()
+        if low >= high:
+            continue
+        conn.savepoint("bulk_insert")
+        try:
+            conn.copy_rows(table, columns, chunk[low:high])
+            conn.release_savepoint("bulk_insert")
+            continue
+        except (DatabaseException.ConnectionInvalid, psycopg2.OperationalError, psycopg2.InterfaceError):
+            raise
+        except DatabaseException.UNIQUE_VIOLATION:
+            error = ReturnValue.ALREADY_EXISTS
+        except DatabaseException.FOREIGN_KEY_VIOLATION:
+            error = ReturnValue.NOT_EXISTS
+        except DatabaseException.NOT_NULL_VIOLATION:
+            error = not_null
+        except Exception:
+            error = ReturnValue.BAD_PARAMS
+        conn.rollback_to_savepoint("bulk_insert")
+        conn.release_savepoint("bulk_insert")
+        if high - low == 1:
+            results[low] = error
+        else:
+            middle = (low + high) // 2
+            # the left half goes first so a duplicate keeps the earliest row, as sequential inserts would
+            pending.append((middle, high))
+            pending.append((low, middle))
+    return results
+
+
+# Batch API
+
+def get_customers(customer_ids: Iterable[int]) -> List[Customer]:
+    return [BadCustomer() if row is None else Customer(row[0], row[1], row[2], row[3])
+            for row in _get_rows(customer_ids, customer_cache, Queries.GET_CUSTOMERS)]
+
+
+def get_orders(order_ids: Iterable[int]) -> List[Order]:
+    return [BadOrder() if row is None else Order(row[0], row[1], row[2], row[3])
+            for row in _get_rows(order_ids, order_cache, Queries.GET_ORDERS)]
+
+
+def get_dishes(dish_ids: Iterable[int]) -> List[Dish]:
+    return [BadDish() if row is None else Dish(row[0], row[1], row[2], row[3])
+            for row in _get_rows(dish_ids, dish_cache, Queries.GET_DISHES)]
+
+
+# the row of every id in input order, None for ids that do not exist. cached rows are served from the cache
+# and all the others are fetched with one query, template (from Queries) selects the rows whose first column
+# is in $1
+def _get_rows(ids: Iterable[int], cache: LRUCache, template: str) -> list:
+    ids = list(ids)
+    rows = {}
+    missing = []
+    for key in ids:
+        row = _cached(cache, key)
+        if row is None:
+            missing.append(key)
+        else:
+            rows[key] = row
+    if len(missing) == 0:
+        return [rows[key] for key in ids]
+    generation = _cache_generation(cache)
+    conn = None
+    try:
+        conn = Connector.DBConnector()
+        rows_effected, result = conn.execute_prepared(template, (list(dict.fromkeys(missing)),))
+        for row in result.rows:
+            rows[row[0]] = row
+            cache.put(row[0], row, generation)
+    except Exception as e:
+        print(e)
+        return [None] * len(ids)
+    finally:
+        if conn is not None:
+            conn.close()
+    return [rows.get(key) for key in ids]
 # ---------------------------------- BASIC API: ----------------------------------
 
 # Basic API
@@ -604,20 +1487,52 @@ def get_order_total_price(order_id: int) -> float:
     conn= None
     try:
         conn = Connector.DBConnector()
-        query = sql.SQL("SELECT total_price FROM OrderTotalPrice WHERE order_id = {order_id}").format(order_id=sql.Literal(order_id))
-        rows_effected, result = conn.execute(query)
+        rows_effected, result = conn.execute_prepared(Queries.GET_ORDER_TOTAL_PRICE, (order_id,))
     finally:
         conn.close()
     return float(result.rows[0][0])
 
 
+def get_order_total_prices(order_ids: Iterable[int]) -> Dict[int, float]:
+    conn = None
+    try:
+        conn = Connector.DBConnector()
+        rows_effected, result = conn.execute_prepared(Queries.GET_ORDER_TOTAL_PRICES,
+                                                      (list(dict.fromkeys(order_ids)),))
+        totals = {}
+        for row in result.rows:
+            totals[row[0]] = float(row[1])
+    finally:
+        if conn is not None:
+            conn.close()
+    return totals
+
+
+# yields (order_id, total_price) ordered by order_id, for the given orders or for every order when order_ids is
+# None. the totals are streamed from a server side cursor, so memory stays flat however many orders there are
+def iter_order_total_prices(order_ids: Optional[Iterable[int]] = None,
+                            itersize: int = Connector.DBConnector.DEFAULT_ITERSIZE) -> Iterator[Tuple[int, float]]:
+    if order_ids is None:
+        query = sql.SQL("SELECT order_id, total_price FROM OrderTotalPrice ORDER BY order_id")
+    else:
+        query = sql.SQL("SELECT order_id, total_price FROM OrderTotalPrice "
+                        "WHERE order_id = ANY({order_ids}::integer[]) ORDER BY order_id").format(
+            order_ids=sql.Literal(list(dict.fromkeys(order_ids))))
+    conn = None
+    try:
+        conn = Connector.DBConnector()
+        for row in conn.iter_query(query, itersize):
+            yield row[0], float(row[1])
+    finally:
+        if conn is not None:
+            conn.close()
+
+
 def get_customers_spent_max_avg_amount_money() -> List[int]:
     conn = None
     try:
         conn = Connector.DBConnector()
-        query = sql.SQL("WITH RECURSIVE avg_total_price AS (SELECT AVG(total_price) AS avg_price , cust_id FROM OrderTotalPrice WHERE cust_id IS NOT NULL GROUP BY cust_id) "
-                        "SELECT DISTINCT cust_id FROM avg_total_price WHERE (SELECT MAX(avg_price) FROM avg_total_price) = avg_price AND cust_id IS NOT NULL ORDER BY cust_id")
-        rows_effected, result = conn.execute(query)
+        rows_effected, result = conn.execute_prepared(Queries.GET_CUSTOMERS_SPENT_MAX_AVG_AMOUNT_MONEY)
         customers_best = []
         for i in range(rows_effected):
             row = result.rows[i]
@@ -633,15 +1548,7 @@ def get_most_purchased_dish_among_anonymous_order() -> Dish:
     conn = None
     try:
         conn = Connector.DBConnector()
-        query = sql.SQL("SELECT D.dish_id, D.name, D.price, D.is_active "
-                        "FROM Dishes D, OrderContainsDish O "
-                        "WHERE O.order_id NOT IN "
-                        "(SELECT order_id FROM CustomerPlacesOrder C WHERE C.cust_id IS NOT NULL) "
-                        "AND D.dish_id = O.dish_id "
-                        "GROUP BY D.dish_id, D.name, D.price, D.is_active "
-                        "ORDER BY SUM(O.amount) DESC, D.dish_id "
-                        "LIMIT 1 ")
-        rows_effected, result = conn.execute(query)
+        rows_effected, result = conn.execute_prepared(Queries.GET_MOST_PURCHASED_DISH_AMONG_ANONYMOUS_ORDER)
         row = result.rows[0]
         dish = Dish(row[0], row[1], row[2], row[3])
     finally:
@@ -653,12 +1560,7 @@ def did_customer_order_top_rated_dishes(cust_id: int) -> bool:
     conn = None
     try:
         conn = Connector.DBConnector()
-        query = sql.SQL("SELECT C.dish_id "
-                        "FROM CustomerOrderedDish C, "
-                        "(SELECT * FROM RatingDish ORDER BY avg_rating DESC, dish_id LIMIT 5) AS TOP "
-                        "WHERE C.cust_id = {cust_id} AND C.dish_id = TOP.dish_id ").format(
-            cust_id=sql.Literal(cust_id))
-        rows_effected, result = conn.execute(query)
+        rows_effected, result = conn.execute_prepared(Queries.DID_CUSTOMER_ORDER_TOP_RATED_DISHES, (cust_id,))
         if rows_effected != 0:
             return True
     finally:
@@ -675,11 +1577,7 @@ def get_customers_rated_but_not_ordered() -> List[int]:
     conn = None
     try:
         conn = Connector.DBConnector()
-        query = sql.SQL("SELECT DISTINCT cust_id FROM CustomerRatedDish AS c WHERE rating < 3 AND "
-                        "c.cust_id NOT IN(SELECT cust_id FROM CustomerOrderedDish AS d WHERE c.dish_id  = d.dish_id) AND "
-                        "c.dish_id IN (SELECT dish_id FROM RatingDish ORDER BY avg_rating ASC , dish_id ASC LIMIT 5) "
-                        "ORDER BY cust_id ASC")
-        rows_effected, result = conn.execute(query)
+        rows_effected, result = conn.execute_prepared(Queries.GET_CUSTOMERS_RATED_BUT_NOT_ORDERED)
         customers_bad = []
         for i in range(rows_effected):
             row = result.rows[i]
@@ -694,12 +1592,7 @@ def get_non_worth_price_increase() -> List[int]:
     conn = None
     try:
         conn = Connector.DBConnector()
-        query = sql.SQL("SELECT DISTINCT p1.dish_id FROM AverageProfitPerOrderPerPrice p1 "
-                        "JOIN AverageProfitPerOrderPerPrice p2 "
-                        "ON p1.dish_id = p2.dish_id  AND p1.price > p2.price AND p1.average_price < p2.average_price "
-                        "WHERE p1.dish_id IN (SELECT dish_id FROM Dishes d WHERE is_active = true AND p1.price = d.price) "
-                        "ORDER BY p1.dish_id ASC")
-        rows_effected, result = conn.execute(query)
+        rows_effected, result = conn.execute_prepared(Queries.GET_NON_WORTH_PRICE_INCREASE)
         price_bad = []
         for i in range(rows_effected):
             row = result.rows[i]
@@ -714,22 +1607,7 @@ def get_cumulative_profit_per_month(year: int) -> List[Tuple[int, float]]:
     conn = None
     try:
         conn = Connector.DBConnector()
-        query = sql.SQL("WITH RECURSIVE Months AS "
-                        "(SELECT 1 AS month UNION ALL "
-                        "SELECT month + 1 FROM Months WHERE month < 12), "
-                        "MonthlyRevenue AS "
-                        "(SELECT YEARORDER.month, SUM(P.total_price) AS revenue "
-                        "FROM  OrderTotalPrice P, "
-                        "(SELECT O.order_id, EXTRACT(MONTH FROM O.date) AS month FROM Orders O "
-                        "WHERE EXTRACT(YEAR FROM O.date) = {year}) AS YEARORDER "
-                        "WHERE YEARORDER.order_id = P.order_id "
-                        "GROUP BY YEARORDER.month) "
-                        "SELECT M.month, (SELECT coalesce(SUM(R.revenue), 0) FROM MonthlyRevenue R WHERE M.month >= R.month) "
-                        "FROM Months M LEFT OUTER JOIN MonthlyRevenue R ON M.month = R.month "
-                        "GROUP BY M.month "
-                        "ORDER BY M.month DESC").format(
-            year=sql.Literal(year))
-        rows_effected, result = conn.execute(query)
+        rows_effected, result = conn.execute_prepared(Queries.GET_CUMULATIVE_PROFIT_PER_MONTH, (year,))
         revenues = []
         for i in range(rows_effected):
             row = result.rows[i]
@@ -740,22 +1618,34 @@ def get_cumulative_profit_per_month(year: int) -> List[Tuple[int, float]]:
     return revenues
 
 
+# get_cumulative_profit_per_month for every year from start_year to end_year, in one query. returns
+# (year, month, profit) tuples, the years ascending and the months of each year descending like
+# get_cumulative_profit_per_month, or with as_numpy a float64 array of shape (years, 12) whose row i is
+# start_year + i and whose columns are the months from 12 down to 1
+def get_cumulative_profit_range(start_year: int, end_year: int, as_numpy: bool = False):
+    numpy = None
+    if as_numpy:
+        try:
+            import numpy
+        except ImportError:
+            raise ImportError("get_cumulative_profit_range(as_numpy=True) requires numpy, install it with pip install numpy")
+    conn = None
+    try:
+        conn = Connector.DBConnector()
+        rows_effected, result = conn.execute_prepared(Queries.GET_CUMULATIVE_PROFIT_RANGE, (start_year, end_year))
+    finally:
+        if conn is not None:
+            conn.close()
+    if numpy is not None:
+        return numpy.array([float(row[2]) for row in result.rows], dtype=numpy.float64).reshape(-1, 12)
+    return [(int(row[0]), int(row[1]), float(row[2])) for row in result.rows]
+
+
 def get_potential_dish_recommendations(cust_id: int) -> List[int]:
     conn = None
     try:
         conn = Connector.DBConnector()
-        query = sql.SQL("WITH RECURSIVE SimilarCustomers AS "
-                        "(SELECT {cust_id} AS cust_id UNION "
-                        "SELECT C2.cust_id "
-                        "FROM SimilarCustomers S JOIN CustomerRatedDish C ON S.cust_id = C.cust_id "
-                        "JOIN CustomerRatedDish C2 ON C.dish_id = C2.dish_id "
-                        "WHERE C.rating >= 4 AND C2.rating >= 4) "
-                        "SELECT DISTINCT C.dish_id FROM SimilarCustomers S, CustomerRatedDish C "
-                        "WHERE S.cust_id = C.cust_id "
-                        "AND {cust_id} NOT IN (SELECT cust_id FROM CustomerOrderedDish D WHERE D.dish_id = C.dish_id) "
-                        "ORDER BY dish_id").format(
-            cust_id=sql.Literal(cust_id))
-        rows_effected, result = conn.execute(query)
+        rows_effected, result = conn.execute_prepared(Queries.GET_POTENTIAL_DISH_RECOMMENDATIONS, (cust_id,))
         dishes = []
         for i in range(rows_effected):
             row = result.rows[i]
@@ -763,3 +1653,4 @@ def get_potential_dish_recommendations(cust_id: int) -> List[int]:
     finally:
         conn.close()
     return dishes
+
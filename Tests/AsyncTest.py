@@ -0,0 +1,57 @@
+import asyncio
+import unittest
+from datetime import datetime
+
+import AsyncSolution
+from Business.Customer import Customer, BadCustomer
+from Business.Dish import Dish
+from Business.Order import Order
+from Business.OrderDish import OrderDish
+from Utility.ReturnValue import ReturnValue
+from Tests.AbstractTest import AbstractTest
+
+'''
+    Tests for AsyncSolution, the tables are still created by Solution
+'''
+
+
+class Test(AbstractTest):
+    def test_crud(self) -> None:
+        async def scenario():
+            c = Customer(1, 'name', 21, "0123456789")
+            self.assertEqual(ReturnValue.OK, await AsyncSolution.add_customer(c), 'test 1.1')
+            self.assertEqual(ReturnValue.ALREADY_EXISTS, await AsyncSolution.add_customer(c), 'test 1.2')
+            self.assertEqual(ReturnValue.BAD_PARAMS,
+                             await AsyncSolution.add_customer(Customer(2, 'name', 17, "0123456789")), 'test 1.3')
+            self.assertEqual(c, await AsyncSolution.get_customer(1), 'test 1.4')
+            self.assertEqual(BadCustomer(), await AsyncSolution.get_customer(2), 'test 1.5')
+            o = Order(1, datetime(year=2020, month=5, day=1, hour=20), 10, "address 1")
+            self.assertEqual(ReturnValue.OK, await AsyncSolution.add_order(o), 'test 1.6')
+            self.assertEqual(o, await AsyncSolution.get_order(1), 'test 1.7')
+            self.assertEqual(ReturnValue.OK, await AsyncSolution.add_dish(Dish(1, 'dish', 10, True)), 'test 1.8')
+            self.assertEqual(ReturnValue.OK, await AsyncSolution.customer_placed_order(1, 1), 'test 1.9')
+            self.assertEqual(ReturnValue.OK, await AsyncSolution.order_contains_dish(1, 1, 2), 'test 1.10')
+            self.assertEqual(ReturnValue.NOT_EXISTS, await AsyncSolution.order_contains_dish(1, 2, 2), 'test 1.11')
+            self.assertEqual([OrderDish(1, 2, 10)], await AsyncSolution.get_all_order_items(1), 'test 1.12')
+            self.assertEqual(30.0, await AsyncSolution.get_order_total_price(1), 'test 1.13')
+            self.assertEqual(ReturnValue.OK, await AsyncSolution.customer_rated_dish(1, 1, 5), 'test 1.14')
+            self.assertEqual([(1, 5)], await AsyncSolution.get_all_customer_ratings(1), 'test 1.15')
+            self.assertEqual(True, await AsyncSolution.did_customer_order_top_rated_dishes(1), 'test 1.16')
+            self.assertEqual([1], await AsyncSolution.get_customers_spent_max_avg_amount_money(), 'test 1.17')
+            self.assertEqual(ReturnValue.OK, await AsyncSolution.delete_order(1), 'test 1.18')
+            self.assertEqual(ReturnValue.NOT_EXISTS, await AsyncSolution.delete_order(1), 'test 1.19')
+        asyncio.run(scenario())
+
+    def test_concurrent_calls(self) -> None:
+        async def scenario():
+            customers = [Customer(i, 'name', 20 + i % 50, "0123456789") for i in range(1, 201)]
+            results = await asyncio.gather(*(AsyncSolution.add_customer(c) for c in customers))
+            self.assertEqual([ReturnValue.OK] * len(customers), results, 'test 2.1')
+            fetched = await asyncio.gather(*(AsyncSolution.get_customer(c.get_cust_id()) for c in customers))
+            self.assertEqual(customers, fetched, 'test 2.2')
+        asyncio.run(scenario())
+
+
+# this is the main, not a must to use it
+if __name__ == '__main__':
+    unittest.main(verbosity=2, exit=False)
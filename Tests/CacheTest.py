@@ -0,0 +1,63 @@
+import unittest
+import time
+
+from Utility.Cache import LRUCache
+from Utility.CacheInvalidation import InvalidationListener
+
+'''
+    LRUCache does not need a database
+'''
+
+
+class Test(unittest.TestCase):
+    def test_lru(self) -> None:
+        cache = LRUCache(max_entries=2, ttl=None)
+        cache.put(1, 'a')
+        cache.put(2, 'b')
+        self.assertEqual('a', cache.get(1), 'test 1.1')
+        cache.put(3, 'c')  # 2 is the least recently used
+        self.assertIsNone(cache.get(2), 'test 1.2')
+        self.assertEqual('c', cache.get(3), 'test 1.3')
+        self.assertEqual(2, len(cache), 'test 1.4')
+        stats = cache.stats()
+        self.assertEqual((2, 1, 1), (stats['hits'], stats['misses'], stats['evictions']), 'test 1.5')
+        cache.invalidate(1)
+        self.assertIsNone(cache.get(1), 'test 1.6')
+        cache.clear()
+        self.assertEqual(0, len(cache), 'test 1.7')
+
+    def test_ttl(self) -> None:
+        cache = LRUCache(max_entries=10, ttl=0.01)
+        cache.put(1, 'a')
+        self.assertEqual('a', cache.get(1), 'test 2.1')
+        time.sleep(0.02)
+        self.assertEqual('missing', cache.get(1, 'missing'), 'test 2.2')
+
+    def test_generation(self) -> None:
+        cache = LRUCache()
+        generation = cache.generation()
+        cache.invalidate(1)  # a writer got in between the read and the put
+        cache.put(1, 'stale', generation)
+        self.assertIsNone(cache.get(1), 'test 3.1')
+        cache.put(1, 'fresh', cache.generation())
+        self.assertEqual('fresh', cache.get(1), 'test 3.2')
+
+    def test_invalidation_payloads(self) -> None:
+        dishes, customers = LRUCache(), LRUCache()
+        listener = InvalidationListener({'dish': dishes, 'customer': customers})
+        dishes.put(1, 'dish 1')
+        dishes.put(2, 'dish 2')
+        customers.put(1, 'customer 1')
+        listener.apply('dish:1')
+        self.assertIsNone(dishes.get(1), 'test 4.1')
+        self.assertEqual('dish 2', dishes.get(2), 'test 4.2')
+        self.assertEqual('customer 1', customers.get(1), 'test 4.3')
+        listener.apply('order:1')  # nobody caches orders here
+        listener.apply('*')
+        self.assertEqual((0, 0), (len(dishes), len(customers)), 'test 4.4')
+        self.assertFalse(listener.is_listening(), 'test 4.5')
+
+
+# this is the main, not a must to use it
+if __name__ == '__main__':
+    unittest.main(verbosity=2, exit=False)
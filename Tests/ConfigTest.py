@@ -0,0 +1,95 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import Utility.DBConnector as Connector
+from Utility.DBConnector import DBConnector
+from Utility.Exceptions import DatabaseException
+
+'''
+    load_config and the pool's use of it, no database needed
+'''
+
+VALID = "[postgresql]\nhost=localhost\ndatabase=first\n"
+
+
+class Test(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        Connector.clear_config_cache()
+
+    def tearDown(self) -> None:
+        Connector.clear_config_cache()
+        self.directory.cleanup()
+
+    def write(self, text: str, name: str = "database.ini", mtime_ns: int = None) -> str:
+        path = os.path.join(self.directory.name, name)
+        with open(path, "w") as file:
+            file.write(text)
+        if mtime_ns is not None:
+            os.utime(path, ns=(mtime_ns, mtime_ns))
+        return path
+
+    def test_mtime_cache(self) -> None:
+        path = self.write(VALID, mtime_ns=10 ** 18)
+        self.assertEqual({"host": "localhost", "database": "first"}, Connector.load_config(path), 'test 1.1')
+        # rewritten with the modification time restored, the cached parameters are still returned
+        self.write(VALID.replace("first", "second"), mtime_ns=10 ** 18)
+        self.assertEqual("first", Connector.load_config(path)["database"], 'test 1.2')
+        # a newer modification time is re-read
+        os.utime(path, ns=(10 ** 18 + 1, 10 ** 18 + 1))
+        self.assertEqual("second", Connector.load_config(path)["database"], 'test 1.3')
+        # the caller gets a copy, changing it does not change the cache
+        Connector.load_config(path)["database"] = "changed"
+        self.assertEqual("second", Connector.load_config(path)["database"], 'test 1.4')
+
+    def test_environment_override(self) -> None:
+        path = self.write(VALID.replace("first", "from environment"))
+        with mock.patch.dict(os.environ, {Connector.CONFIG_ENV_VAR: path}):
+            self.assertEqual("from environment", Connector.load_config()["database"], 'test 2.1')
+            # an explicit filename wins over the environment
+            other = self.write(VALID, name="other.ini")
+            self.assertEqual("first", Connector.load_config(other)["database"], 'test 2.2')
+        with mock.patch.dict(os.environ, {Connector.CONFIG_ENV_VAR: path + ".missing"}):
+            # the variable replaces the default locations, it does not fall back to them
+            with self.assertRaises(DatabaseException.database_ini_ERROR, msg='test 2.3'):
+                Connector.load_config()
+
+    def test_missing_file(self) -> None:
+        with self.assertRaises(DatabaseException.database_ini_ERROR, msg='test 3.1'):
+            Connector.load_config(os.path.join(self.directory.name, "missing.ini"))
+
+    def test_invalid_file(self) -> None:
+        path = self.write("host=localhost\n[postgresql\n", mtime_ns=10 ** 18)
+        with self.assertRaises(DatabaseException.database_ini_ERROR, msg='test 4.1'):
+            Connector.load_config(path)
+        path = self.write("[other]\nhost=localhost\n", mtime_ns=10 ** 18)
+        with self.assertRaises(DatabaseException.database_ini_ERROR, msg='test 4.2'):
+            Connector.load_config(path)
+        # the failure is cached while the file is unchanged
+        with mock.patch.object(Connector, "ConfigParser") as parser:
+            with self.assertRaises(DatabaseException.database_ini_ERROR, msg='test 4.3'):
+                Connector.load_config(path)
+            parser.assert_not_called()
+        # fixing the file takes effect without clearing the cache
+        self.write(VALID, mtime_ns=10 ** 18 + 1)
+        self.assertEqual("first", Connector.load_config(path)["database"], 'test 4.4')
+
+    def test_pool_with_invalid_file(self) -> None:
+        path = self.write("[other]\nhost=localhost\n")
+        Connector.close_pool()
+        try:
+            with mock.patch.dict(os.environ, {Connector.CONFIG_ENV_VAR: path}):
+                with self.assertRaises(DatabaseException.database_ini_ERROR, msg='test 5.1'):
+                    Connector._get_pool()
+                self.assertIsNone(Connector._pool, 'test 5.2')
+                with self.assertRaises(DatabaseException.ConnectionInvalid, msg='test 5.3'):
+                    DBConnector()
+        finally:
+            Connector.close_pool()
+
+
+# this is the main, not a must to use it
+if __name__ == '__main__':
+    unittest.main(verbosity=2, exit=False)
@@ -0,0 +1,124 @@
+import os
+import time
+import unittest
+
+import psycopg2
+from psycopg2 import extensions
+
+import Utility.DBConnector as Connector
+from Utility.DBConnector import ConnectionPool
+from Utility.Exceptions import DatabaseException
+
+'''
+    ConnectionPool against the database of database.ini, no tables needed
+'''
+
+
+class Test(unittest.TestCase):
+    def setUp(self) -> None:
+        self.pools = []
+
+    def tearDown(self) -> None:
+        for pool in self.pools:
+            pool.closeall()
+
+    def pool(self, **settings) -> ConnectionPool:
+        pool = ConnectionPool(Connector.load_config, **settings)
+        self.pools.append(pool)
+        return pool
+
+    @staticmethod
+    def select_one(connection) -> int:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1")
+            return cursor.fetchone()[0]
+
+    def test_checkout_timeout(self) -> None:
+        pool = self.pool(minconn=0, maxconn=1, checkout_timeout=0.2)
+        connection = pool.getconn()
+        start = time.monotonic()
+        with self.assertRaises(DatabaseException.ConnectionInvalid, msg='test 1.1'):
+            pool.getconn()
+        self.assertGreaterEqual(time.monotonic() - start, 0.2, 'test 1.2')
+        pool.putconn(connection)
+        self.assertIs(connection, pool.getconn(), 'test 1.3')
+
+    def test_health_check(self) -> None:
+        pool = self.pool(minconn=1, maxconn=1, health_check_after=0)
+        connection = pool.getconn()
+        backend = connection.get_backend_pid()
+        pool.putconn(connection)
+        # the server drops the idle connection behind the pool's back
+        killer = psycopg2.connect(**Connector.load_config())
+        try:
+            killer.autocommit = True
+            with killer.cursor() as cursor:
+                cursor.execute("SELECT pg_terminate_backend(%s)", (backend,))
+                for _ in range(100):
+                    cursor.execute("SELECT 1 FROM pg_stat_activity WHERE pid = %s", (backend,))
+                    if cursor.fetchone() is None:
+                        break
+                    time.sleep(0.05)
+        finally:
+            killer.close()
+        replacement = pool.getconn()
+        self.assertNotEqual(backend, replacement.get_backend_pid(), 'test 2.1')
+        self.assertEqual(1, self.select_one(replacement), 'test 2.2')
+        self.assertTrue(connection.closed, 'test 2.3')
+
+    def test_idle_reaping(self) -> None:
+        pool = self.pool(minconn=1, maxconn=3, idle_timeout=0.05)
+        first, second = pool.getconn(), pool.getconn()
+        pool.putconn(first)
+        pool.putconn(second)
+        time.sleep(0.1)
+        # the oldest idle connection is closed, minconn of them stay open
+        self.assertIs(second, pool.getconn(), 'test 3.1')
+        self.assertTrue(first.closed, 'test 3.2')
+        self.assertFalse(second.closed, 'test 3.3')
+
+    @unittest.skipUnless(hasattr(os, "fork"), "needs fork()")
+    def test_fork(self) -> None:
+        parent = Connector._get_pool()
+        connection = parent.getconn()
+        parent.putconn(connection)
+        child = os.fork()
+        if child == 0:
+            status = 1
+            try:
+                pool = Connector._get_pool()
+                if pool is not parent and pool.pid == os.getpid() and parent in Connector._abandoned_pools:
+                    own = pool.getconn()
+                    status = 0 if self.select_one(own) == 1 else 1
+                    pool.putconn(own)
+            finally:
+                os._exit(status)
+        _, status = os.waitpid(child, 0)
+        self.assertEqual(0, status, 'test 4.1')
+        # the child left the parent's connections alone
+        self.assertIs(connection, parent.getconn(), 'test 4.2')
+        self.assertEqual(1, self.select_one(connection), 'test 4.3')
+        parent.putconn(connection)
+
+    def test_rollback_on_putconn(self) -> None:
+        pool = self.pool(minconn=0, maxconn=1)
+        connection = pool.getconn()
+        with connection.cursor() as cursor:
+            cursor.execute("CREATE TEMP TABLE pool_test(x INTEGER)")
+        self.assertEqual(extensions.TRANSACTION_STATUS_INTRANS, connection.info.transaction_status, 'test 5.1')
+        pool.putconn(connection)
+        self.assertIs(connection, pool.getconn(), 'test 5.2')
+        self.assertEqual(extensions.TRANSACTION_STATUS_IDLE, connection.info.transaction_status, 'test 5.3')
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT to_regclass('pg_temp.pool_test')")
+            self.assertIsNone(cursor.fetchone()[0], 'test 5.4')
+            with self.assertRaises(psycopg2.Error, msg='test 5.5'):
+                cursor.execute("SELECT * FROM no_such_table")
+        self.assertEqual(extensions.TRANSACTION_STATUS_INERROR, connection.info.transaction_status, 'test 5.6')
+        pool.putconn(connection)
+        self.assertEqual(1, self.select_one(pool.getconn()), 'test 5.7')
+
+
+# this is the main, not a must to use it
+if __name__ == '__main__':
+    unittest.main(verbosity=2, exit=False)
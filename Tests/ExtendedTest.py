@@ -0,0 +1,424 @@
+import time
+import unittest
+from datetime import datetime
+
+import psycopg2
+
+import Solution as Solution
+import Utility.CacheInvalidation as CacheInvalidation
+import Utility.DBConnector as Connector
+from Business.Dish import Dish, BadDish
+from Business.Order import Order, BadOrder
+from Business.OrderDish import OrderDish
+from Utility.ReturnValue import ReturnValue
+from Tests.AbstractTest import AbstractTest
+from Business.Customer import Customer, BadCustomer
+
+'''
+    Tests for the bulk, batch and streaming additions to the API
+'''
+
+
+class Test(AbstractTest):
+    def test_add_customers(self) -> None:
+        customers = [Customer(1, 'name', 21, "0123456789"),
+                     Customer(2, 'name', 17, "0123456789"),  # age < 18
+                     Customer(3, 'name', 30, "0123456789"),
+                     Customer(1, 'other', 40, "0123456789"),  # duplicate of the first row
+                     Customer(4, None, 30, "0123456789")]  # full_name is NULL
+        self.assertEqual([ReturnValue.OK, ReturnValue.BAD_PARAMS, ReturnValue.OK,
+                          ReturnValue.ALREADY_EXISTS, ReturnValue.BAD_PARAMS],
+                         Solution.add_customers(customers), 'test 1.1')
+        self.assertEqual(Customer(1, 'name', 21, "0123456789"), Solution.get_customer(1), 'test 1.2')
+        self.assertEqual(BadCustomer(), Solution.get_customer(2), 'test 1.3')
+        self.assertEqual(Customer(3, 'name', 30, "0123456789"), Solution.get_customer(3), 'test 1.4')
+        self.assertEqual([ReturnValue.ALREADY_EXISTS], Solution.add_customers([customers[2]]), 'test 1.5')
+        self.assertEqual([], Solution.add_customers([]), 'test 1.6')
+
+    def test_add_orders_and_dishes(self) -> None:
+        orders = [Order(1, datetime(year=2020, month=1, day=1, hour=12), 10, "address 1"),
+                  Order(2, datetime(year=2020, month=1, day=2, hour=12), -1, "address 2"),  # delivery_fee < 0
+                  Order(3, datetime(year=2020, month=1, day=3, hour=12), 5, "a\taddress\\3")]
+        self.assertEqual([ReturnValue.OK, ReturnValue.BAD_PARAMS, ReturnValue.OK],
+                         Solution.add_orders(orders), 'test 2.1')
+        self.assertEqual(orders[2], Solution.get_order(3), 'test 2.2')
+        self.assertEqual(BadOrder(), Solution.get_order(2), 'test 2.3')
+        dishes = [Dish(dish_id=i, name='dish' + str(i), price=i, is_active=i % 2 == 0) for i in range(1, 1001)]
+        self.assertEqual([ReturnValue.OK] * 1000, Solution.add_dishes(dishes), 'test 2.4')
+        self.assertEqual(dishes[499], Solution.get_dish(500), 'test 2.5')
+        self.assertEqual([ReturnValue.BAD_PARAMS, ReturnValue.ALREADY_EXISTS],
+                         Solution.add_dishes([Dish(1001, 'abc', 10, True), Dish(1, 'abcd', 10, True)]), 'test 2.6')
+
+    def test_dish_cache(self) -> None:
+        self.assertEqual(ReturnValue.OK, Solution.add_dish(Dish(1, 'dish', 10, True)), 'test 3.1')
+        self.assertEqual(Dish(1, 'dish', 10, True), Solution.get_dish(1), 'test 3.2')
+        self.assertEqual(Dish(1, 'dish', 10, True), Solution.get_dish(1), 'test 3.3')  # served from the cache
+        self.assertEqual(ReturnValue.OK, Solution.update_dish_price(1, 12), 'test 3.4')
+        self.assertEqual(Dish(1, 'dish', 12, True), Solution.get_dish(1), 'test 3.5')
+        self.assertEqual(ReturnValue.OK, Solution.add_order(Order(1, datetime(2020, 1, 1), 0, "address")), 'test 3.6')
+        self.assertEqual(ReturnValue.OK, Solution.order_contains_dish(1, 1, 2), 'test 3.7')
+        self.assertEqual([OrderDish(1, 2, 12)], Solution.get_all_order_items(1), 'test 3.8')
+        self.assertEqual(ReturnValue.OK, Solution.update_dish_active_status(1, False), 'test 3.9')
+        self.assertEqual(Dish(1, 'dish', 12, False), Solution.get_dish(1), 'test 3.10')
+        self.assertEqual(ReturnValue.NOT_EXISTS, Solution.order_contains_dish(1, 1, 2), 'test 3.11')
+        Solution.clear_tables()
+        self.assertEqual(BadDish(), Solution.get_dish(1), 'test 3.12')
+
+    def test_batch_getters(self) -> None:
+        customers = [Customer(i, 'name', 20 + i, "0123456789") for i in range(1, 4)]
+        self.assertEqual([ReturnValue.OK] * 3, Solution.add_customers(customers), 'test 4.1')
+        self.assertEqual([customers[2], BadCustomer(), customers[0], customers[2]],
+                         Solution.get_customers([3, 7, 1, 3]), 'test 4.2')
+        self.assertEqual([], Solution.get_customers([]), 'test 4.3')
+        o = Order(1, datetime(year=2020, month=5, day=1, hour=20), 10, "address 1")
+        self.assertEqual(ReturnValue.OK, Solution.add_order(o), 'test 4.4')
+        self.assertEqual([BadOrder(), o], Solution.get_orders([2, 1]), 'test 4.5')
+        d = Dish(1, 'dish', 10, True)
+        self.assertEqual(ReturnValue.OK, Solution.add_dish(d), 'test 4.6')
+        self.assertEqual(d, Solution.get_dish(1), 'test 4.7')
+        self.assertEqual([d, BadDish()], Solution.get_dishes([1, 2]), 'test 4.8')
+        self.assertEqual(ReturnValue.OK, Solution.delete_customer(3), 'test 4.9')
+        self.assertEqual([BadCustomer(), customers[1]], Solution.get_customers([3, 2]), 'test 4.10')
+
+    def test_order_total_prices(self) -> None:
+        self.assertEqual(ReturnValue.OK, Solution.add_dish(Dish(1, 'dish', 10, True)), 'test 5.1')
+        self.assertEqual(ReturnValue.OK, Solution.add_dish(Dish(2, 'dish', 2.5, True)), 'test 5.2')
+        for order_id in range(1, 4):
+            o = Order(order_id, datetime(year=2020, month=5, day=order_id), order_id, "address 1")
+            self.assertEqual(ReturnValue.OK, Solution.add_order(o), 'test 5.3')
+        self.assertEqual(ReturnValue.OK, Solution.order_contains_dish(1, 1, 2), 'test 5.4')
+        self.assertEqual(ReturnValue.OK, Solution.order_contains_dish(1, 2, 4), 'test 5.5')
+        self.assertEqual(ReturnValue.OK, Solution.order_contains_dish(3, 2, 1), 'test 5.6')
+        self.assertEqual({1: 31.0, 3: 5.5}, Solution.get_order_total_prices([3, 1, 9, 1]), 'test 5.7')
+        self.assertEqual({}, Solution.get_order_total_prices([]), 'test 5.8')
+        self.assertEqual([(1, 31.0), (2, 2.0), (3, 5.5)], list(Solution.iter_order_total_prices()), 'test 5.9')
+        self.assertEqual([(2, 2.0), (3, 5.5)], list(Solution.iter_order_total_prices([3, 2], itersize=1)),
+                         'test 5.10')
+
+    def test_transaction(self) -> None:
+        c = Customer(1, 'name', 21, "0123456789")
+        o = Order(1, datetime(year=2020, month=5, day=1, hour=20), 10, "address 1")
+        with Solution.transaction():
+            self.assertEqual(ReturnValue.OK, Solution.add_customer(c), 'test 6.1')
+            self.assertEqual(ReturnValue.ALREADY_EXISTS, Solution.add_customer(c), 'test 6.2')
+            self.assertEqual(ReturnValue.OK, Solution.add_order(o), 'test 6.3')
+            self.assertEqual(ReturnValue.NOT_EXISTS, Solution.customer_placed_order(2, 1), 'test 6.4')
+            self.assertEqual(ReturnValue.OK, Solution.customer_placed_order(1, 1), 'test 6.5')
+            self.assertEqual(c, Solution.get_customer_that_placed_order(1), 'test 6.6')
+        self.assertEqual(c, Solution.get_customer(1), 'test 6.7')
+        self.assertEqual(c, Solution.get_customer_that_placed_order(1), 'test 6.8')
+        d = Dish(1, 'dish', 10, True)
+        with Solution.transaction() as tx:
+            self.assertEqual(ReturnValue.OK, Solution.add_dish(d), 'test 6.9')
+            with Solution.transaction() as inner:
+                self.assertEqual(ReturnValue.OK, Solution.update_dish_price(1, 20), 'test 6.10')
+                inner.rollback()
+            self.assertEqual(d, Solution.get_dish(1), 'test 6.11')
+            tx.rollback()
+        self.assertEqual(BadDish(), Solution.get_dish(1), 'test 6.12')
+        with self.assertRaises(ZeroDivisionError):
+            with Solution.transaction():
+                self.assertEqual(ReturnValue.OK, Solution.add_dish(d), 'test 6.13')
+                1 / 0
+        self.assertEqual(BadDish(), Solution.get_dish(1), 'test 6.14')
+
+    def test_place_full_order(self) -> None:
+        self.assertEqual(ReturnValue.OK, Solution.add_customer(Customer(1, 'name', 21, "0123456789")), 'test 7.1')
+        self.assertEqual(ReturnValue.OK, Solution.add_dish(Dish(1, 'dish', 10, True)), 'test 7.2')
+        self.assertEqual(ReturnValue.OK, Solution.add_dish(Dish(2, 'dish', 2.5, True)), 'test 7.3')
+        self.assertEqual(ReturnValue.OK, Solution.add_dish(Dish(3, 'dish', 4, False)), 'test 7.4')
+        o = Order(1, datetime(year=2020, month=5, day=1, hour=20), 3, "address 1")
+        self.assertEqual(ReturnValue.OK, Solution.place_full_order(o, 1, [(1, 2), (2, 4)]), 'test 7.5')
+        self.assertEqual(o, Solution.get_order(1), 'test 7.6')
+        self.assertEqual(Customer(1, 'name', 21, "0123456789"), Solution.get_customer_that_placed_order(1),
+                         'test 7.7')
+        self.assertEqual([OrderDish(1, 2, 10), OrderDish(2, 4, 2.5)], Solution.get_all_order_items(1), 'test 7.8')
+        self.assertEqual(33.0, Solution.get_order_total_price(1), 'test 7.9')
+        self.assertEqual(ReturnValue.ALREADY_EXISTS, Solution.place_full_order(o, None, []), 'test 7.10')
+        o2 = Order(2, datetime(year=2020, month=5, day=2, hour=20), 3, "address 2")
+        self.assertEqual(ReturnValue.NOT_EXISTS, Solution.place_full_order(o2, 1, [(1, 1), (3, 1)]), 'test 7.11')
+        self.assertEqual(ReturnValue.NOT_EXISTS, Solution.place_full_order(o2, 2, [(1, 1)]), 'test 7.12')
+        self.assertEqual(ReturnValue.BAD_PARAMS, Solution.place_full_order(o2, 1, [(1, -1)]), 'test 7.13')
+        self.assertEqual(ReturnValue.ALREADY_EXISTS, Solution.place_full_order(o2, 1, [(1, 1), (1, 2)]), 'test 7.14')
+        self.assertEqual(BadOrder(), Solution.get_order(2), 'test 7.15')
+        self.assertEqual(ReturnValue.OK, Solution.place_full_order(o2, None, []), 'test 7.16')
+        self.assertEqual(BadCustomer(), Solution.get_customer_that_placed_order(2), 'test 7.17')
+
+    def test_pagination(self) -> None:
+        self.assertEqual(ReturnValue.OK, Solution.add_customer(Customer(1, 'name', 21, "0123456789")), 'test 8.1')
+        o = Order(1, datetime(year=2020, month=5, day=1, hour=20), 3, "address 1")
+        self.assertEqual(ReturnValue.OK, Solution.add_order(o), 'test 8.2')
+        for dish_id in range(1, 8):
+            self.assertEqual(ReturnValue.OK, Solution.add_dish(Dish(dish_id, 'dish', dish_id, True)), 'test 8.3')
+            self.assertEqual(ReturnValue.OK, Solution.order_contains_dish(1, dish_id, 1), 'test 8.4')
+            self.assertEqual(ReturnValue.OK, Solution.customer_rated_dish(1, dish_id, 1 + dish_id % 5), 'test 8.5')
+        items = Solution.get_all_order_items(1)
+        ratings = Solution.get_all_customer_ratings(1)
+        self.assertEqual(items[:3], Solution.get_order_items_page(1, limit=3), 'test 8.6')
+        self.assertEqual(items[3:6], Solution.get_order_items_page(1, after_dish_id=3, limit=3), 'test 8.7')
+        self.assertEqual([], Solution.get_order_items_page(1, after_dish_id=7), 'test 8.8')
+        self.assertEqual(ratings[5:], Solution.get_customer_ratings_page(1, after_dish_id=5), 'test 8.9')
+        for page_size in (1, 3, 7, 100):
+            self.assertEqual(items, list(Solution.iter_order_items(1, page_size)), 'test 8.10')
+            self.assertEqual(ratings, list(Solution.iter_customer_ratings(1, page_size)), 'test 8.11')
+        self.assertEqual([], list(Solution.iter_order_items(2)), 'test 8.12')
+        # a page holds at least one row, checked before anything is fetched
+        for page_size in (0, -1):
+            with self.assertRaises(ValueError, msg='test 8.13'):
+                Solution.iter_order_items(1, page_size)
+            with self.assertRaises(ValueError, msg='test 8.14'):
+                Solution.iter_customer_ratings(1, page_size)
+            with self.assertRaises(ValueError, msg='test 8.15'):
+                Solution.get_order_items_page(1, limit=page_size)
+            with self.assertRaises(ValueError, msg='test 8.16'):
+                Solution.get_customer_ratings_page(1, limit=page_size)
+
+    def test_recommendation_components(self) -> None:
+        for cust_id in range(1, 5):
+            self.assertEqual(ReturnValue.OK, Solution.add_customer(Customer(cust_id, 'name', 21, "0123456789")),
+                             'test 9.1')
+        for dish_id in range(1, 6):
+            self.assertEqual(ReturnValue.OK, Solution.add_dish(Dish(dish_id, 'dish', 10, True)), 'test 9.2')
+        # 1 - dish 1 - 2 - dish 2 - 3, and 4 on its own
+        for cust_id, dish_id, rating in [(1, 1, 5), (2, 1, 4), (2, 2, 5), (3, 2, 4), (3, 3, 2), (4, 4, 5),
+                                         (4, 5, 1)]:
+            self.assertEqual(ReturnValue.OK, Solution.customer_rated_dish(cust_id, dish_id, rating), 'test 9.3')
+        self.assertEqual([1, 2, 3], Solution.get_potential_dish_recommendations(1), 'test 9.4')
+        self.assertEqual([1, 2, 3], Solution.get_potential_dish_recommendations(3), 'test 9.5')
+        self.assertEqual([4, 5], Solution.get_potential_dish_recommendations(4), 'test 9.6')
+        # joining 4 through dish 4 merges both components
+        self.assertEqual(ReturnValue.OK, Solution.customer_rated_dish(3, 4, 4), 'test 9.7')
+        self.assertEqual([1, 2, 3, 4, 5], Solution.get_potential_dish_recommendations(1), 'test 9.8')
+        # without the rating of 2 on dish 2 the chain breaks between 2 and 3
+        self.assertEqual(ReturnValue.OK, Solution.customer_deleted_rating_on_dish(2, 2), 'test 9.9')
+        self.assertEqual([1], Solution.get_potential_dish_recommendations(1), 'test 9.10')
+        self.assertEqual([2, 3, 4, 5], Solution.get_potential_dish_recommendations(4), 'test 9.11')
+        self.assertEqual(ReturnValue.OK, Solution.customer_deleted_rating_on_dish(1, 1), 'test 9.12')
+        self.assertEqual([1], Solution.get_potential_dish_recommendations(2), 'test 9.13')
+        self.assertEqual([], Solution.get_potential_dish_recommendations(1), 'test 9.14')
+        # ordered dishes are left out
+        o = Order(1, datetime(year=2020, month=5, day=1, hour=20), 3, "address 1")
+        self.assertEqual(ReturnValue.OK, Solution.place_full_order(o, 4, [(2, 1)]), 'test 9.15')
+        self.assertEqual([3, 4, 5], Solution.get_potential_dish_recommendations(4), 'test 9.16')
+
+    def test_monthly_revenue(self) -> None:
+        self.assertEqual(ReturnValue.OK, Solution.add_dish(Dish(1, 'dish', 10, True)), 'test 10.1')
+        orders = [Order(1, datetime(year=2020, month=1, day=31, hour=23), 5, "address 1"),
+                  Order(2, datetime(year=2020, month=3, day=1, hour=0), 1, "address 2"),
+                  Order(3, datetime(year=2020, month=3, day=15), 2, "address 3"),
+                  Order(4, datetime(year=2021, month=1, day=1), 100, "address 4"),
+                  Order(5, datetime(year=2019, month=12, day=31, hour=23), 100, "address 5")]
+        self.assertEqual([ReturnValue.OK] * 5, Solution.add_orders(orders), 'test 10.2')
+        self.assertEqual(ReturnValue.OK, Solution.order_contains_dish(1, 1, 2), 'test 10.3')
+        self.assertEqual(ReturnValue.OK, Solution.order_contains_dish(3, 1, 1), 'test 10.4')
+        expected = [(month, 25.0 + 13.0 * (month >= 3)) for month in range(12, 0, -1)]
+        self.assertEqual(expected, Solution.get_cumulative_profit_per_month(2020), 'test 10.5')
+        self.assertEqual(ReturnValue.OK, Solution.order_does_not_contain_dish(1, 1), 'test 10.6')
+        self.assertEqual(ReturnValue.OK, Solution.delete_order(3), 'test 10.7')
+        expected = [(month, 5.0 + 1.0 * (month >= 3)) for month in range(12, 0, -1)]
+        self.assertEqual(expected, Solution.get_cumulative_profit_per_month(2020), 'test 10.8')
+        self.assertEqual([(month, 0.0) for month in range(12, 0, -1)], Solution.get_cumulative_profit_per_month(2022),
+                         'test 10.9')
+
+    def test_cumulative_profit_range(self) -> None:
+        orders = [Order(1, datetime(year=2020, month=1, day=31, hour=23), 5, "address 1"),
+                  Order(2, datetime(year=2020, month=3, day=1), 1, "address 2"),
+                  Order(3, datetime(year=2022, month=12, day=31, hour=23), 100, "address 3")]
+        self.assertEqual([ReturnValue.OK] * 3, Solution.add_orders(orders), 'test 11.1')
+        profits = Solution.get_cumulative_profit_range(2019, 2022)
+        self.assertEqual(48, len(profits), 'test 11.2')
+        for year in range(2019, 2023):
+            self.assertEqual([(year, month, profit) for month, profit in Solution.get_cumulative_profit_per_month(year)],
+                             [row for row in profits if row[0] == year], 'test 11.3')
+        self.assertEqual([], Solution.get_cumulative_profit_range(2023, 2022), 'test 11.4')
+        try:
+            import numpy
+        except ImportError:
+            return
+        matrix = Solution.get_cumulative_profit_range(2020, 2022, as_numpy=True)
+        self.assertEqual((3, 12), matrix.shape, 'test 11.5')
+        self.assertEqual([6.0] * 10 + [5.0, 5.0], matrix[0].tolist(), 'test 11.6')
+        self.assertEqual([100.0] + [0.0] * 11, matrix[2].tolist(), 'test 11.7')
+
+    def test_price_stats(self) -> None:
+        self.assertEqual(ReturnValue.OK, Solution.add_dish(Dish(1, 'dish', 10, True)), 'test 12.1')
+        self.assertEqual(ReturnValue.OK, Solution.add_dish(Dish(2, 'dish', 10, True)), 'test 12.2')
+        for order_id in range(1, 7):
+            o = Order(order_id, datetime(year=2020, month=5, day=order_id), 1, "address 1")
+            self.assertEqual(ReturnValue.OK, Solution.add_order(o), 'test 12.3')
+        # at 10 dish 1 averages 3 * 10, at 20 it averages 1 * 20, at 12 nothing was ordered
+        self.assertEqual(ReturnValue.OK, Solution.order_contains_dish(1, 1, 2), 'test 12.4')
+        self.assertEqual(ReturnValue.OK, Solution.order_contains_dish(2, 1, 4), 'test 12.5')
+        self.assertEqual(ReturnValue.OK, Solution.order_contains_dish(1, 2, 1), 'test 12.6')
+        self.assertEqual(ReturnValue.OK, Solution.update_dish_price(1, 20), 'test 12.7')
+        self.assertEqual(ReturnValue.OK, Solution.update_dish_price(2, 20), 'test 12.8')
+        self.assertEqual(ReturnValue.OK, Solution.order_contains_dish(3, 1, 1), 'test 12.9')
+        self.assertEqual(ReturnValue.OK, Solution.order_contains_dish(3, 2, 1), 'test 12.10')
+        self.assertEqual([1], Solution.get_non_worth_price_increase(), 'test 12.11')
+        # now 1 * 20 against 2 * 10, no longer worse
+        self.assertEqual(ReturnValue.OK, Solution.order_does_not_contain_dish(2, 1), 'test 12.12')
+        self.assertEqual(ReturnValue.OK, Solution.order_contains_dish(4, 1, 1), 'test 12.13')
+        self.assertEqual([], Solution.get_non_worth_price_increase(), 'test 12.14')
+        self.assertEqual(ReturnValue.OK, Solution.update_dish_price(1, 12), 'test 12.15')
+        self.assertEqual([], Solution.get_non_worth_price_increase(), 'test 12.16')
+        self.assertEqual(ReturnValue.OK, Solution.order_contains_dish(5, 1, 1), 'test 12.17')
+        self.assertEqual([1], Solution.get_non_worth_price_increase(), 'test 12.18')
+        self.assertEqual(ReturnValue.OK, Solution.delete_order(5), 'test 12.19')
+        self.assertEqual([], Solution.get_non_worth_price_increase(), 'test 12.20')
+
+    def test_anonymous_dish_amounts(self) -> None:
+        for cust_id in (1, 2):
+            self.assertEqual(ReturnValue.OK, Solution.add_customer(Customer(cust_id, 'name', 21, "0123456789")),
+                             'test 13.1')
+        dishes = [Dish(dish_id, 'dish', 10, True) for dish_id in (1, 2, 3)]
+        self.assertEqual([ReturnValue.OK] * 3, Solution.add_dishes(dishes), 'test 13.2')
+        for order_id in range(1, 5):
+            o = Order(order_id, datetime(year=2020, month=5, day=order_id), 1, "address 1")
+            self.assertEqual(ReturnValue.OK, Solution.add_order(o), 'test 13.3')
+        # 1 and 2 anonymous, 3 placed by 1 and 4 placed by 2
+        self.assertEqual(ReturnValue.OK, Solution.order_contains_dish(1, 1, 2), 'test 13.4')
+        self.assertEqual(ReturnValue.OK, Solution.order_contains_dish(2, 2, 3), 'test 13.5')
+        self.assertEqual(ReturnValue.OK, Solution.customer_placed_order(1, 3), 'test 13.6')
+        self.assertEqual(ReturnValue.OK, Solution.order_contains_dish(3, 3, 10), 'test 13.7')
+        self.assertEqual(ReturnValue.OK, Solution.order_contains_dish(4, 1, 5), 'test 13.8')
+        self.assertEqual(ReturnValue.OK, Solution.order_contains_dish(4, 2, 1), 'test 13.9')
+        self.assertEqual(ReturnValue.OK, Solution.customer_placed_order(2, 4), 'test 13.10')
+        self.assertEqual(dishes[1], Solution.get_most_purchased_dish_among_anonymous_order(), 'test 13.11')
+        # deleting customer 1 makes order 3 anonymous again
+        self.assertEqual(ReturnValue.OK, Solution.delete_customer(1), 'test 13.12')
+        self.assertEqual(dishes[2], Solution.get_most_purchased_dish_among_anonymous_order(), 'test 13.13')
+        self.assertEqual(ReturnValue.OK, Solution.order_does_not_contain_dish(3, 3), 'test 13.14')
+        self.assertEqual(dishes[1], Solution.get_most_purchased_dish_among_anonymous_order(), 'test 13.15')
+        self.assertEqual(ReturnValue.OK, Solution.delete_order(2), 'test 13.16')
+        self.assertEqual(dishes[0], Solution.get_most_purchased_dish_among_anonymous_order(), 'test 13.17')
+        # a deleted placed order takes nothing from the anonymous amounts
+        self.assertEqual(ReturnValue.OK, Solution.delete_order(4), 'test 13.18')
+        self.assertEqual(dishes[0], Solution.get_most_purchased_dish_among_anonymous_order(), 'test 13.19')
+        self.assertEqual(ReturnValue.OK, Solution.order_contains_dish(1, 2, 2), 'test 13.20')
+        self.assertEqual(dishes[0], Solution.get_most_purchased_dish_among_anonymous_order(), 'test 13.21')
+
+    def test_anonymous_dish_amounts_full_order(self) -> None:
+        for cust_id in (1, 2):
+            self.assertEqual(ReturnValue.OK, Solution.add_customer(Customer(cust_id, 'name', 21, "0123456789")),
+                             'test 13.22')
+        dishes = [Dish(dish_id, 'dish', 10, True) for dish_id in (1, 2)]
+        self.assertEqual([ReturnValue.OK] * 2, Solution.add_dishes(dishes), 'test 13.23')
+        # the order, its customer and its items are written by one statement
+        o = Order(1, datetime(year=2020, month=5, day=1), 1, "address 1")
+        self.assertEqual(ReturnValue.OK, Solution.place_full_order(o, 1, [(1, 50)]), 'test 13.24')
+        o = Order(2, datetime(year=2020, month=5, day=2), 1, "address 1")
+        self.assertEqual(ReturnValue.OK, Solution.place_full_order(o, None, [(1, 2)]), 'test 13.25')
+        o = Order(3, datetime(year=2020, month=5, day=3), 1, "address 1")
+        self.assertEqual(ReturnValue.OK, Solution.place_full_order(o, None, [(2, 1)]), 'test 13.26')
+        self.assertEqual(dishes[0], Solution.get_most_purchased_dish_among_anonymous_order(), 'test 13.27')
+        self.assertEqual(ReturnValue.OK, Solution.delete_order(2), 'test 13.28')
+        self.assertEqual(dishes[1], Solution.get_most_purchased_dish_among_anonymous_order(), 'test 13.29')
+        # the placed order joins the anonymous ones once its customer is gone
+        self.assertEqual(ReturnValue.OK, Solution.delete_customer(1), 'test 13.30')
+        self.assertEqual(dishes[0], Solution.get_most_purchased_dish_among_anonymous_order(), 'test 13.31')
+        o = Order(4, datetime(year=2020, month=5, day=4), 1, "address 1")
+        self.assertEqual(ReturnValue.OK, Solution.place_full_order(o, 2, [(2, 100)]), 'test 13.32')
+        self.assertEqual(dishes[0], Solution.get_most_purchased_dish_among_anonymous_order(), 'test 13.33')
+        self.assertEqual(ReturnValue.OK, Solution.delete_order(4), 'test 13.34')
+        self.assertEqual(dishes[0], Solution.get_most_purchased_dish_among_anonymous_order(), 'test 13.35')
+
+    def test_customer_spend(self) -> None:
+        for cust_id in (1, 2, 3):
+            self.assertEqual(ReturnValue.OK, Solution.add_customer(Customer(cust_id, 'name', 21, "0123456789")),
+                             'test 14.1')
+        self.assertEqual(ReturnValue.OK, Solution.add_dish(Dish(1, 'dish', 10, True)), 'test 14.2')
+        self.assertEqual([], Solution.get_customers_spent_max_avg_amount_money(), 'test 14.3')
+        # fees 5, 10, 15, 20 and 25
+        for order_id in range(1, 6):
+            o = Order(order_id, datetime(year=2020, month=5, day=order_id), 5 * order_id, "address 1")
+            self.assertEqual(ReturnValue.OK, Solution.add_order(o), 'test 14.4')
+        # 1 spends 5 and 25, 2 spends 15 and 3 spends 10 and 20
+        for cust_id, order_id in ((1, 1), (1, 5), (2, 3), (3, 2), (3, 4)):
+            self.assertEqual(ReturnValue.OK, Solution.customer_placed_order(cust_id, order_id), 'test 14.5')
+        self.assertEqual([1, 2, 3], Solution.get_customers_spent_max_avg_amount_money(), 'test 14.6')
+        self.assertEqual(ReturnValue.OK, Solution.order_contains_dish(2, 1, 1), 'test 14.7')
+        self.assertEqual([3], Solution.get_customers_spent_max_avg_amount_money(), 'test 14.8')
+        self.assertEqual(ReturnValue.OK, Solution.order_does_not_contain_dish(2, 1), 'test 14.9')
+        self.assertEqual(ReturnValue.OK, Solution.order_contains_dish(3, 1, 1), 'test 14.10')
+        self.assertEqual([2], Solution.get_customers_spent_max_avg_amount_money(), 'test 14.11')
+        # an anonymous order counts for nobody, and the last order of a customer takes it out
+        self.assertEqual(ReturnValue.OK, Solution.delete_customer(2), 'test 14.12')
+        self.assertEqual([1, 3], Solution.get_customers_spent_max_avg_amount_money(), 'test 14.13')
+        self.assertEqual(ReturnValue.OK, Solution.delete_order(1), 'test 14.14')
+        self.assertEqual([1], Solution.get_customers_spent_max_avg_amount_money(), 'test 14.15')
+        self.assertEqual(ReturnValue.OK, Solution.delete_order(5), 'test 14.16')
+        self.assertEqual([3], Solution.get_customers_spent_max_avg_amount_money(), 'test 14.17')
+
+    def test_add_ratings(self) -> None:
+        self.assertEqual([ReturnValue.OK] * 5,
+                         Solution.add_customers(Customer(i, 'name', 21, "0123456789") for i in range(1, 6)),
+                         'test 15.1')
+        self.assertEqual([ReturnValue.OK] * 4, Solution.add_dishes(Dish(i, 'dish', 10, True) for i in range(1, 5)),
+                         'test 15.2')
+        ratings = [(1, 1, 5), (2, 1, 4), (2, 2, 5), (3, 2, 4),
+                   (9, 1, 5),  # no customer 9
+                   (1, 2, 6),  # rating > 5
+                   (1, 1, 3),  # duplicate of the first row
+                   (4, 3, 5), (5, 4, 2)]
+        self.assertEqual([ReturnValue.OK] * 4 + [ReturnValue.NOT_EXISTS, ReturnValue.BAD_PARAMS,
+                                                 ReturnValue.ALREADY_EXISTS, ReturnValue.OK, ReturnValue.OK],
+                         Solution.add_ratings(ratings), 'test 15.3')
+        self.assertEqual([], Solution.add_ratings([]), 'test 15.4')
+        # 1 - dish 1 - 2 - dish 2 - 3, rebuilt once the ratings were copied
+        self.assertEqual([1, 2], Solution.get_potential_dish_recommendations(1), 'test 15.5')
+        self.assertEqual([1, 2], Solution.get_potential_dish_recommendations(3), 'test 15.6')
+        self.assertEqual([3], Solution.get_potential_dish_recommendations(4), 'test 15.7')
+        self.assertEqual([4], Solution.get_potential_dish_recommendations(5), 'test 15.8')
+        # the ratings added afterwards are merged as usual
+        self.assertEqual(ReturnValue.OK, Solution.customer_rated_dish(4, 2, 4), 'test 15.9')
+        self.assertEqual([1, 2, 3], Solution.get_potential_dish_recommendations(1), 'test 15.10')
+        # deleting 2 removes both of their ratings in one statement, which cuts 1 off
+        self.assertEqual(ReturnValue.OK, Solution.delete_customer(2), 'test 15.11')
+        self.assertEqual([1], Solution.get_potential_dish_recommendations(1), 'test 15.12')
+        self.assertEqual([2, 3], Solution.get_potential_dish_recommendations(3), 'test 15.13')
+        # the dish ratings are rebuilt too: dish 10 is rated lowest, ahead of the unrated dishes 5 to 9
+        self.assertEqual([ReturnValue.OK] * 6, Solution.add_dishes(Dish(i, 'dish', 10, True) for i in range(5, 11)),
+                         'test 15.14')
+        self.assertEqual([ReturnValue.OK], Solution.add_ratings([(3, 10, 1)]), 'test 15.15')
+        self.assertEqual([3, 5], Solution.get_customers_rated_but_not_ordered(), 'test 15.16')
+
+    # runs statement on a connection of its own, the way another process would write, and waits until the
+    # listener of this process has evicted as many dishes as that NOTIFYed
+    def write_elsewhere(self, statement: str) -> bool:
+        invalidations = Solution.dish_cache.stats()['invalidations']
+        connection = psycopg2.connect(**Connector.load_config())
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(statement)
+                notified = cursor.rowcount
+            connection.commit()
+        finally:
+            connection.close()
+        deadline = time.monotonic() + 5
+        while Solution.dish_cache.stats()['invalidations'] < invalidations + notified:
+            if time.monotonic() > deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def test_cache_invalidation(self) -> None:
+        d = Dish(1, 'dish', 10, True)
+        self.assertEqual(ReturnValue.OK, Solution.add_dish(d), 'test 16.1')
+        CacheInvalidation.ensure_listener(Solution._caches)
+        self.assertTrue(CacheInvalidation._listener.wait_listening(5), 'test 16.2')
+        # a NOTIFY of our own, once it arrives so did the '*' of create_tables, which would empty the cache later
+        self.assertTrue(self.write_elsewhere("SELECT pg_notify('" + CacheInvalidation.CHANNEL + "', 'dish:0')"),
+                        'test 16.3')
+        self.assertEqual(d, Solution.get_dish(1), 'test 16.4')
+        hits = Solution.dish_cache.stats()['hits']
+        self.assertEqual(d, Solution.get_dish(1), 'test 16.5')
+        self.assertEqual(hits + 1, Solution.dish_cache.stats()['hits'], 'test 16.6')
+        self.assertTrue(self.write_elsewhere("UPDATE Dishes SET price = 20 WHERE dish_id = 1"), 'test 16.7')
+        misses = Solution.dish_cache.stats()['misses']
+        self.assertEqual(Dish(1, 'dish', 20, True), Solution.get_dish(1), 'test 16.8')
+        self.assertEqual(misses + 1, Solution.dish_cache.stats()['misses'], 'test 16.9')
+
+
+# this is the main, not a must to use it
+if __name__ == '__main__':
+    unittest.main(verbosity=2, exit=False)
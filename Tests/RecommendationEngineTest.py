@@ -0,0 +1,66 @@
+import random
+import unittest
+
+try:
+    import numpy
+    import scipy
+except ImportError:
+    numpy = None
+
+'''
+    RecommendationEngine against a direct transcription of the SQL of get_potential_dish_recommendations,
+    no database needed
+'''
+
+
+# the recursive SimilarCustomers closure and the anti-join of the SQL version, row by row
+def reference(ratings: list, ordered: set, cust_id: int) -> list:
+    similar = {cust_id}
+    changed = True
+    while changed:
+        changed = False
+        dishes = {d for c, d, r in ratings if c in similar and r >= 4}
+        for c, d, r in ratings:
+            if d in dishes and r >= 4 and c not in similar:
+                similar.add(c)
+                changed = True
+    return sorted({d for c, d, r in ratings if c in similar and (cust_id, d) not in ordered})
+
+
+@unittest.skipIf(numpy is None, "numpy and scipy are not installed")
+class Test(unittest.TestCase):
+    def engine(self, ratings: list, ordered: set):
+        from RecommendationEngine import RecommendationEngine
+        return RecommendationEngine(tuple(zip(*ratings)) if ratings else ((), (), ()),
+                                    tuple(zip(*ordered)) if ordered else ((), ()))
+
+    def test_small(self) -> None:
+        # 1 - dish 1 - 2 - dish 2 - 3, 4 only rated low
+        ratings = [(1, 1, 5), (2, 1, 4), (2, 2, 5), (3, 2, 4), (3, 3, 2), (4, 4, 3), (4, 5, 1)]
+        ordered = {(1, 3), (4, 5), (9, 1)}
+        engine = self.engine(ratings, ordered)
+        self.assertEqual([1, 2], engine.recommend(1), 'test 1.1')
+        self.assertEqual([[1, 2, 3], [4], [], [1, 2]], engine.recommend_batch([3, 4, 9, 1]), 'test 1.2')
+
+    def test_empty(self) -> None:
+        engine = self.engine([], set())
+        self.assertEqual([[], []], engine.recommend_batch([1, 2]), 'test 2.1')
+        self.assertEqual([], engine.recommend_batch([]), 'test 2.2')
+
+    def test_random_against_reference(self) -> None:
+        rng = random.Random(7)
+        for customers, dishes in ((20, 10), (60, 40), (100, 300)):
+            ratings = {}
+            for _ in range(customers * 2):
+                ratings[(rng.randint(1, customers), rng.randint(1, dishes))] = rng.randint(1, 5)
+            ratings = [(c, d, r) for (c, d), r in ratings.items()]
+            ordered = {(rng.randint(1, customers + 5), rng.randint(1, dishes + 5)) for _ in range(customers)}
+            engine = self.engine(ratings, ordered)
+            cust_ids = list(range(1, customers + 6))
+            self.assertEqual([reference(ratings, ordered, c) for c in cust_ids], engine.recommend_batch(cust_ids),
+                             'test 3.1')
+
+
+# this is the main, not a must to use it
+if __name__ == '__main__':
+    unittest.main(verbosity=2, exit=False)
@@ -0,0 +1,84 @@
+import unittest
+from collections import namedtuple
+from datetime import datetime
+from decimal import Decimal
+
+from Utility.DBConnector import ResultSet
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+'''
+    ResultSet does not need a database, these tests run on hand made cursor descriptions
+'''
+
+Column = namedtuple('Column', 'name')
+DESCRIPTION = [Column('dish_id'), Column('amount'), Column('price')]
+ROWS = [(1, 2, 10.0), (2, 1, 5.5), (3, 7, 2.0)]
+
+
+class Test(unittest.TestCase):
+    def test_materialized(self) -> None:
+        result = ResultSet(DESCRIPTION, list(ROWS))
+        self.assertEqual(3, result.size(), 'test 1.1')
+        self.assertFalse(result.isEmpty(), 'test 1.2')
+        self.assertFalse(result.isStreaming(), 'test 1.3')
+        self.assertEqual([2, 1, 7], result['AMOUNT'], 'test 1.4')
+        self.assertEqual(5.5, result[1]['price'], 'test 1.5')
+        self.assertEqual([1, 2, 3], [row['dish_id'] for row in result], 'test 1.6')
+        self.assertTrue(ResultSet().isEmpty(), 'test 1.7')
+
+    def test_rows(self) -> None:
+        result = ResultSet(DESCRIPTION, list(ROWS))
+        row = result[0]
+        self.assertEqual({'dish_id': 1, 'amount': 2, 'price': 10.0}, row, 'test 3.1')
+        self.assertEqual(2, row['Amount'], 'test 3.2')
+        self.assertIsNone(row[0], 'test 3.3')
+        self.assertIn('price', row, 'test 3.4')
+        self.assertNotIn('name', row, 'test 3.5')
+        self.assertEqual(['dish_id', 'amount', 'price'], list(row.keys()), 'test 3.6')
+        self.assertEqual(ROWS[0], row.astuple(), 'test 3.7')
+        self.assertRaises(KeyError, lambda: row['name'])
+        column = result.column('price')
+        self.assertEqual(3, len(column), 'test 3.8')
+        self.assertEqual(2.0, column[-1], 'test 3.9')
+        self.assertEqual([10.0, 5.5], column[:2], 'test 3.10')
+        self.assertEqual([10.0, 5.5, 2.0], list(column), 'test 3.11')
+
+    def test_streamed(self) -> None:
+        result = ResultSet(DESCRIPTION, iter(ROWS))
+        self.assertTrue(result.isStreaming(), 'test 2.1')
+        self.assertFalse(result.isEmpty(), 'test 2.2')
+        self.assertEqual([1, 2, 3], [row['dish_id'] for row in result], 'test 2.3')
+        # the rows were handed out without being kept
+        self.assertFalse(result.isStreaming(), 'test 2.4')
+        self.assertEqual(0, result.size(), 'test 2.5')
+        result = ResultSet(DESCRIPTION, iter(ROWS))
+        self.assertEqual(ROWS, result.rows, 'test 2.6')
+        self.assertEqual([10.0, 5.5, 2.0], result['price'], 'test 2.7')
+        self.assertTrue(ResultSet(DESCRIPTION, iter([])).isEmpty(), 'test 2.8')
+
+    def test_to_columns(self) -> None:
+        description = [Column('order_id'), Column('total_price'), Column('date')]
+        rows = [(1, Decimal('12.5'), datetime(2024, 1, 1, 10)), (2, Decimal('7'), datetime(2024, 2, 1, 10))]
+        expected = {'order_id': [1, 2], 'total_price': [12.5, 7.0],
+                    'date': [datetime(2024, 1, 1, 10), datetime(2024, 2, 1, 10)]}
+        self.assertEqual(expected, ResultSet(description, rows).to_columns(), 'test 4.1')
+        self.assertEqual(expected, ResultSet(description, iter(rows)).to_columns(), 'test 4.2')
+
+    @unittest.skipIf(numpy is None, 'numpy is not installed')
+    def test_to_numpy(self) -> None:
+        description = [Column('order_id'), Column('total_price'), Column('date'), Column('cust_id')]
+        rows = [(1, Decimal('12.5'), datetime(2024, 1, 1, 10), 3), (2, Decimal('7'), datetime(2024, 2, 1, 10), None)]
+        columns = ResultSet(description, iter(rows)).to_numpy()
+        self.assertEqual(numpy.int64, columns['order_id'].dtype, 'test 5.1')
+        self.assertEqual([12.5, 7.0], columns['total_price'].tolist(), 'test 5.2')
+        self.assertEqual(numpy.datetime64('2024-02-01T10:00:00'), columns['date'][1], 'test 5.3')
+        self.assertTrue(numpy.isnan(columns['cust_id'][1]), 'test 5.4')
+
+
+# this is the main, not a must to use it
+if __name__ == '__main__':
+    unittest.main(verbosity=2, exit=False)
@@ -0,0 +1,131 @@
+import time
+import unittest
+
+from Utility.DBConnector import DBConnector
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+'''
+    iter_query and execute_stream against a real named cursor, no tables needed. the rows come from
+    nextval on a sequence, so how far the sequence moved tells how many rows the server has produced
+'''
+
+ROWS = 100
+ITERSIZE = 7
+QUERY = "SELECT nextval('stream_test_seq')::INTEGER AS n, nextval('stream_test_seq') / 4.0 AS quarter " \
+        "FROM generate_series(1, " + str(ROWS) + ")"
+
+
+class Test(unittest.TestCase):
+    def setUp(self) -> None:
+        self.conn = None
+        self.observer = DBConnector()
+        self.observer.execute("DROP SEQUENCE IF EXISTS stream_test_seq; "
+                              "CREATE SEQUENCE stream_test_seq INCREMENT BY 1 START WITH 1")
+
+    def tearDown(self) -> None:
+        if self.conn is not None:
+            self.conn.close()
+        self.observer.execute("DROP SEQUENCE IF EXISTS stream_test_seq")
+        self.observer.close()
+
+    # rows the server has produced so far, each row calls nextval twice
+    def produced(self) -> int:
+        _, result = self.observer.execute("SELECT CASE WHEN is_called THEN last_value ELSE 0 END AS n "
+                                          "FROM stream_test_seq")
+        return result[0]['n'] // 2
+
+    # the state of conn's backend and the number of cursors open on it, seen from another connection
+    def backend(self, conn: DBConnector) -> tuple:
+        pid = conn.connection.get_backend_pid()
+        with conn.connection.cursor() as cursor:
+            cursor.execute("SELECT count(*) FROM pg_cursors")
+            cursors = cursor.fetchone()[0]
+        state = None
+        for _ in range(100):
+            _, result = self.observer.execute("SELECT state FROM pg_stat_activity WHERE pid = " + str(pid))
+            state = result[0]['state']
+            if state != 'active':
+                break
+            time.sleep(0.05)
+        return state, cursors
+
+    def test_iter_query_batches(self) -> None:
+        self.conn = DBConnector()
+        rows = self.conn.iter_query(QUERY, itersize=ITERSIZE)
+        self.assertEqual(0, self.produced(), 'test 1.1')
+        self.assertEqual(1, next(rows)[0], 'test 1.2')
+        self.assertEqual(ITERSIZE, self.produced(), 'test 1.3')
+        # the first batch is read from memory, the row after it costs one more round trip
+        for _ in range(ITERSIZE - 1):
+            next(rows)
+        self.assertEqual(ITERSIZE, self.produced(), 'test 1.4')
+        next(rows)
+        self.assertEqual(2 * ITERSIZE, self.produced(), 'test 1.5')
+        rest = list(rows)
+        self.assertEqual(ROWS - ITERSIZE - 1, len(rest), 'test 1.6')
+        self.assertEqual(2 * ROWS - 1, rest[-1][0], 'test 1.7')
+        self.assertEqual(ROWS, self.produced(), 'test 1.8')
+        # the exhausted iterator closed its cursor
+        self.assertEqual(0, self.backend(self.conn)[1], 'test 1.9')
+
+    def test_execute_stream_columns(self) -> None:
+        self.conn = DBConnector()
+        result = self.conn.execute_stream(QUERY, itersize=ITERSIZE)
+        self.assertTrue(result.isStreaming(), 'test 2.1')
+        self.assertEqual(ITERSIZE, self.produced(), 'test 2.2')
+        columns = result.to_columns()
+        self.assertEqual(['n', 'quarter'], list(columns), 'test 2.3')
+        self.assertEqual(list(range(1, 2 * ROWS, 2)), columns['n'], 'test 2.4')
+        self.assertEqual([n / 2 for n in range(1, ROWS + 1)], columns['quarter'], 'test 2.5')
+        self.assertFalse(result.isStreaming(), 'test 2.6')
+        self.assertEqual(0, self.backend(self.conn)[1], 'test 2.7')
+        # the values are not kept, a second read finds the columns empty
+        self.assertEqual({'n': [], 'quarter': []}, result.to_columns(), 'test 2.8')
+
+    @unittest.skipIf(numpy is None, "needs numpy")
+    def test_execute_stream_numpy(self) -> None:
+        self.conn = DBConnector()
+        arrays = self.conn.execute_stream(QUERY, itersize=ITERSIZE).to_numpy()
+        self.assertEqual(numpy.int64, arrays['n'].dtype, 'test 3.1')
+        self.assertEqual(numpy.float64, arrays['quarter'].dtype, 'test 3.2')
+        self.assertEqual(ROWS, len(arrays['n']), 'test 3.3')
+        self.assertEqual(ROWS * ROWS, int(arrays['n'].sum()), 'test 3.4')
+        self.assertEqual(ROWS / 2, float(arrays['quarter'][-1]), 'test 3.5')
+        # a result smaller than one batch, and an empty one
+        small = self.conn.execute_stream("SELECT 1.5::DECIMAL AS x", itersize=ITERSIZE)
+        self.assertEqual([1.5], small.to_numpy()['x'].tolist(), 'test 3.6')
+        empty = self.conn.execute_stream("SELECT 1 AS x WHERE false", itersize=ITERSIZE)
+        self.assertTrue(empty.isEmpty(), 'test 3.7')
+        self.assertEqual({}, empty.to_numpy(), 'test 3.8')
+
+    def test_close_early(self) -> None:
+        self.conn = DBConnector()
+        rows = self.conn.iter_query(QUERY, itersize=ITERSIZE)
+        next(rows)
+        self.assertEqual(('idle in transaction', 1), self.backend(self.conn), 'test 4.1')
+        # leaving the loop early closes the cursor, no more rows are produced
+        rows.close()
+        self.assertEqual(0, self.backend(self.conn)[1], 'test 4.2')
+        self.assertEqual(ITERSIZE, self.produced(), 'test 4.3')
+        # closing the connector with a stream still open closes the stream and hands the connection back idle
+        result = self.conn.execute_stream(QUERY, itersize=ITERSIZE)
+        self.assertTrue(result.isStreaming(), 'test 4.4')
+        self.assertEqual(1, self.backend(self.conn)[1], 'test 4.5')
+        connection = self.conn.connection
+        pid = connection.get_backend_pid()
+        self.conn.close()
+        self.conn = None
+        self.assertFalse(connection.closed, 'test 4.6')
+        # a cursor without hold does not outlive its transaction, an idle backend has none left
+        _, state = self.observer.execute("SELECT state FROM pg_stat_activity WHERE pid = " + str(pid))
+        self.assertEqual('idle', state[0]['state'], 'test 4.7')
+        self.assertEqual(2 * ITERSIZE, self.produced(), 'test 4.8')
+
+
+# this is the main, not a must to use it
+if __name__ == '__main__':
+    unittest.main(verbosity=2, exit=False)
@@ -0,0 +1,317 @@
+import asyncio
+import time
+from collections import deque
+from collections.abc import Sequence
+from typing import Callable, Union
+
+import psycopg2
+from psycopg2 import errors, extensions, sql
+
+from Utility.DBConnector import PooledConnection, ResultSet, _statement_name, _translated_errors, load_config
+from Utility.Exceptions import DatabaseException
+
+
+# resolves future once the socket of the connection is readable / writable
+def _ready(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+# drives an asynchronous psycopg2 connection until the pending operation (connect or query) completes,
+# suspending the task instead of blocking the event loop while the server works
+async def _wait(connection) -> None:
+    loop = asyncio.get_running_loop()
+    while True:
+        state = connection.poll()
+        if state == extensions.POLL_OK:
+            return
+        future = loop.create_future()
+        fd = connection.fileno()
+        if state == extensions.POLL_READ:
+            loop.add_reader(fd, _ready, future)
+            remove = loop.remove_reader
+        elif state == extensions.POLL_WRITE:
+            loop.add_writer(fd, _ready, future)
+            remove = loop.remove_writer
+        else:
+            raise psycopg2.OperationalError("Unexpected poll state " + str(state))
+        try:
+            await future
+        finally:
+            remove(fd)
+
+
+class AsyncConnectionPool:
+    # a pool of asynchronous connections, shared by every AsyncDBConnector of one event loop.
+    # a task waiting for a connection is handed the next one returned, in arrival order.
+    # params is either the connection parameters or a function returning them for every new connection
+    def __init__(self, params: Union[dict, Callable[[], dict]], minconn: int = 0, maxconn: int = 10,
+                 idle_timeout: float = 300.0, health_check_after: float = 30.0, checkout_timeout: float = 30.0):
+        if minconn < 0 or maxconn < 1 or minconn > maxconn:
+            raise ValueError("AsyncConnectionPool expects 0 <= minconn <= maxconn and maxconn >= 1")
+        self.params = params
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.idle_timeout = idle_timeout
+        self.health_check_after = health_check_after
+        self.checkout_timeout = checkout_timeout
+        self.loop = asyncio.get_running_loop()
+        self.__idle = deque()  # (connection, returned_at), most recently returned on the right
+        self.__in_use = 0  # checked out connections, and connections being opened or probed
+        self.__waiters = deque()  # futures of the tasks waiting for a connection
+        self.__closed = False
+
+    async def __connect(self):
+        params = self.params() if callable(self.params) else self.params
+        connection = psycopg2.connect(connection_factory=PooledConnection, async_=1, **params)
+        try:
+            await _wait(connection)
+        except BaseException:
+            self.__discard(connection)
+            raise
+        return connection
+
+    def __total(self) -> int:
+        return len(self.__idle) + self.__in_use
+
+    # a connection that sat idle for a while may have been dropped by the server, so probe it first
+    async def __healthy(self, connection, returned_at: float) -> bool:
+        if connection.closed:
+            return False
+        if time.monotonic() - returned_at < self.health_check_after:
+            return True
+        try:
+            cursor = connection.cursor()
+            cursor.execute("SELECT 1")
+            await _wait(connection)
+            cursor.close()
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def __discard(connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    # close connections that stayed idle longer than idle_timeout, keeping at least minconn open
+    def __reap(self):
+        now = time.monotonic()
+        while len(self.__idle) > 0 and self.__total() > self.minconn \
+                and now - self.__idle[0][1] > self.idle_timeout:
+            connection, _ = self.__idle.popleft()
+            self.__discard(connection)
+
+    # hands the connection to the first task still waiting, or None to let it open a connection itself.
+    # returns whether somebody was waiting
+    def __hand_over(self, connection) -> bool:
+        while len(self.__waiters) > 0:
+            waiter = self.__waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(connection)
+                return True
+        return False
+
+    async def getconn(self):
+        deadline = time.monotonic() + self.checkout_timeout
+        while True:
+            if self.__closed:
+                raise DatabaseException.ConnectionInvalid("Connection pool is closed")
+            self.__reap()
+            if len(self.__idle) > 0:
+                connection, returned_at = self.__idle.pop()
+                self.__in_use += 1
+                try:
+                    healthy = await self.__healthy(connection, returned_at)
+                except BaseException:
+                    self.__release_slot(connection)
+                    raise
+                if healthy:
+                    return connection
+                self.__release_slot(connection)
+                continue
+            if self.__total() < self.maxconn:
+                # the slot is taken before connecting so concurrent checkouts do not overshoot maxconn
+                self.__in_use += 1
+                try:
+                    return await self.__connect()
+                except BaseException:
+                    self.__release_slot(None)
+                    raise
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise DatabaseException.ConnectionInvalid("Timed out waiting for a free connection")
+            waiter = self.loop.create_future()
+            self.__waiters.append(waiter)
+            try:
+                await asyncio.wait({waiter}, timeout=remaining)
+            except BaseException:
+                if not waiter.done():
+                    waiter.cancel()
+                elif not waiter.cancelled() and waiter.exception() is None:
+                    # this task is gone, pass on what was handed over to it
+                    if waiter.result() is not None:
+                        self.putconn(waiter.result())
+                    else:
+                        self.__hand_over(None)
+                raise
+            if not waiter.done():
+                waiter.cancel()
+                raise DatabaseException.ConnectionInvalid("Timed out waiting for a free connection")
+            if waiter.result() is not None:
+                # the connection was handed over while still counted as in use
+                return waiter.result()
+
+    def __release_slot(self, connection):
+        self.__in_use -= 1
+        if connection is not None:
+            self.__discard(connection)
+        self.__hand_over(None)
+
+    def putconn(self, connection, discard: bool = False):
+        # a connection is in autocommit mode, but one abandoned in the middle of a query cannot be reused
+        if discard or self.__closed or connection.closed or connection.isexecuting():
+            self.__release_slot(connection)
+            return
+        if self.__hand_over(connection):
+            return
+        self.__in_use -= 1
+        self.__idle.append((connection, time.monotonic()))
+        self.__reap()
+
+    def closeall(self):
+        self.__closed = True
+        while len(self.__idle) > 0:
+            connection, _ = self.__idle.pop()
+            self.__discard(connection)
+        while len(self.__waiters) > 0:
+            waiter = self.__waiters.popleft()
+            if not waiter.done():
+                waiter.set_exception(DatabaseException.ConnectionInvalid("Connection pool is closed"))
+
+
+_pool = None
+_pool_settings = {}
+
+
+def configure_pool(**settings) -> None:
+    # sets the AsyncConnectionPool arguments (minconn, maxconn, idle_timeout, ...) and rebuilds the pool lazily
+    global _pool, _pool_settings
+    _pool_settings = dict(settings)
+    close_pool()
+
+
+def close_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.closeall()
+    _pool = None
+
+
+# the pool of the running event loop, a pool never outlives the loop its connections are registered with
+def _get_pool() -> AsyncConnectionPool:
+    global _pool
+    if _pool is not None and _pool.loop is asyncio.get_running_loop():
+        return _pool
+    close_pool()
+    load_config()
+    _pool = AsyncConnectionPool(load_config, **_pool_settings)
+    return _pool
+
+
+# asyncio counterpart of DBConnector: every query suspends the calling task instead of blocking the thread,
+# so many tasks share a few connections. connections run in autocommit mode, every call is its own transaction
+class AsyncDBConnector:
+    def __init__(self, pool: AsyncConnectionPool, connection):
+        self.__pool = pool
+        self.connection = connection
+        self.cursor = connection.cursor()
+
+    # borrows a connection from the pool of the running event loop
+    @classmethod
+    async def connect(cls) -> "AsyncDBConnector":
+        pool = None
+        try:
+            pool = _get_pool()
+            connection = await pool.getconn()
+        except DatabaseException.database_ini_ERROR as e:
+            raise DatabaseException.ConnectionInvalid(str(e))
+        except DatabaseException.ConnectionInvalid:
+            raise
+        except Exception:
+            raise DatabaseException.ConnectionInvalid("Could not connect to database")
+        return cls(pool, connection)
+
+    async def __aenter__(self) -> "AsyncDBConnector":
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    # give the connection back to the pool
+    def close(self):
+        if self.cursor is not None:
+            try:
+                self.cursor.close()
+            except Exception:
+                pass
+            self.cursor = None
+        if self.connection is not None:
+            self.__pool.putconn(self.connection)
+            self.connection = None
+
+    async def __statement(self, query, params=None):
+        try:
+            self.cursor.execute(query, params)
+            await _wait(self.connection)
+        except psycopg2.Error:
+            raise
+        except BaseException:
+            # cancelled while the server was still working, the connection is left in an unknown state
+            self.__pool.putconn(self.connection, discard=True)
+            self.connection = None
+            self.cursor = None
+            raise
+
+    def __result(self, printSchema: bool) -> (int, ResultSet):
+        row_effected = max(self.cursor.rowcount, 0)
+        if self.cursor.description is not None:
+            entries = ResultSet(self.cursor.description, self.cursor.fetchall())
+        else:
+            entries = ResultSet()
+        if printSchema:
+            print(entries)
+        return row_effected, entries
+
+    # executes the query, if it is SELECT you may ask to print the results with printSchema
+    # returns the number of rows effected and a ResultSet (for SELECT)
+    async def execute(self, query: Union[str, sql.Composed], printSchema=False) -> (int, ResultSet):
+        if self.connection is None:
+            raise DatabaseException.ConnectionInvalid("Connection Invalid")
+        with _translated_errors():
+            await self.__statement(query)
+        return self.__result(printSchema)
+
+    # executes a query template with $1, $2, ... placeholders bound to params, see DBConnector.execute_prepared
+    async def execute_prepared(self, template: str, params: Sequence = (), printSchema=False) -> (int, ResultSet):
+        if self.connection is None:
+            raise DatabaseException.ConnectionInvalid("Connection Invalid")
+        name = _statement_name(template)
+        with _translated_errors():
+            try:
+                if name not in self.connection.prepared:
+                    await self.__statement("PREPARE " + name + " AS " + template)
+                    self.connection.prepared.add(name)
+                if len(params) == 0:
+                    await self.__statement("EXECUTE " + name)
+                else:
+                    await self.__statement("EXECUTE " + name + "(" + ", ".join(["%s"] * len(params)) + ")",
+                                           params)
+            except errors.lookup("26000"):
+                # somebody deallocated our statements (DISCARD ALL), prepare them again next time
+                self.connection.prepared.clear()
+                raise
+        return self.__result(printSchema)
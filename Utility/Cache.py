@@ -0,0 +1,70 @@
+from collections import OrderedDict
+import threading
+import time
+from typing import Any, Hashable, Optional
+
+
+# a thread safe LRU cache with a time to live, holding at most max_entries values.
+# readers that fetch a value from the database should take generation() before the query and pass it to put,
+# so a value read before a concurrent invalidate is not cached after it
+class LRUCache:
+    def __init__(self, max_entries: int = 4096, ttl: Optional[float] = 60.0):
+        if max_entries < 1:
+            raise ValueError("LRUCache needs room for at least one entry")
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.__entries = OrderedDict()  # key -> (value, expires_at), least recently used first
+        self.__lock = threading.Lock()
+        self.__generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self.__entries[key]
+                self.misses += 1
+                return default
+            self.__entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any, generation: Optional[int] = None) -> None:
+        with self.__lock:
+            if generation is not None and generation != self.__generation:
+                return
+            expires_at = None if self.ttl is None else time.monotonic() + self.ttl
+            self.__entries[key] = (value, expires_at)
+            self.__entries.move_to_end(key)
+            while len(self.__entries) > self.max_entries:
+                self.__entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> None:
+        with self.__lock:
+            self.__generation += 1
+            self.invalidations += 1
+            self.__entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self.__lock:
+            self.__generation += 1
+            self.__entries.clear()
+
+    def generation(self) -> int:
+        return self.__generation
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+    def stats(self) -> dict:
+        with self.__lock:
+            return {"size": len(self.__entries), "max_entries": self.max_entries, "hits": self.hits,
+                    "misses": self.misses, "evictions": self.evictions, "invalidations": self.invalidations}
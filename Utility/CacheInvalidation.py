@@ -0,0 +1,107 @@
+import os
+import select
+import threading
+from typing import Dict
+
+import psycopg2
+
+from Utility.Cache import LRUCache
+from Utility.DBConnector import load_config
+
+# writers notify this channel with "<kind>:<key>" payloads, "*" drops every cached entry
+CHANNEL = "solution_cache"
+
+
+# background thread that LISTENs on CHANNEL and evicts the entries other processes changed.
+# caches is {kind: LRUCache}, the kind being the prefix of the payloads meant for that cache
+class InvalidationListener(threading.Thread):
+    def __init__(self, caches: Dict[str, LRUCache], channel: str = CHANNEL, poll_interval: float = 5.0,
+                 reconnect_delay: float = 1.0):
+        super().__init__(name="cache-invalidation-listener", daemon=True)
+        self.caches = caches
+        self.channel = channel
+        self.poll_interval = poll_interval
+        self.reconnect_delay = reconnect_delay
+        self.pid = os.getpid()
+        self.__listening = threading.Event()
+        self.__stopped = threading.Event()
+
+    # while this is False notifications may be missed, so the caches must not be trusted
+    def is_listening(self) -> bool:
+        return self.__listening.is_set()
+
+    def wait_listening(self, timeout: float = None) -> bool:
+        return self.__listening.wait(timeout)
+
+    def stop(self) -> None:
+        self.__stopped.set()
+
+    def run(self) -> None:
+        while not self.__stopped.is_set():
+            connection = None
+            try:
+                connection = psycopg2.connect(**load_config())
+                connection.autocommit = True
+                with connection.cursor() as cursor:
+                    cursor.execute("LISTEN " + self.channel)
+                # whatever changed while nobody listened is unknown, start over
+                self.__clear()
+                self.__listening.set()
+                while not self.__stopped.is_set():
+                    if select.select([connection], [], [], self.poll_interval) == ([], [], []):
+                        continue
+                    connection.poll()
+                    while connection.notifies:
+                        self.apply(connection.notifies.pop(0).payload)
+            except Exception:
+                pass
+            finally:
+                self.__listening.clear()
+                if connection is not None:
+                    try:
+                        connection.close()
+                    except Exception:
+                        pass
+            self.__stopped.wait(self.reconnect_delay)
+
+    def apply(self, payload: str) -> None:
+        if payload == "*":
+            self.__clear()
+            return
+        kind, _, key = payload.partition(":")
+        cache = self.caches.get(kind)
+        if cache is None:
+            return
+        try:
+            cache.invalidate(int(key))
+        except ValueError:
+            cache.clear()
+
+    def __clear(self) -> None:
+        for cache in self.caches.values():
+            cache.clear()
+
+
+_listener = None
+_listener_lock = threading.Lock()
+
+
+# starts the listener of this process on first use (again after a fork), returns whether it is listening
+def ensure_listener(caches: Dict[str, LRUCache]) -> bool:
+    global _listener
+    listener = _listener
+    if listener is None or listener.pid != os.getpid():
+        with _listener_lock:
+            if _listener is None or _listener.pid != os.getpid():
+                _listener = InvalidationListener(caches)
+                _listener.start()
+            listener = _listener
+    return listener.is_listening()
+
+
+def stop_listener() -> None:
+    global _listener
+    with _listener_lock:
+        if _listener is not None and _listener.pid == os.getpid():
+            _listener.stop()
+        _listener = None
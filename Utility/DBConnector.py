@@ -1,9 +1,20 @@
 import psycopg2
-from psycopg2 import errors, sql
-from configparser import ConfigParser
+from psycopg2 import errors, extensions, sql
+from configparser import ConfigParser, Error as ConfigParserError
 from Utility.Exceptions import DatabaseException
+from collections import deque
+from collections.abc import Mapping, Sequence
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import date, datetime
+from decimal import Decimal
+from itertools import chain, count, islice
+import io
+from operator import itemgetter
 import os
-from typing import Union
+import threading
+import time
+from typing import Callable, Iterable, Iterator, Optional, Union
 
 
 class ResultSetDict(dict):
@@ -13,19 +24,121 @@ class ResultSetDict(dict):
         return super().__getitem__(item.lower())
 
 
+# a row of a ResultSet, a read only mapping view over the fetched tuple. every row of a ResultSet shares the
+# same column -> index map, so reading a row allocates nothing but this small object
+class ResultSetRow(Mapping):
+    __slots__ = ('__values', '__index')
+
+    def __init__(self, values: tuple, index: ResultSetDict):
+        self.__values = values
+        self.__index = index
+
+    def __getitem__(self, item):
+        if type(item) is not str:
+            return None
+        return self.__values[self.__index[item]]
+
+    def __contains__(self, item):
+        return type(item) is str and item.lower() in self.__index.keys()
+
+    def __iter__(self):
+        return iter(self.__index)
+
+    def __len__(self):
+        return len(self.__index)
+
+    def __repr__(self):
+        return repr(dict(self.items()))
+
+    # the underlying tuple, in column order
+    def astuple(self) -> tuple:
+        return self.__values
+
+
+# a column of a ResultSet, read straight from the rows without copying them
+class ResultSetColumn(Sequence):
+    __slots__ = ('__rows', '__index')
+
+    def __init__(self, rows: list, index: int):
+        self.__rows = rows
+        self.__index = index
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return [row[self.__index] for row in self.__rows[item]]
+        return self.__rows[item][self.__index]
+
+    def __iter__(self):
+        return map(itemgetter(self.__index), self.__rows)
+
+    def __len__(self):
+        return len(self.__rows)
+
+    def __repr__(self):
+        return repr(list(self))
+
+
+# rows moved into columns at a time when a streamed ResultSet is exported
+_COLUMN_CHUNK_SIZE = 10000
+
+
+def _first_value(values: list):
+    for value in values:
+        if value is not None:
+            return value
+    return None
+
+
+def _column_to_list(values: list) -> list:
+    if isinstance(_first_value(values), Decimal):
+        return [None if value is None else float(value) for value in values]
+    return values
+
+
+def _column_to_numpy(numpy, values: list):
+    first = _first_value(values)
+    has_null = any(value is None for value in values)
+    if isinstance(first, bool):
+        return numpy.array(values, dtype=object if has_null else numpy.bool_)
+    if isinstance(first, int) and not has_null:
+        return numpy.array(values, dtype=numpy.int64)
+    if isinstance(first, (int, float, Decimal)):
+        return numpy.fromiter((numpy.nan if value is None else float(value) for value in values),
+                              dtype=numpy.float64, count=len(values))
+    if isinstance(first, datetime):
+        return numpy.array([None if value is None else value.replace(tzinfo=None) for value in values],
+                           dtype='datetime64[s]')
+    if isinstance(first, date):
+        return numpy.array(values, dtype='datetime64[D]')
+    return numpy.array(values, dtype=object)
+
+
 class ResultSet:
-    # constructor
+    # constructor, results is either a list of rows or an iterator of rows (a streamed ResultSet)
     def __init__(self, description=None, results=None):
-        self.rows = []
+        self.__rows = []
+        self.__stream = None
         self.cols_header = []
         self.cols = ResultSetDict()
         self.__fromQuery(description, results)
 
+    # the rows of a streamed ResultSet are only materialized when this list is asked for
+    @property
+    def rows(self) -> list:
+        if self.__stream is not None:
+            self.__rows.extend(self.__stream)
+            self.__stream = None
+        return self.__rows
+
     def __getitem__(self, idx):
         if type(idx) == str:
-            return [x[self.cols[idx]] for x in self.rows]
+            return list(self.column(idx))
         return self.__getRow(idx)
 
+    # a view of one column, cheaper than result[name] when the values are only read
+    def column(self, name: str) -> ResultSetColumn:
+        return ResultSetColumn(self.rows, self.cols[name])
+
     # so you can use print(ResultSet)
     def __str__(self):
         string = ""
@@ -38,9 +151,15 @@ class ResultSet:
             string += '\n'
         return string
 
+    # a streamed ResultSet hands out each row once, without keeping it
     def __iter__(self):
-        for row in range(len(self.rows)):
-            yield self.__getRow(row)
+        if self.__stream is not None:
+            stream, self.__stream = self.__stream, None
+            for values in stream:
+                yield ResultSetRow(values, self.cols)
+            return
+        for values in self.rows:
+            yield ResultSetRow(values, self.cols)
 
     # what is the size of the ResultSet?
     def size(self):
@@ -48,60 +167,526 @@ class ResultSet:
 
     # is the ResultSet empty?
     def isEmpty(self):
+        if self.__stream is not None:
+            return False
         return self.size() == 0
 
+    # the ResultSet as {column name: list of values}, decimals become floats. a streamed ResultSet is read
+    # chunk by chunk straight into the columns, without building the row list
+    def to_columns(self) -> dict:
+        return {name: _column_to_list(values) for name, values in zip(self.cols_header, self.__columnValues())}
+
+    # the ResultSet as {column name: numpy array}: integers become int64, decimals and floats float64,
+    # timestamps datetime64[s], dates datetime64[D] and booleans bool. integer or boolean columns holding a NULL
+    # fall back to float64 with NaN and object respectively, anything else is an object array
+    def to_numpy(self) -> dict:
+        try:
+            import numpy
+        except ImportError:
+            raise ImportError("ResultSet.to_numpy requires numpy, install it with pip install numpy")
+        return {name: _column_to_numpy(numpy, values)
+                for name, values in zip(self.cols_header, self.__columnValues())}
+
+    def __columnValues(self) -> list:
+        if self.__stream is None:
+            return [list(values) for values in zip(*self.rows)] if len(self.rows) > 0 else \
+                [[] for _ in self.cols_header]
+        stream, self.__stream = self.__stream, None
+        columns = [[] for _ in self.cols_header]
+        while True:
+            chunk = list(islice(stream, _COLUMN_CHUNK_SIZE))
+            if len(chunk) == 0:
+                return columns
+            for column, values in zip(columns, zip(*chunk)):
+                column.extend(values)
+
+    # is the ResultSet still backed by an open cursor?
+    def isStreaming(self):
+        return self.__stream is not None
+
     def __getRow(self, row: int):
         if len(self.rows) <= row:
             print('Invalid row ' + str(row))
             return ResultSetDict()
-        row_to_return = ResultSetDict()
-        for val, col in zip(self.rows[row], self.cols_header):
-            row_to_return[col] = val
-        return row_to_return
+        return ResultSetRow(self.rows[row], self.cols)
 
-    def __fromQuery(self, description, results: list):
+    def __fromQuery(self, description, results):
+        if results is not None and not isinstance(results, list):
+            # peek so an empty stream looks exactly like an empty list
+            results = iter(results)
+            first = next(results, None)
+            if first is None:
+                results = None
+            else:
+                self.__stream = chain((first,), results)
+                self.__setHeader(description, len(first))
+                return
         if results is None or len(results) == 0:  # no results
             self.cols = ResultSetDict()
         else:
-            self.rows = results.copy()
-            self.cols_header = [d.name for d in description]
-            self.cols = ResultSetDict()
-            for col, index in zip(self.cols_header, range(len(results[0]))):
-                self.cols[col] = index
+            # fetchall already built a fresh list, no need to copy it
+            self.__rows = results
+            self.__setHeader(description, len(results[0]))
+
+    def __setHeader(self, description, width: int):
+        self.cols_header = [d.name for d in description]
+        self.cols = ResultSetDict()
+        for col, index in zip(self.cols_header, range(width)):
+            self.cols[col] = index
+
+
+# environment variable pointing at a database.ini to use instead of the Utility/database.ini lookup
+CONFIG_ENV_VAR = "DATABASE_INI"
+
+_config_cache = {}  # (filename, section) -> (mtime, parameters)
+_config_lock = threading.Lock()
+
+
+def _config_candidates(filename: Optional[str]) -> list:
+    if filename is not None:
+        return [filename]
+    if os.environ.get(CONFIG_ENV_VAR):
+        return [os.environ[CONFIG_ENV_VAR]]
+    return [os.path.join(os.getcwd(), "Utility", "database.ini"),
+            os.path.join(os.path.dirname(os.getcwd()), "Utility", "database.ini")]
+
+
+def _read_config(filename: str, section: str) -> Optional[dict]:
+    try:
+        mtime = os.stat(filename).st_mtime_ns
+    except OSError:
+        return None
+    key = (filename, section)
+    with _config_lock:
+        cached = _config_cache.get(key)
+        if cached is None or cached[0] != mtime:
+            # a file that does not parse or lacks the section is cached too, as None, so callers retrying
+            # (every DBConnector while the pool cannot be built) do not parse it again until it changes
+            parser = ConfigParser()
+            try:
+                parser.read(filename)
+                db = dict(parser.items(section)) if parser.has_section(section) else None
+            except ConfigParserError:
+                db = None
+            cached = (mtime, db)
+            _config_cache[key] = cached
+        return None if cached[1] is None else dict(cached[1])
+
+
+# returns the connection parameters, the parsed file (or the failure to parse it) is cached until its
+# modification time changes
+def load_config(filename: Optional[str] = None, section: str = 'postgresql') -> dict:
+    candidates = _config_candidates(filename)
+    for candidate in candidates:
+        db = _read_config(candidate, section)
+        if db is not None:
+            return db
+    raise DatabaseException.database_ini_ERROR(
+        "Please modify database.ini file under Utility, no readable [" + section + "] section found in " +
+        ", ".join(candidates))
+
+
+def clear_config_cache() -> None:
+    with _config_lock:
+        _config_cache.clear()
+
+
+# the connections handed out by the pool, they remember which statements were prepared on them
+class PooledConnection(extensions.connection):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared = set()
+
+
+_statement_names = {}  # query template -> name of its prepared statement
+_statement_names_lock = threading.Lock()
+
+
+def _statement_name(template: str) -> str:
+    name = _statement_names.get(template)
+    if name is None:
+        with _statement_names_lock:
+            name = _statement_names.setdefault(template, "stmt_" + str(len(_statement_names)))
+    return name
+
+
+class ConnectionPool:
+    # a thread safe pool of open connections, shared by every DBConnector of the process.
+    # params is either the connection parameters or a function returning them for every new connection
+    def __init__(self, params: Union[dict, Callable[[], dict]], minconn: int = 1, maxconn: int = 20, idle_timeout: float = 300.0,
+                 health_check_after: float = 30.0, checkout_timeout: float = 30.0):
+        if minconn < 0 or maxconn < 1 or minconn > maxconn:
+            raise ValueError("ConnectionPool expects 0 <= minconn <= maxconn and maxconn >= 1")
+        self.params = params
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.idle_timeout = idle_timeout
+        self.health_check_after = health_check_after
+        self.checkout_timeout = checkout_timeout
+        self.pid = os.getpid()
+        self.__idle = deque()  # (connection, returned_at), most recently returned on the right
+        self.__in_use = 0
+        self.__closed = False
+        self.__lock = threading.Condition()
+        for _ in range(minconn):
+            self.__idle.append((self.__connect(), time.monotonic()))
+
+    def __connect(self):
+        params = self.params() if callable(self.params) else self.params
+        connection = psycopg2.connect(connection_factory=PooledConnection, **params)
+        connection.autocommit = False
+        return connection
+
+    def __total(self) -> int:
+        return len(self.__idle) + self.__in_use
+
+    # a connection that sat idle for a while may have been dropped by the server, so probe it first
+    def __healthy(self, connection, returned_at: float) -> bool:
+        if connection.closed:
+            return False
+        if time.monotonic() - returned_at < self.health_check_after:
+            return True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            connection.rollback()
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def __discard(connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    # close connections that stayed idle longer than idle_timeout, keeping at least minconn open
+    def __reap(self):
+        now = time.monotonic()
+        while len(self.__idle) > 0 and self.__total() > self.minconn \
+                and now - self.__idle[0][1] > self.idle_timeout:
+            connection, _ = self.__idle.popleft()
+            self.__discard(connection)
+
+    # takes a slot under the lock: an idle connection to check, or (None, None) for a connection to open
+    def __reserve(self, deadline: float):
+        with self.__lock:
+            while True:
+                if self.__closed:
+                    raise DatabaseException.ConnectionInvalid("Connection pool is closed")
+                self.__reap()
+                if len(self.__idle) > 0:
+                    self.__in_use += 1
+                    return self.__idle.pop()
+                if self.__total() < self.maxconn:
+                    # the slot is taken before connecting so concurrent checkouts do not overshoot maxconn
+                    self.__in_use += 1
+                    return None, None
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise DatabaseException.ConnectionInvalid("Timed out waiting for a free connection")
+                self.__lock.wait(remaining)
+
+    def __release_slot(self, connection):
+        if connection is not None:
+            self.__discard(connection)
+        with self.__lock:
+            self.__in_use -= 1
+            self.__lock.notify()
+
+    def getconn(self):
+        deadline = time.monotonic() + self.checkout_timeout
+        while True:
+            connection, returned_at = self.__reserve(deadline)
+            # connecting and probing happen outside the lock, other checkouts and returns go on meanwhile
+            try:
+                if connection is None:
+                    return self.__connect()
+                healthy = self.__healthy(connection, returned_at)
+            except BaseException:
+                self.__release_slot(connection)
+                raise
+            if healthy:
+                return connection
+            self.__release_slot(connection)
+
+    def putconn(self, connection, discard: bool = False):
+        if not discard and not connection.closed:
+            try:
+                # never hand out a connection that is in the middle of (or failed) a transaction
+                if connection.info.transaction_status != extensions.TRANSACTION_STATUS_IDLE:
+                    connection.rollback()
+            except Exception:
+                discard = True
+        with self.__lock:
+            self.__in_use -= 1
+            if discard or self.__closed or connection.closed:
+                self.__discard(connection)
+            else:
+                self.__idle.append((connection, time.monotonic()))
+            self.__reap()
+            self.__lock.notify()
+
+    def closeall(self):
+        with self.__lock:
+            self.__closed = True
+            while len(self.__idle) > 0:
+                connection, _ = self.__idle.pop()
+                self.__discard(connection)
+            self.__lock.notify_all()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+_pool_settings = {}
+# pools inherited through fork() share their sockets with the parent process, closing them would end the
+# parent's sessions, so they are only kept referenced here
+_abandoned_pools = []
+
+
+def configure_pool(**settings) -> None:
+    # sets the ConnectionPool arguments (minconn, maxconn, idle_timeout, ...) and rebuilds the pool lazily
+    global _pool, _pool_settings
+    with _pool_lock:
+        _pool_settings = dict(settings)
+        if _pool is not None and _pool.pid == os.getpid():
+            _pool.closeall()
+        _pool = None
+
+
+def close_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None and _pool.pid == os.getpid():
+            _pool.closeall()
+        _pool = None
+
+
+def _get_pool() -> ConnectionPool:
+    global _pool
+    pool = _pool
+    if pool is not None and pool.pid == os.getpid():
+        return pool
+    with _pool_lock:
+        if _pool is not None and _pool.pid != os.getpid():
+            _abandoned_pools.append(_pool)
+            _pool = None
+        if _pool is None:
+            # resolve the configuration eagerly so a broken database.ini fails here, before a pool exists; the
+            # failure is cached by _read_config, so callers retrying do not re-read the file until it changes
+            load_config()
+            _pool = ConnectionPool(load_config, **_pool_settings)
+        return _pool
+
+
+# turns the constraint violations raised by psycopg2 into the matching DatabaseException
+@contextmanager
+def _translated_errors():
+    try:
+        yield
+    except errors.lookup("23502"):
+        raise DatabaseException.NOT_NULL_VIOLATION("NOT_NULL_VIOLATION")
+    except errors.lookup("23503"):
+        raise DatabaseException.FOREIGN_KEY_VIOLATION("FOREIGN_KEY_VIOLATION")
+    except errors.lookup("23505"):
+        raise DatabaseException.UNIQUE_VIOLATION("UNIQUE_VIOLATION")
+    except errors.lookup("23514"):
+        raise DatabaseException.CHECK_VIOLATION("CHECK_VIOLATION")
+
+
+_COPY_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+
+# formats a python value for COPY's text format
+def _copy_value(value) -> str:
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, datetime):
+        return value.isoformat(sep=" ")
+    return str(value).translate(_COPY_ESCAPES)
+
+
+_current_transaction = ContextVar("current_transaction", default=None)
+
+
+# a unit of work: inside "with Transaction():" every DBConnector of the same thread (or asyncio task) runs on one
+# connection, and everything is committed once when the block ends, or rolled back if it raised.
+# each statement is guarded by a savepoint, so a failing statement only undoes itself and the functions built
+# on DBConnector keep returning what they return outside a transaction. a Transaction opened inside another
+# one becomes a savepoint of the outer one
+class Transaction:
+    __STATEMENT_SAVEPOINT = "dbconnector_statement"
+    __savepoint_names = count()
+
+    def __init__(self):
+        self.connection = None
+        self.__pool = None
+        self.__outer = None
+        self.__savepoint = None
+        self.__token = None
+        self.__rollback_only = False
+        # whether the savepoint of the last statement still has to be released
+        self.__guarded = False
+
+    def __enter__(self):
+        self.__outer = _current_transaction.get()
+        if self.__outer is None:
+            try:
+                self.__pool = _get_pool()
+                self.connection = self.__pool.getconn()
+            except DatabaseException.database_ini_ERROR as e:
+                raise DatabaseException.ConnectionInvalid(str(e))
+            except DatabaseException.ConnectionInvalid:
+                raise
+            except Exception:
+                raise DatabaseException.ConnectionInvalid("Could not connect to database")
+        else:
+            self.connection = self.__outer.connection
+            self.__savepoint = "dbconnector_transaction_" + str(next(Transaction.__savepoint_names))
+            self.__outer._run_unguarded("SAVEPOINT " + self.__savepoint)
+        self.__token = _current_transaction.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        _current_transaction.reset(self.__token)
+        commit = exc_type is None and not self.__rollback_only
+        if self.__outer is not None:
+            if commit:
+                self.__outer._run_unguarded("RELEASE SAVEPOINT " + self.__savepoint)
+            else:
+                self.__outer._run_unguarded("ROLLBACK TO SAVEPOINT " + self.__savepoint + "; "
+                                            "RELEASE SAVEPOINT " + self.__savepoint)
+            return False
+        try:
+            if commit:
+                self.connection.commit()
+        except Exception:
+            raise DatabaseException.ConnectionInvalid("Could not commit changes")
+        finally:
+            self.__pool.putconn(self.connection)
+            self.connection = None
+        return False
+
+    # undo the whole transaction when the block ends, even if it does not raise
+    def rollback(self):
+        self.__rollback_only = True
+
+    # runs one statement behind a fresh savepoint. releasing the previous one is sent along with it, so the
+    # savepoints cost no extra round trip unless the statement fails
+    def _execute(self, cursor, query, params=None):
+        if isinstance(query, sql.Composable):
+            query = query.as_string(cursor)
+        try:
+            cursor.execute(self.__guard_prefix() + query, params)
+        except Exception:
+            self.__undo_guard(cursor)
+            raise
+
+    # runs fn(cursor) behind a savepoint, for what cannot share a round trip with the savepoint (COPY)
+    def _call(self, cursor, fn):
+        cursor.execute(self.__guard_prefix().rstrip("; "))
+        try:
+            return fn(cursor)
+        except Exception:
+            self.__undo_guard(cursor)
+            raise
+
+    def _run_unguarded(self, query: str):
+        with self.connection.cursor() as cursor:
+            cursor.execute(self.__release_prefix() + query)
+
+    def __release_prefix(self) -> str:
+        if not self.__guarded:
+            return ""
+        self.__guarded = False
+        return "RELEASE SAVEPOINT " + Transaction.__STATEMENT_SAVEPOINT + "; "
+
+    def __guard_prefix(self) -> str:
+        prefix = self.__release_prefix() + "SAVEPOINT " + Transaction.__STATEMENT_SAVEPOINT + "; "
+        self.__guarded = True
+        return prefix
+
+    def __undo_guard(self, cursor):
+        if not self.__guarded:
+            return
+        self.__guarded = False
+        try:
+            cursor.execute("ROLLBACK TO SAVEPOINT " + Transaction.__STATEMENT_SAVEPOINT + "; "
+                           "RELEASE SAVEPOINT " + Transaction.__STATEMENT_SAVEPOINT)
+        except Exception:
+            # the savepoint itself failed, nothing can be trusted on this connection anymore
+            self.__rollback_only = True
+            raise DatabaseException.ConnectionInvalid("Could not roll back the failed statement")
+
+
+def in_transaction() -> bool:
+    return _current_transaction.get() is not None
 
 
 class DBConnector:
-    # constructor
+    # rows fetched per round trip by streamed queries
+    DEFAULT_ITERSIZE = 2000
+    __cursor_names = count()
+
+    # constructor, borrows a connection from the process wide pool, or shares the one of the current Transaction
     def __init__(self):
+        self.__pool = None
+        self.__streams = []
+        self.__transaction = _current_transaction.get()
+        if self.__transaction is not None:
+            self.connection = self.__transaction.connection
+            self.cursor = self.connection.cursor()
+            return
         try:
-            # Obtain the configuration parameters
-            params = DBConnector.__config()
-            self.connection = psycopg2.connect(**params)
-            self.connection.autocommit = False
+            self.__pool = _get_pool()
+            self.connection = self.__pool.getconn()
             self.cursor = self.connection.cursor()
+        except DatabaseException.database_ini_ERROR as e:
+            self.connection = None
+            self.cursor = None
+            raise DatabaseException.ConnectionInvalid(str(e))
         except Exception as e:
+            if self.__pool is not None and getattr(self, "connection", None) is not None:
+                self.__pool.putconn(self.connection, discard=True)
             self.connection = None
             self.cursor = None
             raise DatabaseException.ConnectionInvalid("Could not connect to database")
 
-    # close connection
+    # give the connection back to the pool, any uncommitted changes are rolled back.
+    # inside a Transaction the connection stays with the transaction
     def close(self):
+        # server side cursors live on this connection, they must not outlive it being handed to someone else
+        for stream in self.__streams:
+            try:
+                stream.close()
+            except Exception:
+                pass
+        self.__streams = []
         if self.cursor is not None:
-            self.cursor.close()
+            try:
+                self.cursor.close()
+            except Exception:
+                pass
+            self.cursor = None
         if self.connection is not None:
-            self.connection.close()
+            if self.__transaction is None:
+                self.__pool.putconn(self.connection)
+            self.connection = None
 
-    # commit connection's changes
+    # commit connection's changes, inside a Transaction this waits for the end of the transaction
     def commit(self):
-        if self.connection is not None:
+        if self.connection is not None and self.__transaction is None:
             try:
                 self.connection.commit()
             except Exception:
                 raise DatabaseException.ConnectionInvalid("Could not commit changes")
 
-    # rollback connection's changes
+    # rollback connection's changes, inside a Transaction use Transaction.rollback instead
     def rollback(self):
-        if self.connection is not None:
+        if self.connection is not None and self.__transaction is None:
             try:
                 self.connection.rollback()
             except Exception:
@@ -114,18 +699,10 @@ class DBConnector:
             raise DatabaseException.ConnectionInvalid("Connection Invalid")
 
         # try to execute the query
-        try:
-            self.cursor.execute(query)
+        with _translated_errors():
+            self.__statement(query)
             row_effected = max(self.cursor.rowcount, 0)
             self.commit()
-        except errors.lookup("23502"):
-            raise DatabaseException.NOT_NULL_VIOLATION("NOT_NULL_VIOLATION")
-        except errors.lookup("23503"):
-            raise DatabaseException.FOREIGN_KEY_VIOLATION("FOREIGN_KEY_VIOLATION")
-        except errors.lookup("23505"):
-            raise DatabaseException.UNIQUE_VIOLATION("UNIQUE_VIOLATION")
-        except errors.lookup("23514"):
-            raise DatabaseException.CHECK_VIOLATION("CHECK_VIOLATION")
 
         # get entries in case of SELECT
         if self.cursor.description is not None:
@@ -139,25 +716,141 @@ class DBConnector:
 
         return row_effected, entries
 
+    # executes a query template with $1, $2, ... placeholders bound to params, like execute.
+    # the template is PREPAREd once per pooled connection and later calls only send EXECUTE, so postgres
+    # neither parses nor plans the same statement twice
+    def execute_prepared(self, template: str, params: Sequence = (), printSchema=False) -> (int, ResultSet):
+        if self.connection is None:
+            raise DatabaseException.ConnectionInvalid("Connection Invalid")
+        name = _statement_name(template)
+        with _translated_errors():
+            try:
+                if name not in self.connection.prepared:
+                    self.__statement("PREPARE " + name + " AS " + template)
+                    self.connection.prepared.add(name)
+                if len(params) == 0:
+                    self.__statement("EXECUTE " + name)
+                else:
+                    self.__statement("EXECUTE " + name + "(" + ", ".join(["%s"] * len(params)) + ")", params)
+            except errors.lookup("26000"):
+                # somebody deallocated our statements (DISCARD ALL), prepare them again next time
+                self.connection.prepared.clear()
+                raise
+            row_effected = max(self.cursor.rowcount, 0)
+            self.commit()
+
+        if self.cursor.description is not None:
+            entries = ResultSet(self.cursor.description, self.cursor.fetchall())
+        else:
+            entries = ResultSet()
+
+        if printSchema:
+            print(entries)
+
+        return row_effected, entries
+
+    def __statement(self, query, params=None):
+        if self.__transaction is None:
+            self.cursor.execute(query, params)
+        else:
+            self.__transaction._execute(self.cursor, query, params)
+
+    # runs a SELECT on a server side (named) cursor and yields its rows as tuples, fetching itersize rows per
+    # round trip, so the memory used does not depend on the size of the result.
+    # the rows are read inside the current transaction, calling execute or commit before the iteration is over
+    # closes the cursor
+    def iter_query(self, query: Union[str, sql.Composed], itersize: int = DEFAULT_ITERSIZE) -> Iterator[tuple]:
+        cursor = self.__open_stream(query, itersize)
+        try:
+            with _translated_errors():
+                for row in cursor:
+                    yield row
+        finally:
+            self.__close_stream(cursor)
+
+    # like execute for a SELECT, but the returned ResultSet streams its rows from a server side cursor
+    # instead of fetching them all up front, iterate it once to read the rows in constant memory
+    def execute_stream(self, query: Union[str, sql.Composed], itersize: int = DEFAULT_ITERSIZE) -> ResultSet:
+        cursor = self.__open_stream(query, itersize)
+        # a named cursor only knows its description once the first rows arrived
+        with _translated_errors():
+            first = cursor.fetchmany(itersize)
+        if len(first) == 0:
+            self.__close_stream(cursor)
+            return ResultSet()
+        return ResultSet(cursor.description, chain(first, self.__drain(cursor)))
+
+    def __drain(self, cursor) -> Iterator[tuple]:
+        try:
+            with _translated_errors():
+                for row in cursor:
+                    yield row
+        finally:
+            self.__close_stream(cursor)
+
+    def __open_stream(self, query: Union[str, sql.Composed], itersize: int):
+        if self.connection is None:
+            raise DatabaseException.ConnectionInvalid("Connection Invalid")
+        cursor = self.connection.cursor(name="stream_" + str(next(DBConnector.__cursor_names)))
+        cursor.itersize = itersize
+        self.__streams.append(cursor)
+        try:
+            with _translated_errors():
+                cursor.execute(query)
+        except Exception:
+            self.__close_stream(cursor)
+            raise
+        return cursor
+
+    def __close_stream(self, cursor):
+        if cursor in self.__streams:
+            self.__streams.remove(cursor)
+        try:
+            cursor.close()
+        except Exception:
+            pass
+
+    # streams rows into table with COPY FROM STDIN, returns the number of rows copied.
+    # unlike execute this does not commit, table and columns are trusted names, not user input
+    def copy_rows(self, table: str, columns: Sequence[str], rows: Iterable[Sequence]) -> int:
+        if self.connection is None:
+            raise DatabaseException.ConnectionInvalid("Connection Invalid")
+        buffer = io.StringIO()
+        for row in rows:
+            buffer.write("\t".join(_copy_value(value) for value in row))
+            buffer.write("\n")
+        buffer.seek(0)
+        query = "COPY " + table + "(" + ", ".join(columns) + ") FROM STDIN"
+        with _translated_errors():
+            if self.__transaction is None:
+                self.cursor.copy_expert(query, buffer)
+            else:
+                self.__transaction._call(self.cursor, lambda cursor: cursor.copy_expert(query, buffer))
+        return max(self.cursor.rowcount, 0)
+
+    # savepoints let a caller undo part of the current transaction without losing the rest of it
+    def savepoint(self, name: str):
+        self.__run_uncommitted(sql.SQL("SAVEPOINT {}").format(sql.Identifier(name)))
+
+    def rollback_to_savepoint(self, name: str):
+        self.__run_uncommitted(sql.SQL("ROLLBACK TO SAVEPOINT {}").format(sql.Identifier(name)))
+
+    def release_savepoint(self, name: str):
+        self.__run_uncommitted(sql.SQL("RELEASE SAVEPOINT {}").format(sql.Identifier(name)))
+
+    def __run_uncommitted(self, query: sql.Composed):
+        if self.connection is None:
+            raise DatabaseException.ConnectionInvalid("Connection Invalid")
+        try:
+            if self.__transaction is None:
+                self.cursor.execute(query)
+            else:
+                # the pending statement savepoint has to go first, releasing it later would release this one too
+                self.__transaction._run_unguarded(query.as_string(self.cursor))
+        except Exception:
+            raise DatabaseException.ConnectionInvalid("Could not execute " + query.as_string(self.cursor))
+
     # grant credentials
     @staticmethod
-    def __config(filename=os.path.join(os.path.join(os.getcwd(), "Utility"), 'database.ini'),
-                 section='postgresql'):
-        # create a parser
-        parser = ConfigParser()
-        # read config file
-        parser.read(filename)
-
-        # get section
-        db = {}
-        if parser.has_section(section):
-            params = parser.items(section)
-            for param in params:
-                db[param[0]] = param[1]
-        else:
-            # file not found
-            db = DBConnector.__config(
-                filename=os.path.join(os.path.join(os.path.dirname(os.getcwd()), 'Utility'), 'database.ini'))
-            if db is None:
-                raise DatabaseException.database_ini_ERROR("Please modify database.ini file under Utility")
-        return db
+    def __config(filename=None, section='postgresql'):
+        return load_config(filename, section)